@@ -0,0 +1,151 @@
+# Асинхронний доступ до сховища для обробників ⚡
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+from catalog import ImportReport, export_catalog, import_catalog
+from config import DB_MAX_PENDING, DB_WORKERS
+from metrics import DB_CALL_SECONDS, DB_QUEUE_SECONDS
+from records import Film
+
+
+# виконання в потоці пулу з вимірюванням очікування та тривалості
+def _timed(fn: Callable[..., Any], queued: float, *args: Any) -> Any:
+    start = time.perf_counter()
+    DB_QUEUE_SECONDS.observe(start - queued, method=fn.__name__)
+    try:
+        return fn(*args)
+    finally:
+        DB_CALL_SECONDS.observe(time.perf_counter() - start, method=fn.__name__)
+
+
+# відкрити й прогріти сховище (виконується в потоці пулу)
+def warm_up(db: "AsyncDatabase") -> None:
+    db.sync.warm_up()
+
+
+class AsyncDatabase:
+    """Асинхронна обгортка над ``data.Database`` / ``data_sqlite.SqliteDatabase``.
+
+    Кожен виклик виконується в обмеженому пулі потоків, тож дискові операції,
+    розбір JSON і очікування блокування не зупиняють цикл подій aiogram.
+    Кількість одночасних звернень обмежена ``max_pending``: решта чекає в циклі подій.
+    Для кожного методу записується час очікування в черзі та час виконання (див. ``metrics.py``).
+
+    Замість сховища можна передати функцію, що його відкриває (напр. ``data.open_database``):
+    тоді воно відкривається лише при першому зверненні. ``warm_up`` робить це заздалегідь
+    у потоці пулу — разом з читанням каталогу й побудовою індексів.
+    """
+
+    def __init__(self, db: Any, workers: int = DB_WORKERS, max_pending: int = DB_MAX_PENDING) -> None:
+        self._opener: Optional[Callable[[], Any]] = db if callable(db) else None
+        self._sync = None if callable(db) else db
+        self._open_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._slots = asyncio.Semaphore(max_pending)
+        # скільки викликів зараз виконується або чекає на потік
+        self.inflight = 0
+
+    # синхронне сховище (відкривається при першому зверненні)
+    @property
+    def sync(self) -> Any:
+        if self._sync is None:
+            with self._open_lock:
+                if self._sync is None:
+                    self._sync = self._opener()
+        return self._sync
+
+    # чи сховище вже відкрите
+    @property
+    def opened(self) -> bool:
+        return self._sync is not None
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        queued = time.perf_counter()
+        self.inflight += 1
+        try:
+            async with self._slots:
+                return await loop.run_in_executor(self._executor, functools.partial(_timed, fn, queued, *args))
+        finally:
+            self.inflight -= 1
+
+    # дочекатися поточних операцій, зберегти незаписані зміни та зупинити пул
+    async def close(self) -> None:
+        if self._sync is not None:
+            await self._run(self._sync.close)
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+
+    # відкрити сховище, прочитати каталог і побудувати індекси, щоб перший запит їх не чекав
+    async def warm_up(self) -> None:
+        await self._run(warm_up, self)
+
+    async def get_films(self) -> Sequence[Film]:
+        return await self._run(self.sync.get_films)
+
+    async def get_films_page(self, offset: int, limit: int) -> Tuple[List[Film], int]:
+        return await self._run(self.sync.get_films_page, offset, limit)
+
+    async def get_films_by_ids(self, ids: List[int]) -> List[Film]:
+        return await self._run(self.sync.get_films_by_ids, ids)
+
+    async def get_film_by_id(self, film_id: int) -> Optional[Film]:
+        return await self._run(self.sync.get_film_by_id, film_id)
+
+    async def random_film(self) -> Optional[Film]:
+        return await self._run(self.sync.random_film)
+
+    async def search_films(self, query: str) -> List[Film]:
+        return await self._run(self.sync.search_films, query)
+
+    async def search_film_ids(self, query: str) -> List[int]:
+        return await self._run(self.sync.search_film_ids, query)
+
+    async def filter_by_genre(self, genre: str) -> List[Film]:
+        return await self._run(self.sync.filter_by_genre, genre)
+
+    async def get_genres(self) -> List[Tuple[str, str, int]]:
+        return await self._run(self.sync.get_genres)
+
+    async def get_genre_name(self, genre_id: str) -> Optional[str]:
+        return await self._run(self.sync.get_genre_name, genre_id)
+
+    async def get_genre_page(self, genre_id: str, offset: int, limit: int) -> Tuple[List[Film], int]:
+        return await self._run(self.sync.get_genre_page, genre_id, offset, limit)
+
+    async def add_film(self, title: str, genre: str, description: str = "", actors: str = "", poster: str = "") -> Film:
+        return await self._run(self.sync.add_film, title, genre, description, actors, poster)
+
+    async def delete_film(self, film_id: int) -> Optional[str]:
+        return await self._run(self.sync.delete_film, film_id)
+
+    async def toggle_favorite(self, film_id: int, user_id: int) -> bool:
+        return await self._run(self.sync.toggle_favorite, film_id, user_id)
+
+    async def get_favorites(self, user_id: int) -> List[Film]:
+        return await self._run(self.sync.get_favorites, user_id)
+
+    async def add_rating(self, film_id: int, user_id: int, rating: int) -> float:
+        return await self._run(self.sync.add_rating, film_id, user_id, rating)
+
+    # масовий імпорт і експорт каталогу (див. catalog.py): розбір файлу теж іде в потоці пулу
+    async def import_catalog(self, stream: TextIO, fmt: str) -> ImportReport:
+        return await self._run(import_catalog, self.sync, stream, fmt)
+
+    async def export_catalog(self, stream: TextIO, fmt: str) -> int:
+        return await self._run(export_catalog, self.sync, stream, fmt)
+
+    async def get_interactions(self) -> Tuple[Dict[int, Dict[int, int]], Dict[int, List[int]]]:
+        return await self._run(self.sync.get_interactions)
+
+    async def check_ratings(self, repair: bool = False) -> Dict[int, Dict[str, Tuple[int, int]]]:
+        return await self._run(self.sync.check_ratings, repair)
+
+    async def set_poster_file_id(self, film_id: int, poster: str, file_id: str) -> bool:
+        return await self._run(self.sync.set_poster_file_id, film_id, poster, file_id)
+
+    async def update_field(self, film_id: int, field: str, value: str, expected: Optional[str] = None) -> bool:
+        return await self._run(self.sync.update_field, film_id, field, value, expected)
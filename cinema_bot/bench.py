@@ -0,0 +1,246 @@
+# Навантажувальний тест бота без мережі 🏋️
+#
+#   python bench.py                                  # json і sqlite, каталоги 100…100000
+#   python bench.py --backend json --films 1000 --users 100 --updates 5000
+#
+# Кожен прогін (сховище × розмір каталогу) іде в окремому процесі: справжній
+# command.router у Dispatcher, фейкова сесія Telegram (fake_telegram.py) і
+# синтетичні потоки оновлень від багатьох користувачів.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ADMIN = 1
+
+_WORDS = (
+    "ніч місто зоря тінь вітер море дорога серце острів дім вогонь сніг літо осінь гора "
+    "star night city shadow river storm dream ghost king road fire winter summer"
+).split()
+_GENRES = ("Драма", "Комедія", "Мелодрама", "Жахи", "Фантастика", "Трилер", "Бойовик", "Анімація", "Документальний")
+_ACTORS = ("Іван Петренко", "Олена Коваль", "Tom Hardy", "Emma Stone", "Андрій Шевчук", "Ryan Gosling", "Марія Бойко")
+
+
+# синтетичний каталог (детермінований для однакового seed)
+def make_catalog(count: int, seed: int = 1) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    movies = []
+    for film_id in range(1, count + 1):
+        title = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 3))).capitalize()
+        movies.append({
+            "id": film_id,
+            "title": f"{title} {film_id}",
+            "genre": ", ".join(rnd.sample(_GENRES, rnd.randint(1, 2))),
+            "description": " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(5, 20))),
+            "actors": ", ".join(rnd.sample(_ACTORS, 2)),
+            "poster": "",
+            "rating": 0.0,
+            "votes": 0,
+            "rating_sum": 0,
+        })
+    return {"movies": movies, "favorites": {}, "ratings": {}}
+
+
+def _message(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": 0, "text": text,
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+    }}
+
+
+def _callback(update_id: int, user_id: int, data: str) -> Dict[str, Any]:
+    return {"update_id": update_id, "callback_query": {
+        "id": str(update_id), "chat_instance": "bench", "data": data,
+        "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+        "message": {"message_id": 1, "date": 0, "text": "-", "chat": {"id": user_id, "type": "private"}},
+    }}
+
+
+# потоки оновлень для кожного користувача: [(мітка, оновлення)], адмін ще й редагує фільми
+def make_streams(users: int, total: int, films: int, seed: int = 2) -> Dict[int, List[Tuple[str, Dict[str, Any]]]]:
+    rnd = random.Random(seed)
+    streams: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {uid: [] for uid in range(1, users + 1)}
+    mix = (("films", 15), ("search", 20), ("movie", 25), ("rate", 15), ("fav", 10), ("page", 10), ("edit", 5))
+    kinds, weights = zip(*mix)
+    update_id = 0
+    while update_id < total:
+        uid = rnd.randint(1, users)
+        kind = rnd.choices(kinds, weights)[0]
+        film_id = rnd.randint(1, films)
+        update_id += 1
+        if kind == "films":
+            streams[uid].append((kind, _message(update_id, uid, "/films")))
+        elif kind == "search":
+            streams[uid].append((kind, _message(update_id, uid, " ".join(rnd.sample(_WORDS, rnd.randint(1, 2))))))
+        elif kind == "movie":
+            streams[uid].append((kind, _callback(update_id, uid, f"movie_{film_id}")))
+        elif kind == "rate":
+            streams[uid].append((kind, _callback(update_id, uid, f"rate_{film_id}_{rnd.randint(1, 10)}")))
+        elif kind == "fav":
+            streams[uid].append((kind, _callback(update_id, uid, f"fav_{film_id}")))
+        elif kind == "page":
+            streams[uid].append((kind, _callback(update_id, uid, f"page_{rnd.randrange(0, films, 10)}_a")))
+        else:
+            streams[ADMIN].append((kind, _callback(update_id, ADMIN, f"editfield_{film_id}_description")))
+            update_id += 1
+            streams[ADMIN].append((kind, _message(update_id, ADMIN, " ".join(rnd.sample(_WORDS, 6)))))
+    return streams
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# один прогін у поточному процесі (викликається з --worker)
+async def run_worker(backend: str, films: int, users: int, updates: int, throttle: bool) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="cinema-bench-")
+    os.chdir(workdir)
+    with open("data.json", "w", encoding="utf-8") as fh:
+        json.dump(make_catalog(films), fh, ensure_ascii=False)
+
+    # налаштування до імпорту command: сховище створюється під час імпорту
+    import config
+    config.STORAGE = backend
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    import command
+    from aiogram import Bot, Dispatcher
+    from aiogram.types import Update
+    from fake_telegram import FakeTelegramSession
+    from fsm_storage import SqliteStorage
+
+    command.ADMIN_ID = [ADMIN]
+    if not throttle:
+        command.throttle.limits = {}
+        command.throttle.debounce = 0
+    await command.db.get_films_page(0, 1)  # JSON-сховище читає файл при першому зверненні
+    load_seconds = time.perf_counter() - started
+
+    streams = {
+        uid: [(kind, Update.model_validate(raw)) for kind, raw in items]
+        for uid, items in make_streams(users, updates, films).items()
+    }
+    session = FakeTelegramSession(chat_limit=10**9, group_limit=10**9, global_limit=10**9)
+    bot = Bot("42:BENCH", session=session)
+    storage = SqliteStorage("fsm.db")
+    dp = Dispatcher(storage=storage)
+    dp.include_router(command.router)
+
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+
+    async def user_loop(items: List[Tuple[str, Any]]) -> None:
+        nonlocal errors
+        for kind, update in items:
+            start = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors += 1
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(user_loop(items) for items in streams.values() if items))
+    elapsed = time.perf_counter() - began
+    await command.db.close()
+    await storage.close()
+
+    every = [v for values in latencies.values() for v in values]
+    return {
+        "backend": backend,
+        "films": films,
+        "updates": len(every),
+        "errors": errors,
+        "sent": len(session.calls),
+        "load_s": round(load_seconds, 3),
+        "updates_per_s": round(len(every) / elapsed, 1),
+        "p50_ms": round(_percentile(every, 0.5) * 1000, 2),
+        "p99_ms": round(_percentile(every, 0.99) * 1000, 2),
+        "by_kind_p99_ms": {kind: round(_percentile(v, 0.99) * 1000, 2) for kind, v in sorted(latencies.items())},
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "base_rss_mb": round(rss_before, 1),
+    }
+
+
+# запустити прогін в окремому процесі й повернути його результат
+def run_in_subprocess(backend: str, films: int, args: argparse.Namespace) -> Dict[str, Any]:
+    cmd = [
+        sys.executable, os.path.join(HERE, "bench.py"), "--worker",
+        "--backend", backend, "--films", str(films),
+        "--users", str(args.users), "--updates", str(args.updates),
+    ]
+    if args.throttle:
+        cmd.append("--throttle")
+    env = dict(os.environ, PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{backend}/{films}: {proc.stderr.strip()[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'сховище':<8} {'фільмів':>8} {'оновл.':>7} {'помил.':>6} {'оновл/с':>9} {'p50, мс':>8} {'p99, мс':>8} {'пам., МБ':>9} {'старт, с':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['backend']:<8} {r['films']:>8} {r['updates']:>7} {r['errors']:>6} {r['updates_per_s']:>9} "
+            f"{r['p50_ms']:>8} {r['p99_ms']:>8} {r['peak_rss_mb']:>9} {r['load_s']:>9}"
+        )
+    print()
+    for r in results:
+        slow = ", ".join(f"{k} {v}" for k, v in r["by_kind_p99_ms"].items())
+        print(f"{r['backend']}/{r['films']} p99 за типом, мс: {slow}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Навантажувальний тест бота без мережі")
+    parser.add_argument("--backend", nargs="+", default=["json", "sqlite"], choices=["json", "sqlite"])
+    parser.add_argument("--films", nargs="+", type=int, default=[100, 1000, 10_000, 100_000])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--throttle", action="store_true", help="не вимикати ліміти користувачів")
+    parser.add_argument("--json", action="store_true", help="вивести результати як JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import logging
+        logging.disable(logging.WARNING)
+        result = asyncio.run(run_worker(args.backend[0], args.films[0], args.users, args.updates, args.throttle))
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    results = []
+    for films in args.films:
+        for backend in args.backend:
+            print(f"⏳ {backend}, {films} фільмів…", file=sys.stderr)
+            results.append(run_in_subprocess(backend, films, args))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,173 @@
 # Головний файл запуску бота 🎭
 
+import time
+
+# відлік часу старту — до імпорту aiogram та решти модулів
+_STARTED = time.perf_counter()
+
 import logging
 import asyncio
+import signal
+from typing import Awaitable, Dict, Optional, TypeVar
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
-from config import BOT_TOKEN
-from command import router
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from config import (
+    BOT_TOKEN, METRICS_HOST, METRICS_LOG_INTERVAL, METRICS_PORT, RUN_MODE,
+    WEBAPP_HOST, WEBAPP_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_URL,
+)
+from command import cards, db, recommender, router, throttle
+from fsm_storage import SqliteStorage
+from metrics import REGISTRY, ApiMetricsMiddleware, log_summary, start_exporter
+from profiler import capture_to_log
+from ratelimit import OutboundLimiter
+from recommend import Snapshot
+
+_IMPORTED = time.perf_counter()
+log = logging.getLogger(__name__)
+T = TypeVar("T")
+
+# показники черг і лічильники інших модулів, що зчитуються при кожному експорті метрик
+def register_collectors(limiter: OutboundLimiter) -> None:
+    REGISTRY.collector("cinema_outbound_queue", "Запити до Telegram, що чекають на ліміт", lambda: limiter.pending)
+    REGISTRY.collector("cinema_outbound_retries_total", "Повтори після RetryAfter", lambda: limiter.retried, "counter")
+    REGISTRY.collector("cinema_db_inflight", "Виклики сховища, що виконуються або чекають", lambda: db.inflight)
+    REGISTRY.collector(
+        "cinema_db_pending_writes", "Незаписані на диск зміни JSON-сховища",
+        lambda: getattr(db.sync, "pending_writes", 0) if db.opened else 0,
+    )
+    REGISTRY.collector(
+        "cinema_throttled_total", "Події, відкинуті лімітами користувачів",
+        lambda: {(("kind", kind),): n for kind, n in throttle.dropped.items()}, "counter",
+    )
+    REGISTRY.collector("cinema_card_cache_size", "Картки фільмів у кеші", lambda: len(cards))
+    REGISTRY.collector("cinema_recommend_films", "Фільми з порахованими схожими", lambda: len(recommender))
+
+# aiohttp-застосунок, що приймає оновлення від Telegram (перевіряє секретний токен)
+def build_webhook_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET or None).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+# підготовка Telegram до прийому оновлень: вебхук реєструється, для polling — знімається
+async def prepare_telegram(bot: Bot, dp: Dispatcher) -> None:
+    if RUN_MODE != "webhook":
+        await bot.delete_webhook(drop_pending_updates=True)
+    elif WEBHOOK_URL:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=True,
+        )
+
+# режим вебхука: сервер працює до SIGINT/SIGTERM, потім коректно зупиняється
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    runner = web.AppRunner(build_webhook_app(bot, dp))
+    await runner.setup()
+    await web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT).start()
+    print(f"🌐 Вебхук слухає http://{WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: лишається KeyboardInterrupt
+    try:
+        await stop.wait()
+    finally:
+        # зупиняє прийом запитів, дочікується обробників і закриває сесію бота
+        await runner.cleanup()
+
+# kill -USR1 <pid> знімає профіль за PROFILE_SECONDS (звіт у лог і PROFILE_DIR)
+def install_profile_signal(tasks: set) -> None:
+    sig = getattr(signal, "SIGUSR1", None)
+    if sig is None:
+        return  # Windows: лише команда /profile
+
+    def start() -> None:
+        task = asyncio.create_task(capture_to_log())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(sig, start)
+    except (NotImplementedError, RuntimeError):
+        pass
+
+# виконати корутину й записати її тривалість у timings[name]
+async def timed(timings: Dict[str, float], name: str, step: Awaitable[T]) -> T:
+    started = time.perf_counter()
+    try:
+        return await step
+    finally:
+        timings[name] = time.perf_counter() - started
+
+# сховище з індексами, потім дані для рекомендацій: читаються до прийому оновлень,
+# щоб перші запити не чекали за ними в черзі сховища (сама модель будується у фоні)
+async def prepare_storage(timings: Dict[str, float]) -> Snapshot:
+    await timed(timings, "сховище", db.warm_up())
+    return await timed(timings, "дані рекомендацій", recommender.load(db))
+
+# розклад часу старту: імпорти, паралельні кроки підготовки та загальний час до прийому оновлень
+def log_startup(timings: Dict[str, float]) -> None:
+    total = timings.pop("разом")
+    log.info("Старт за %.2f с: %s", total, ", ".join(f"{name} {seconds:.2f} с" for name, seconds in timings.items()))
 
 # Запуск бота
 async def main() -> None:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=MemoryStorage())
+    # усі надсилання йдуть через чергу з лімітами Telegram
+    limiter = OutboundLimiter()
+    bot.session.middleware(limiter)
+    # після лімітера: кожна фактична спроба запиту окремо
+    bot.session.middleware(ApiMetricsMiddleware())
+    register_collectors(limiter)
+    exporter = await start_exporter(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+    summary = asyncio.create_task(log_summary(METRICS_LOG_INTERVAL)) if METRICS_LOG_INTERVAL > 0 else None
+    profiles: set = set()
+    install_profile_signal(profiles)
+    recommendations: Optional[asyncio.Task] = None
+    storage = SqliteStorage()
+    dp = Dispatcher(storage=storage)
     dp.include_router(router)
-    await bot.delete_webhook(drop_pending_updates=True)
-    print("🎭 Кіноафіша — бот запущено")
-    await dp.start_polling(bot)
+    timings = {"імпорти": _IMPORTED - _STARTED}
+    try:
+        # каталог та індекси будуються, поки налаштовується Telegram; оновлення
+        # починають прийматися лише після обох кроків, тож перший запит уже «теплий»
+        snapshot, _ = await asyncio.gather(
+            prepare_storage(timings),
+            timed(timings, "Telegram", prepare_telegram(bot, dp)),
+        )
+        timings["разом"] = time.perf_counter() - _STARTED
+        log_startup(timings)
+        recommendations = asyncio.create_task(recommender.run(db, data=snapshot))
+        print("🎭 Кіноафіша — бот запущено")
+        if RUN_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await dp.start_polling(bot)
+    finally:
+        # спершу зупиняються фонові задачі, щоб жодна не звернулася до вже закритого сховища
+        background = [task for task in (summary, recommendations, *profiles) if task is not None]
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await limiter.close()
+        await storage.close()
+        # незбережені зміни (групова фіксація) пишуться на диск перед виходом
+        await db.close()
+        if exporter is not None:
+            await exporter.cleanup()
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("Бот зупинено")
\ No newline at end of file
+        print("Бот зупинено")
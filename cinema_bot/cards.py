@@ -0,0 +1,97 @@
+# Кеш готових карток фільмів 🃏
+
+import time
+from collections import OrderedDict
+from typing import Tuple
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+from config import CARD_CACHE_SIZE, POSTER_RETRY_AFTER
+from keyboards import film_actions
+from records import Film
+
+# найбільша довжина підпису до фото в Telegram; довша картка надсилається окремим повідомленням
+CAPTION_LIMIT = 1024
+# фрагменти відповідей Telegram, що стосуються самого фото (file_id чи посилання), а не картки
+_PHOTO_ERRORS = (
+    "file identifier", "file_id", "file of type", "http url", "url content", "web page", "webpage",
+    "wrong padding", "photo", "image", "media_empty",
+)
+
+
+# HTML-текст картки фільму
+def card_text(film: Film) -> str:
+    return (
+        f"🎬 <b>{film.title}</b>\n\n"
+        f"🎭 <b>Жанр:</b> {film.genre}\n"
+        f"⭐ <b>Рейтинг:</b> {film.rating:.2f} / 10 ({film.votes} голосів)\n\n"
+        f"📖 <b>Опис:</b>\n<i>{film.description}</i>\n\n"
+        f"👥 <b>Актори:</b> {film.actors}"
+    )
+
+
+# чи помилка означає, що постер не можна надіслати (а не тимчасовий збій чи проблему з текстом)
+def is_photo_error(error: Exception) -> bool:
+    if not isinstance(error, TelegramBadRequest):
+        return False
+    message = error.message.lower()
+    return "caption" not in message and any(fragment in message for fragment in _PHOTO_ERRORS)
+
+
+class CardCache:
+    """LRU-кеш відрендерених карток: (id фільму, адмін) → (версія, текст, клавіатура).
+
+    Сховище збільшує ``version`` фільму при кожній зміні полів чи рейтингу,
+    тож застарілий запис не буде показано навіть без явного ``invalidate``.
+    """
+
+    def __init__(self, size: int = CARD_CACHE_SIZE) -> None:
+        self.size = size
+        self._cards: "OrderedDict[Tuple[int, bool], Tuple[int, str, InlineKeyboardMarkup]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    # текст і клавіатура картки (з кешу, якщо версія фільму не змінилась)
+    def get(self, film: Film, admin: bool) -> Tuple[str, InlineKeyboardMarkup]:
+        key = (film.id, admin)
+        version = film.version
+        entry = self._cards.get(key)
+        if entry is not None and entry[0] == version:
+            self._cards.move_to_end(key)
+            return entry[1], entry[2]
+        text = card_text(film)
+        markup = film_actions(film.id, admin=admin).as_markup()
+        self._cards[key] = (version, text, markup)
+        self._cards.move_to_end(key)
+        while len(self._cards) > self.size:
+            self._cards.popitem(last=False)
+        return text, markup
+
+    # прибрати картки фільму (після зміни або видалення)
+    def invalidate(self, film_id: int) -> None:
+        self._cards.pop((film_id, False), None)
+        self._cards.pop((film_id, True), None)
+
+
+class FailedPosters:
+    """Негативний кеш постерів: URL, які не вдалося надіслати, не пробуємо знову ``ttl`` секунд."""
+
+    def __init__(self, ttl: float = POSTER_RETRY_AFTER, size: int = CARD_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.size = size
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+
+    def __contains__(self, url: str) -> bool:
+        until = self._until.get(url)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[url]
+            return False
+        return True
+
+    def add(self, url: str) -> None:
+        self._until[url] = time.monotonic() + self.ttl
+        self._until.move_to_end(url)
+        while len(self._until) > self.size:
+            self._until.popitem(last=False)
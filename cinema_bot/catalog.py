@@ -0,0 +1,201 @@
+# Масовий імпорт і експорт каталогу фільмів (CSV / JSONL) 📦
+#
+#   python catalog.py import films.csv
+#   python catalog.py export films.jsonl
+#
+# Формати: CSV з рядком заголовків, JSON Lines (по об'єкту на рядок) і JSON-масив об'єктів.
+# Файл читається потоково, запис за записом; усі коректні фільми додаються
+# одним пакетом (add_films): одна транзакція чи знімок, одна перебудова індексів.
+
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from data import EDITABLE_FIELDS
+from jsonstream import iter_array
+from records import Film
+
+# обмеження довжини полів (картка фільму має вміститися в повідомлення Telegram)
+MAX_LENGTHS = {"title": 200, "genre": 200, "description": 3000, "actors": 1000, "poster": 1000}
+# скільки помилок показувати у звіті
+MAX_ERRORS = 20
+# стовпці експорту
+EXPORT_FIELDS = ("id",) + EDITABLE_FIELDS + ("rating", "votes")
+# фільмів за одне звернення до сховища під час експорту
+EXPORT_PAGE = 1000
+
+FORMATS = ("csv", "jsonl", "json")
+# стовпці, без яких CSV не імпортувати
+REQUIRED_COLUMNS = ("title", "genre")
+
+
+@dataclass
+class ImportReport:
+    """Підсумок імпорту: додані фільми, пропущені дублікати, рядки з помилками."""
+
+    added: List[Film] = field(default_factory=list)
+    duplicates: int = 0
+    invalid: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def error(self, where: str, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"{where}: {message}")
+
+    def summary(self) -> str:
+        lines = [f"Додано: {len(self.added)}, дублікатів: {self.duplicates}, з помилками: {self.invalid}"]
+        lines.extend(self.errors)
+        if self.invalid > len(self.errors):
+            lines.append(f"… і ще {self.invalid - len(self.errors)}")
+        return "\n".join(lines)
+
+
+# формат за назвою файлу (None — невідомий)
+def detect_format(filename: str) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".json"):
+        return "json"
+    return None
+
+
+# записи файлу по одному: (номер рядка, а для JSON-масиву — номер елемента; словник полів).
+# Некоректний рядок JSONL віддається як ValueError на місці запису; ValueError з самої
+# функції означає, що файл далі читати не можна (зламаний CSV, JSON-масив, немає стовпців)
+def read_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            if reader.fieldnames:
+                reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+                missing = [name for name in REQUIRED_COLUMNS if name not in reader.fieldnames]
+                if missing:
+                    raise ValueError(f"у рядку заголовків немає стовпців: {', '.join(missing)}")
+            for record in reader:
+                yield reader.line_num, record
+        except csv.Error as e:
+            raise ValueError(f"рядок {reader.line_num}: некоректний CSV ({e})") from e
+    elif fmt == "json":
+        number = 0
+        try:
+            for number, record in enumerate(iter_array(stream), 1):
+                yield number, record
+        except json.JSONDecodeError as e:
+            raise ValueError(f"некоректний JSON після запису {number} ({e.msg}); очікувався масив об'єктів") from e
+    elif fmt == "jsonl":
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, ValueError(f"некоректний JSON ({e.msg})")
+    else:
+        raise ValueError(f"Невідомий формат: {fmt!r}")
+
+
+# перевірити й нормалізувати запис; ValueError з поясненням, якщо він некоректний
+def validate(record: Any) -> Dict[str, str]:
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("очікувався об'єкт з полями фільму")
+    film = {}
+    for name in EDITABLE_FIELDS:
+        value = record.get(name)
+        value = "" if value is None else str(value).strip()
+        if value == "-":
+            value = ""
+        if len(value) > MAX_LENGTHS[name]:
+            raise ValueError(f"поле {name} довше за {MAX_LENGTHS[name]} символів")
+        film[name] = value
+    if not film["title"]:
+        raise ValueError("немає назви")
+    if not film["genre"]:
+        raise ValueError("немає жанру")
+    if film["poster"] and not film["poster"].startswith(("http://", "https://")):
+        raise ValueError("постер має бути посиланням http(s)")
+    return film
+
+
+# імпорт зі ``stream`` у синхронне сховище ``db`` (Database чи SqliteDatabase)
+def import_catalog(db: Any, stream: TextIO, fmt: str) -> ImportReport:
+    report = ImportReport()
+    films = []
+    unit = "запис" if fmt == "json" else "рядок"
+    for number, record in read_records(stream, fmt):
+        try:
+            films.append(validate(record))
+        except ValueError as e:
+            report.error(f"{unit} {number}", str(e))
+    report.added = db.add_films(films) if films else []
+    report.duplicates = len(films) - len(report.added)
+    return report
+
+
+# експорт усіх фільмів у ``stream``; повертає кількість фільмів
+def export_catalog(db: Any, stream: TextIO, fmt: str) -> int:
+    if fmt not in FORMATS:
+        raise ValueError(f"Невідомий формат: {fmt!r}")
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+    # JSON-масив пишеться по елементу на рядок, як і JSONL, лише в дужках і через кому
+    separator = "[\n" if fmt == "json" else ""
+    offset = 0
+    while True:
+        films, _ = db.get_films_page(offset, EXPORT_PAGE)
+        if not films:
+            if fmt == "json":
+                stream.write("[]\n" if not offset else "\n]\n")
+            return offset
+        for film in films:
+            if writer is not None:
+                writer.writerow(film)
+            else:
+                row = {name: film.get(name) for name in EXPORT_FIELDS}
+                line = json.dumps(row, ensure_ascii=False)
+                if fmt == "json":
+                    stream.write(separator + line)
+                    separator = ",\n"
+                else:
+                    stream.write(line + "\n")
+        offset += len(films)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from data import open_database
+
+    parser = argparse.ArgumentParser(description="Масовий імпорт і експорт каталогу фільмів")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("path", help="файл .csv або .jsonl")
+    parser.add_argument("--format", choices=FORMATS, help="формат, якщо не видно з розширення")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("не вдалося визначити формат, вкажіть --format")
+    db = open_database()
+    started = time.perf_counter()
+    try:
+        if args.action == "import":
+            # utf-8-sig: CSV з Excel починається з BOM
+            with open(args.path, encoding="utf-8-sig", newline="") as fh:
+                try:
+                    report = import_catalog(db, fh, fmt)
+                except ValueError as e:
+                    parser.exit(1, f"Файл не імпортовано: {e}\n")
+            print(report.summary())
+        else:
+            with open(args.path, "w", encoding="utf-8", newline="") as fh:
+                print(f"Експортовано фільмів: {export_catalog(db, fh, fmt)}")
+    finally:
+        db.close()
+    print(f"Час: {time.perf_counter() - started:.1f} с")
@@ -1,28 +1,61 @@
 # Обробники команд та логіка 🎬
 
+import html
+import io
 import logging
+import os
+import secrets
+import tempfile
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, StateFilter
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
-from config import ADMIN_ID
-from data import Database
+from config import ADMIN_ID, PAGE_SIZE, PROFILE_SECONDS
+from async_db import AsyncDatabase
+from cards import CAPTION_LIMIT, CardCache, FailedPosters, is_photo_error
+from catalog import FORMATS, detect_format
+from data import open_database
 from keyboards import (
+    MENU_BUTTONS,
     main_menu,
     films_keyboard,
     genres_keyboard,
-    film_actions,
     rating_keyboard,
     confirm_delete_keyboard,
     edit_keyboard,
 )
-from models import AddFilm, EditFilm
+from models import AddFilm, EditFilm, ImportFilms
+from metrics import HandlerMetricsMiddleware
+import profiler
+from recommend import Recommender
+from records import Film
+from throttle import ThrottlingMiddleware
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 router = Router()
-db = Database()
+# ліміти на користувача діють до фільтрів, тож відкинута подія майже нічого не коштує
+throttle = ThrottlingMiddleware()
+router.message.outer_middleware(throttle)
+router.callback_query.outer_middleware(throttle)
+# тривалість кожного обробника (див. metrics.py)
+router.message.middleware(HandlerMetricsMiddleware())
+router.callback_query.middleware(HandlerMetricsMiddleware())
+# сховище відкривається при першому зверненні (у bot.main — заздалегідь, див. AsyncDatabase.warm_up)
+db = AsyncDatabase(open_database)
+cards = CardCache()
+failed_posters = FailedPosters()
+recommender = Recommender()
+
+# результати останнього пошуку кожного користувача (мітка пошуку, id фільмів) для перегортання сторінок.
+# Мітка йде в курсор ("s:<мітка>"): після витіснення, перезапуску чи на іншому воркері вона
+# не збігається, і користувач бачить «повторіть пошук» замість чужої чи порожньої сторінки
+SEARCH_RESULTS_LIMIT = 1000
+_search_results: "OrderedDict[int, Tuple[str, List[int]]]" = OrderedDict()
 
 # Перевірка чи користувач адмін
 def is_admin(uid: int) -> bool:
@@ -31,26 +64,81 @@ def is_admin(uid: int) -> bool:
     except Exception:
         return False
 
-# Показ картки з інформацією про фільм
-async def show_card(message, film: dict) -> None:
-    text = (
-        f"🎬 <b>{film.get('title', 'Без назви')}</b>\n\n"
-        f"🎭 <b>Жанр:</b> {film.get('genre', 'не вказано')}\n"
-        f"⭐ <b>Рейтинг:</b> {film.get('rating', 0):.2f} / 10 ({film.get('votes', 0)} голосів)\n\n"
-        f"📖 <b>Опис:</b>\n<i>{film.get('description', 'немає опису')}</i>\n\n"
-        f"👥 <b>Актори:</b> {film.get('actors', 'не вказано')}"
-    )
+# Фото з карткою в підписі; картка, довша за підпис, іде окремим повідомленням після фото
+async def answer_photo_card(message, photo: str, text: str, markup) -> Message:
+    if len(text) <= CAPTION_LIMIT:
+        return await message.answer_photo(photo=photo, caption=text, reply_markup=markup)
+    sent = await message.answer_photo(photo=photo)
+    await message.answer(text, reply_markup=markup)
+    return sent
+
+# Показ картки з інформацією про фільм (текст і клавіатура беруться з кешу).
+# Постер надсилається за посиланням лише вперше: file_id з відповіді Telegram
+# зберігається з фільмом і далі використовується замість URL.
+# file_id скидається, а посилання потрапляє в failed_posters лише тоді, коли Telegram
+# відхилив саме фото; після тимчасових збоїв картка просто надсилається текстом
+async def show_card(message, film: Film) -> None:
     user_id = getattr(message.from_user, "id", None)
     admin = is_admin(user_id) if user_id else False
-    kb = film_actions(film['id'], admin=admin)
-    poster = film.get('poster') or ""
-    if poster.startswith(("http://", "https://")):
+    text, markup = cards.get(film, admin)
+    poster = film.poster
+    file_id = film.poster_file_id
+    if file_id:
+        try:
+            await answer_photo_card(message, file_id, text, markup)
+            return
+        except Exception as e:
+            if not is_photo_error(e):
+                log.warning("Не вдалося надіслати постер фільму %s: %s", film.id, e)
+                await message.answer(text, reply_markup=markup)
+                return
+            # file_id більше не дійсний — забуваємо його і пробуємо посилання
+            await db.set_poster_file_id(film.id, poster, "")
+    if poster.startswith(("http://", "https://")) and poster not in failed_posters:
         try:
-            await message.answer_photo(photo=poster, caption=text, reply_markup=kb.as_markup())
+            sent = await answer_photo_card(message, poster, text, markup)
+        except Exception as e:
+            log.warning("Не вдалося надіслати постер %s: %s", poster, e)
+            if is_photo_error(e):
+                failed_posters.add(poster)
+        else:
+            if sent.photo:
+                await db.set_poster_file_id(film.id, poster, sent.photo[-1].file_id)
             return
-        except Exception:
-            pass
-    await message.answer(text, reply_markup=kb.as_markup())
+    await message.answer(text, reply_markup=markup)
+
+# --- Сторінки списків ---
+
+# запам'ятати результати пошуку користувача (старі записи витісняються)
+def remember_search(user_id: int, ids: List[int]) -> str:
+    scope = f"s:{secrets.token_hex(3)}"
+    _search_results[user_id] = (scope, ids)
+    _search_results.move_to_end(user_id)
+    while len(_search_results) > SEARCH_RESULTS_LIMIT:
+        _search_results.popitem(last=False)
+    return scope
+
+# одна сторінка списку для курсора: scope "a" — усі фільми, "d" — видалення,
+# "f" — улюблені, "s:<мітка>" — останній пошук, "g:<id жанру>" — фільми жанру
+async def films_page(scope: str, offset: int, user_id: int) -> Tuple[List[Dict], int]:
+    if scope in ("a", "d"):
+        return await db.get_films_page(offset, PAGE_SIZE)
+    if scope.startswith("g:"):
+        return await db.get_genre_page(scope[2:], offset, PAGE_SIZE)
+    if scope.startswith("s"):
+        scope_ids = _search_results.get(user_id)
+        ids = scope_ids[1] if scope_ids is not None and scope_ids[0] == scope else []
+        return await db.get_films_by_ids(ids[offset:offset + PAGE_SIZE]), len(ids)
+    if scope == "f":
+        films = await db.get_favorites(user_id)
+    else:
+        return [], 0
+    return films[offset:offset + PAGE_SIZE], len(films)
+
+# клавіатура сторінки списку з навігацією
+def page_keyboard(films: List[Dict], scope: str, offset: int, total: int):
+    prefix = "delete_" if scope == "d" else "movie_"
+    return films_keyboard(films, prefix=prefix, scope=scope, offset=offset, total=total, page_size=PAGE_SIZE)
 
 # --- Основні команди ---
 
@@ -65,13 +153,15 @@ async def cmd_start(message: Message):
         "/random - випадкова рекомендація\n"
         "/favorites - мої улюблені\n"
         "/add - додати фільм (тільки адмін)\n"
-        "/delete - видалити фільм (тільки адмін)",
+        "/delete - видалити фільм (тільки адмін)\n"
+        "/import, /export [csv|jsonl|json] - масовий імпорт і експорт каталогу (тільки адмін)\n"
+        "/profile [секунд] - профіль CPU і пам'яті (тільки адмін)",
         reply_markup=main_menu()
     )
 
 @router.message(Command("films"))
 async def cmd_films(message: Message):
-    films = db.get_films()
+    films, total = await films_page("a", 0, message.from_user.id)
     if not films:
         await message.answer("📭 Бібліотека порожня. Адмін може додати фільм командою /add")
         return
@@ -79,28 +169,28 @@ async def cmd_films(message: Message):
     user_id = message.from_user.id
     admin = is_admin(user_id)
     
-    kb = films_keyboard(films)
-    await message.answer("🎥 Усі фільми:", reply_markup=kb.as_markup())
+    kb = page_keyboard(films, "a", 0, total)
+    await message.answer(f"🎥 Усі фільми ({total}):", reply_markup=kb.as_markup())
     
     if admin:
         await message.answer("⚙️ Як адмін, ви можете редагувати фільми, натиснувши на них")
 
 @router.message(Command("genres"))
 async def cmd_genres(message: Message):
-    films = db.get_films()
-    if not films:
-        await message.answer("📭 Немає фільмів для фільтрації")
-        return
-    genres = sorted({(m.get("genre") or "").strip() for m in films if m.get("genre")})
+    genres = await db.get_genres()
     if not genres:
         await message.answer("📭 Жанри не вказані")
         return
     kb = genres_keyboard(genres)
     await message.answer("🎭 Оберіть жанр:", reply_markup=kb.as_markup())
 
+# персональна рекомендація (ще не оцінений фільм, схожий на улюблені); без історії — випадковий
 @router.message(Command("random"))
 async def cmd_random(message: Message):
-    f = db.random_film()
+    film_id = recommender.recommend(message.from_user.id)
+    f = await db.get_film_by_id(film_id) if film_id is not None else None
+    if not f:
+        f = await db.random_film()
     if not f:
         await message.answer("Поки що немає фільмів для рекомендації")
         return
@@ -108,7 +198,7 @@ async def cmd_random(message: Message):
 
 @router.message(Command("favorites"))
 async def cmd_favorites(message: Message):
-    favs = db.get_favorites(message.from_user.id)
+    favs, total = await films_page("f", 0, message.from_user.id)
     if not favs:
         await message.answer("❤️ У вас поки що немає улюблених фільмів")
         return
@@ -116,7 +206,7 @@ async def cmd_favorites(message: Message):
     user_id = message.from_user.id
     admin = is_admin(user_id)
     
-    kb = films_keyboard(favs, prefix="movie_")
+    kb = page_keyboard(favs, "f", 0, total)
     await message.answer("❤️ Ваші улюблені:", reply_markup=kb.as_markup())
     
     if admin:
@@ -140,13 +230,99 @@ async def cmd_delete(message: Message):
     if not is_admin(message.from_user.id):
         await message.answer("⛔ Тільки адмін може видаляти фільми")
         return
-    films = db.get_films()
+    films, total = await films_page("d", 0, message.from_user.id)
     if not films:
         await message.answer("Немає фільмів для видалення")
         return
-    kb = films_keyboard(films, prefix="delete_")
+    kb = page_keyboard(films, "d", 0, total)
     await message.answer("🗑️ Оберіть фільм для видалення:", reply_markup=kb.as_markup())
 
+# профіль працюючого бота за вікно (за замовчуванням PROFILE_SECONDS, не більше 5 хв):
+# повний звіт пишеться у файл, у чат — початок звіту
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject):
+    if not is_admin(message.from_user.id):
+        await message.answer("⛔ Тільки адмін може профілювати бота")
+        return
+    try:
+        seconds = min(300, max(1, int(command.args or PROFILE_SECONDS)))
+    except ValueError:
+        await message.answer("Використання: /profile [секунд]")
+        return
+    await message.answer(f"🔬 Профілюю {seconds} с…")
+    try:
+        report, path = await profiler.capture(seconds)
+    except RuntimeError as e:
+        await message.answer(f"⏳ Не вдалося: {e}")
+        return
+    await message.answer(f"<pre>{html.escape(report[:3500])}</pre>\n📄 {html.escape(path)}")
+
+# --- МАСОВИЙ ІМПОРТ І ЕКСПОРТ ---
+
+# більші файли Bot API не дає завантажити: для них є python catalog.py import
+MAX_IMPORT_BYTES = 20 * 1024 * 1024
+
+@router.message(Command("import"))
+async def cmd_import(message: Message, state: FSMContext):
+    if not is_admin(message.from_user.id):
+        await message.answer("⛔ Тільки адмін може імпортувати фільми")
+        return
+    await state.set_state(ImportFilms.file)
+    await message.answer(
+        "📦 Надішліть файл .csv (з рядком заголовків), .jsonl (по об'єкту на рядок) або .json (масив об'єктів) "
+        "з полями title, genre, description, actors, poster. Фільми з назвами, що вже є, пропускаються"
+    )
+
+@router.message(StateFilter(ImportFilms.file), F.document)
+async def process_import_file(message: Message, state: FSMContext):
+    await state.clear()
+    if not is_admin(message.from_user.id):
+        return
+    document = message.document
+    fmt = detect_format(document.file_name)
+    if fmt is None:
+        await message.answer("❌ Потрібен файл .csv, .jsonl або .json")
+        return
+    if (document.file_size or 0) > MAX_IMPORT_BYTES:
+        await message.answer("❌ Файл більший за 20 МБ — імпортуйте його на сервері: python catalog.py import <файл>")
+        return
+    await message.answer("⏳ Імпортую…")
+    try:
+        buffer = await message.bot.download(document)
+        report = await db.import_catalog(io.TextIOWrapper(buffer, encoding="utf-8-sig", newline=""), fmt)
+    except TelegramBadRequest as e:
+        await message.answer(f"❌ Не вдалося завантажити файл: {html.escape(e.message)}")
+        return
+    except UnicodeDecodeError:
+        await message.answer("❌ Файл має бути в кодуванні UTF-8")
+        return
+    except ValueError as e:
+        # файл не вдалося дочитати (зламаний CSV чи JSON, немає потрібних стовпців): нічого не додано
+        await message.answer(f"❌ Файл не імпортовано: {html.escape(str(e))}")
+        return
+    recommender.add_films(report.added)
+    await message.answer(f"✅ Імпорт завершено\n{html.escape(report.summary())}")
+
+@router.message(StateFilter(ImportFilms.file))
+async def process_import_other(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("Імпорт скасовано: очікувався файл")
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    if not is_admin(message.from_user.id):
+        await message.answer("⛔ Тільки адмін може експортувати фільми")
+        return
+    fmt = (command.args or "csv").strip().lower()
+    if fmt not in FORMATS:
+        await message.answer("Використання: /export [csv|jsonl|json]")
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, f"films.{fmt}")
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            count = await db.export_catalog(fh, fmt)
+        await message.answer_document(FSInputFile(path), caption=f"📦 Фільмів: {count}")
+
 # --- ОБРОБНИКИ КНОПОК З ЕМОДЗИ ---
 
 @router.message(F.text == "🎬 /films")
@@ -174,7 +350,7 @@ async def handle_favorites_button(message: Message):
 @router.callback_query(F.data.startswith("movie_"))
 async def show_film_callback(callback: CallbackQuery):
     film_id = int(callback.data.split("_")[1])
-    film = db.get_film_by_id(film_id)
+    film = await db.get_film_by_id(film_id)
     if not film:
         await callback.message.answer("❌ Фільм не знайдено")
         await callback.answer()
@@ -185,18 +361,18 @@ async def show_film_callback(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("genre_"))
 async def show_genre_films(callback: CallbackQuery):
-    genre_encoded = callback.data.split("_", 1)[1]
-    genre = genre_encoded.replace('_', ' ')
-    films = db.filter_by_genre(genre)
+    genre_id = callback.data.split("_", 1)[1]
+    genre = await db.get_genre_name(genre_id)
+    films, total = await films_page(f"g:{genre_id}", 0, callback.from_user.id)
     if not films:
-        await callback.message.answer(f"❌ Немає фільмів у жанрі '{genre}'")
+        await callback.message.answer(f"❌ Немає фільмів у жанрі '{genre or genre_id.replace('_', ' ')}'")
         await callback.answer()
         return
     
     user_id = callback.from_user.id
     admin = is_admin(user_id)
     
-    kb = films_keyboard(films)
+    kb = page_keyboard(films, f"g:{genre_id}", 0, total)
     await callback.message.answer(f"🎭 Фільми у жанрі '{genre}':", reply_markup=kb.as_markup())
     
     if admin:
@@ -204,11 +380,34 @@ async def show_genre_films(callback: CallbackQuery):
     
     await callback.answer()
 
+# перегортання сторінки: "page_<offset>_<scope>", оновлюється лише клавіатура
+@router.callback_query(F.data.startswith("page_"))
+async def turn_page(callback: CallbackQuery):
+    _, offset, scope = callback.data.split("_", 2)
+    if scope == "d" and not is_admin(callback.from_user.id):
+        await callback.answer("⛔ Тільки адмін може видаляти фільми")
+        return
+    films, total = await films_page(scope, int(offset), callback.from_user.id)
+    if not films:
+        if scope.startswith("s"):
+            await callback.answer("🔍 Результати пошуку застаріли, повторіть пошук")
+        else:
+            await callback.answer("Список застарів, відкрийте його знову")
+        return
+    kb = page_keyboard(films, scope, int(offset), total)
+    await callback.message.edit_reply_markup(reply_markup=kb.as_markup())
+    await callback.answer()
+
+@router.callback_query(F.data == "noop")
+async def noop_callback(callback: CallbackQuery):
+    await callback.answer()
+
 @router.callback_query(F.data.startswith("fav_"))
 async def toggle_favorite(callback: CallbackQuery):
     film_id = int(callback.data.split("_")[1])
     user_id = callback.from_user.id
-    added = db.toggle_favorite(film_id, user_id)
+    added = await db.toggle_favorite(film_id, user_id)
+    recommender.observe(user_id, film_id, favorite=added)
     action = "додано до" if added else "видалено з"
     await callback.answer(f"❤️ Фільм {action} улюблених")
 
@@ -217,13 +416,14 @@ async def rate_film(callback: CallbackQuery):
     parts = callback.data.split("_")
     if len(parts) == 2:
         film_id = int(parts[1])
-        kb = rating_keyboard(film_id)
-        await callback.message.answer("⭐ Оберіть рейтинг (1-10):", reply_markup=kb.as_markup())
+        await callback.message.answer("⭐ Оберіть рейтинг (1-10):", reply_markup=rating_keyboard(film_id))
     elif len(parts) == 3:
         film_id = int(parts[1])
         rating = int(parts[2])
         user_id = callback.from_user.id
-        avg_rating = db.add_rating(film_id, user_id, rating)
+        avg_rating = await db.add_rating(film_id, user_id, rating)
+        recommender.observe(user_id, film_id, score=rating)
+        cards.invalidate(film_id)
         await callback.message.answer(f"⭐ Ваш рейтинг {rating}/10 додано! Середній рейтинг: {avg_rating:.2f}")
     await callback.answer()
 
@@ -268,15 +468,16 @@ async def process_poster(message: Message, state: FSMContext):
     poster = (message.text or "").strip()
     data = await state.get_data()
     
-    new_film = db.add_film(
+    new_film = await db.add_film(
         title=data['title'],
         genre=data['genre'],
         description=data['description'],
         actors=data['actors'],
         poster=poster if poster != '-' else ""
     )
+    recommender.add_film(new_film)
     
-    await message.answer(f"✅ Фільм '{new_film['title']}' успішно додано!")
+    await message.answer(f"✅ Фільм '{new_film.title}' успішно додано!")
     await state.clear()
 
 # --- РЕДАГУВАННЯ ФІЛЬМІВ ---
@@ -288,14 +489,13 @@ async def process_edit(callback: CallbackQuery):
         return
     
     film_id = int(callback.data.split("_")[1])
-    film = db.get_film_by_id(film_id)
+    film = await db.get_film_by_id(film_id)
     if not film:
         await callback.message.answer("❌ Фільм не знайдено")
         await callback.answer()
         return
     
-    kb = edit_keyboard(film_id)
-    await callback.message.answer("✏️ Оберіть поле для редагування:", reply_markup=kb.as_markup())
+    await callback.message.answer("✏️ Оберіть поле для редагування:", reply_markup=edit_keyboard(film_id))
     await callback.answer()
 
 @router.callback_query(F.data.startswith("editfield_"))
@@ -308,13 +508,14 @@ async def process_edit_field(callback: CallbackQuery, state: FSMContext):
     film_id = int(parts[1])
     field = parts[2]
     
-    film = db.get_film_by_id(film_id)
+    film = await db.get_film_by_id(film_id)
     if not film:
         await callback.message.answer("❌ Фільм не знайдено")
         await callback.answer()
         return
     
-    await state.update_data(film_id=film_id, field=field)
+    # значення, яке бачив адмін: запис не затре чужу зміну, зроблену за цей час
+    await state.update_data(film_id=film_id, field=field, expected=film[field])
     await state.set_state(EditFilm.new_value)
     
     field_names = {
@@ -345,10 +546,18 @@ async def process_edit_value(message: Message, state: FSMContext):
     field = data['field']
     new_value = message.text.strip()
     
-    db.update_field(film_id, field, new_value)
+    updated = await db.update_field(film_id, field, new_value, data.get('expected'))
+    cards.invalidate(film_id)
+    # у спільному режимі фільм можуть видалити в іншому процесі й одразу після оновлення
+    film = await db.get_film_by_id(film_id) if updated else None
+    if film is None:
+        await message.answer("⚠️ Поки ви редагували, фільм змінили або видалили. Відкрийте його ще раз")
+        await state.clear()
+        return
     
-    film = db.get_film_by_id(film_id)
-    await message.answer(f"✅ Поле успішно оновлено!\n\n🎬 Фільм: {film['title']}")
+    if field in ("genre", "actors"):
+        recommender.add_film(film)
+    await message.answer(f"✅ Поле успішно оновлено!\n\n🎬 Фільм: {film.title}")
     await show_card(message, film)
     await state.clear()
 
@@ -361,18 +570,17 @@ async def process_delete_init(callback: CallbackQuery):
         return
     
     film_id = int(callback.data.split("_")[1])
-    film = db.get_film_by_id(film_id)
+    film = await db.get_film_by_id(film_id)
     if not film:
         await callback.message.answer("❌ Фільм не знайдено")
         await callback.answer()
         return
     
-    kb = confirm_delete_keyboard(film_id)
     await callback.message.answer(
         f"🗑️ Ви впевнені, що хочете видалити фільм:\n"
-        f"<b>«{film['title']}»</b>?\n\n"
+        f"<b>«{film.title}»</b>?\n\n"
         f"Ця дія незворотня!",
-        reply_markup=kb.as_markup()
+        reply_markup=confirm_delete_keyboard(film_id)
     )
     await callback.answer()
 
@@ -383,7 +591,9 @@ async def process_delete_confirm(callback: CallbackQuery):
         return
     
     film_id = int(callback.data.split("_")[2])
-    film_title = db.delete_film(film_id)
+    film_title = await db.delete_film(film_id)
+    recommender.forget(film_id)
+    cards.invalidate(film_id)
     
     if film_title:
         await callback.message.answer(f"✅ Фільм <b>«{film_title}»</b> успішно видалено!")
@@ -399,47 +609,54 @@ async def process_delete_cancel(callback: CallbackQuery):
 
 # --- Пошук ---
 
-@router.message(F.state == "waiting_for_search")
+@router.message(StateFilter("waiting_for_search"))
 async def handle_search_input(message: Message, state: FSMContext):
     query = message.text.strip()
     if not query:
         await message.answer("🔍 Будь ласка, введіть назву фільму для пошуку")
         return
     
-    films = db.search_films(query)
-    if not films:
+    ids = await db.search_film_ids(query)
+    if not ids:
         await message.answer("🔍 Нічого не знайдено")
         await state.clear()
         return
     
-    user_id = message.from_user.id
-    admin = is_admin(user_id)
-    
-    if len(films) == 1:
-        await show_card(message, films[0])
-    else:
-        kb = films_keyboard(films)
-        await message.answer(f"🔍 Знайдено {len(films)} фільмів:", reply_markup=kb.as_markup())
-        if admin:
-            await message.answer("⚙️ Як адмін, ви можете редагувати фільми, натиснувши на них")
+    if await show_search_results(message, ids) and is_admin(message.from_user.id):
+        await message.answer("⚙️ Як адмін, ви можете редагувати фільми, натиснувши на них")
     
     await state.clear()
 
+# Результати пошуку: один фільм — одразу картка, кілька — перша сторінка списку.
+# Фільм могли видалити між пошуком і показом (інший адмін чи процес). True — показано список
+async def show_search_results(message: Message, ids: List[int]) -> bool:
+    user_id = message.from_user.id
+    if len(ids) == 1:
+        film = await db.get_film_by_id(ids[0])
+        if film is None:
+            await message.answer("🔍 Нічого не знайдено")
+        else:
+            await show_card(message, film)
+        return False
+    scope = remember_search(user_id, ids)
+    films, total = await films_page(scope, 0, user_id)
+    if not films:
+        await message.answer("🔍 Нічого не знайдено")
+        return False
+    kb = page_keyboard(films, scope, 0, total)
+    await message.answer(f"🔍 Знайдено {total} фільмів:", reply_markup=kb.as_markup())
+    return True
+
 # --- Загальний пошук ---
-@router.message(F.text & ~F.text.startswith('/') & 
-               ~F.text.in_(["🎬 /films", "🔎 /search", "🎭 /genres", "🎲 /random", "⭐ /favorites"]))
+@router.message(F.text & ~F.text.startswith('/') & ~F.text.in_(MENU_BUTTONS))
 async def handle_general_search(message: Message):
     query = message.text.strip()
     if not query:
         return
     
-    films = db.search_films(query)
-    if not films:
+    ids = await db.search_film_ids(query)
+    if not ids:
         await message.answer("🔍 Нічого не знайдено")
         return
     
-    if len(films) == 1:
-        await show_card(message, films[0])
-    else:
-        kb = films_keyboard(films)
-        await message.answer(f"🔍 Знайдено {len(films)} фільмів:", reply_markup=kb.as_markup())
+    await show_search_results(message, ids)
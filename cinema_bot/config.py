@@ -1,4 +1,82 @@
 BOT_TOKEN = ""
+# режим отримання оновлень: "polling" (довге опитування) або "webhook" (aiohttp-сервер)
+RUN_MODE = "polling"
+# публічна адреса для Telegram, напр. "https://bot.example.com" (порожньо — вебхук не реєструється,
+# зручно для локальної перевірки або коли його вже зареєстровано для кількох воркерів за проксі)
+WEBHOOK_URL = ""
+WEBHOOK_PATH = "/webhook"
+# секрет, що Telegram надсилає в заголовку X-Telegram-Bot-Api-Secret-Token (A-Z, a-z, 0-9, _ та -)
+WEBHOOK_SECRET = ""
+WEBAPP_HOST = "127.0.0.1"
+WEBAPP_PORT = 8080
 DATA_FILE = "data.json"
+# сховище: "json" (файл DATA_FILE) або "sqlite" (файл SQLITE_FILE; при першому запуску дані переносяться з DATA_FILE)
+STORAGE = "json"
+SQLITE_FILE = "data.db"
+# групова фіксація змін у JSON: запис не пізніше ніж через FLUSH_DELAY секунд
+# або одразу після FLUSH_MAX_DIRTY змін (FLUSH_DELAY = 0 — писати кожну зміну відразу)
+FLUSH_DELAY = 0.5
+FLUSH_MAX_DIRTY = 100
+# зміни JSON дописуються в журнал DATA_FILE + ".journal"; коли він більший за JOURNAL_MAX_BYTES,
+# його згортає у знімок DATA_FILE (0 — щоразу писати повний знімок)
+JOURNAL_MAX_BYTES = 1_000_000
+# кілька процесів бота на одному DATA_FILE (наприклад, воркер на ядро за балансувальником вебхуків):
+# зміни JSON пишуться одразу під замком DATA_FILE + ".lock", без групової фіксації.
+# SQLite-сховище безпечне для кількох процесів і без цього
+SHARED_STORAGE = False
+# рекомендації для /random: RECOMMEND_NEIGHBORS найсхожіших фільмів для кожного оціненого чи улюбленого,
+# повний перерахунок кожні RECOMMEND_REBUILD_INTERVAL секунд (між ними нові оцінки враховуються одразу);
+# RECOMMEND_PROFILE_LIMIT — скільки останніх оцінок користувача враховувати,
+# RECOMMEND_CONTENT_WEIGHT — частка подібності за жанрами й акторами (решта — за оцінками та обраним)
+RECOMMEND_NEIGHBORS = 30
+RECOMMEND_REBUILD_INTERVAL = 3600
+RECOMMEND_PROFILE_LIMIT = 200
+RECOMMEND_CONTENT_WEIGHT = 0.3
+# потоки для роботи зі сховищем та ліміт одночасних звернень з обробників
+DB_WORKERS = 4
+DB_MAX_PENDING = 64
+# скільки фільмів показувати на одній сторінці списку
+PAGE_SIZE = 10
+# скільки відрендерених карток фільмів (текст + клавіатура) тримати в пам'яті
+CARD_CACHE_SIZE = 2000
+# постер, який не вдалося надіслати за посиланням, не пробуємо знову стільки секунд
+POSTER_RETRY_AFTER = 600
+# стани діалогів (додавання, редагування, пошук) зберігаються у FSM_FILE і переживають перезапуск;
+# незавершений діалог забувається через FSM_TTL секунд бездіяльності (FSM_STATE_TTL — для окремих
+# станів або груп), прострочені записи видаляються кожні FSM_EVICT_INTERVAL секунд
+FSM_FILE = "fsm.db"
+FSM_TTL = 3600
+FSM_STATE_TTL = {"waiting_for_search": 600, "AddFilm": 86400, "EditFilm": 3600}
+FSM_EVICT_INTERVAL = 300
+# ліміти вихідних запитів (Telegram: до ~30 повідомлень/с загалом, ~1/с в один чат, 20/хв у групу);
+# RATE — скільки за секунду в середньому, BURST — скільки можна підряд без очікування
+SEND_GLOBAL_RATE = 25
+SEND_GLOBAL_BURST = 5
+SEND_CHAT_RATE = 1
+SEND_CHAT_BURST = 3
+SEND_GROUP_RATE = 0.25
+SEND_GROUP_BURST = 5
+# скільки разів повторювати запит після відповіді RetryAfter
+SEND_MAX_RETRIES = 3
+# ліміти запитів одного користувача: {клас: (запитів за секунду, скільки підряд)};
+# "search" — вільний текст (повний пошук), "write" — оцінки, обране, видалення,
+# "callback" — інші кнопки, "message" — команди та відповіді в діалогах
+THROTTLE_LIMITS = {"search": (0.5, 3), "write": (1, 5), "callback": (3, 10), "message": (2, 6)}
+# повторне натискання тієї ж кнопки протягом стількох секунд ігнорується
+THROTTLE_DEBOUNCE = 0.7
+# метрики у форматі Prometheus: http://METRICS_HOST:METRICS_PORT/metrics. Сервер без автентифікації,
+# тому вимкнений (0); щоб увімкнути, задайте порт, напр. 9105, і не відкривайте його назовні;
+# зведення найповільніших обробників пишеться в лог кожні METRICS_LOG_INTERVAL секунд (0 — ні)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 0
+METRICS_LOG_INTERVAL = 300
+# профілювання на вимогу (/profile для адміна або kill -USR1 <pid>): вибірка стеків кожні
+# PROFILE_INTERVAL секунд протягом PROFILE_SECONDS, звіт і згорнуті стеки пишуться в PROFILE_DIR;
+# PROFILE_FRAMES — глибина стеку для tracemalloc
+PROFILE_DIR = "profiles"
+PROFILE_SECONDS = 30
+PROFILE_INTERVAL = 0.005
+PROFILE_TOP = 15
+PROFILE_FRAMES = 1
 
 ADMIN_ID = []
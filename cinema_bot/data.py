@@ -1,169 +1,792 @@
 import json
+import logging
+import os
 import random
+import sys
 import threading
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from config import DATA_FILE
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from config import DATA_FILE, FLUSH_DELAY, FLUSH_MAX_DIRTY, JOURNAL_MAX_BYTES, SHARED_STORAGE, STORAGE
+from filelock import FileLock
+from genres import GenreIndex
+from jsonstream import iter_object
+from metrics import TimedLock
+from records import Film, UserRatings
+from search import SearchIndex, normalize
+
+log = logging.getLogger(__name__)
+
+EDITABLE_FIELDS = ("title", "genre", "description", "actors", "poster")
+
+
+def _empty_data() -> Dict[str, Any]:
+    return {"movies": [], "favorites": {}, "ratings": {}}
+
+
+# масив id обраного: 8 байт на фільм замість посилання на окремий int у списку
+def _id_array(ids: Iterable[int] = ()) -> array:
+    return array("q", ids)
+
+
+# запис фільму з диску: повторювані жанри — один рядок у пам'яті
+def _compact_film(film: Dict[str, Any]) -> Film:
+    film = Film.from_dict(film)
+    film.genre = sys.intern(film.genre)
+    return film
+
+
+# зафіксувати на диску сам каталог (після os.replace у ньому); у Windows каталог не відкрити — пропускаємо
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# компактні записи у знімку пишуться як звичайні списки й словники
+def _json_default(value: Any) -> Any:
+    if isinstance(value, array):
+        return value.tolist()
+    if isinstance(value, (Film, UserRatings)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# фактичні [sum, votes] фільмів, пораховані з сирих оцінок за один прохід (лише film_ids, якщо задано)
+def _rating_totals(ratings: Dict[int, UserRatings], film_ids: Optional[Iterable[int]] = None) -> Dict[int, List[int]]:
+    totals: Dict[int, List[int]] = {} if film_ids is None else {film_id: [0, 0] for film_id in film_ids}
+    for user_map in ratings.values():
+        for fid, score in zip(user_map.films, user_map.scores):
+            entry = totals.get(fid)
+            if entry is None:
+                if film_ids is not None:
+                    continue
+                entry = totals[fid] = [0, 0]
+            entry[0] += score
+            entry[1] += 1
+    return totals
+
 
 class Database:
-    """Клас для роботи з локальною JSON-базою (фільми, обране, рейтинги)."""
+    """Клас для роботи з локальною JSON-базою (фільми, обране, рейтинги).
+
+    Розібраний вміст файлу тримається в пам'яті; читання обслуговуються з кешу.
+    Файл розбирається потоково (див. ``jsonstream.py``) одразу в компактний вигляд:
+    фільми — ``records.Film``, оцінки користувача — ``records.UserRatings``.
+    Обробники отримують ці записи напряму, як незмінні відображення.
+    Кожна зміна застосовується в пам'яті одразу й описується компактним записом
+    журналу (``data.json.journal``, по JSON-рядку на зміну). Записи дописуються
+    в журнал пакетом (group commit): через ``flush_delay`` секунд після першої
+    незбереженої зміни або одразу, щойно їх набереться ``flush_max_dirty``.
+    При ``flush_delay=0`` кожна зміна пишеться відразу.
+
+    Коли журнал перевищує ``journal_max_bytes``, фоновий запис згортає його
+    у повний знімок ``data.json`` (з номером останнього запису ``seq``) і очищує.
+    При старті читається знімок і програються записи журналу новіші за ``seq``;
+    недописаний після збою останній рядок відкидається.
+
+    Якщо ``data.json`` редагують ззовні, це помічається за mtime/розміром і кеш
+    перечитується (поки є незбережені зміни, перевірка не виконується).
 
-    def __init__(self, path: str = DATA_FILE) -> None:
+    З ``shared=True`` файл можуть одночасно змінювати кілька процесів бота.
+    Кожна зміна тоді робиться під замком між процесами (``data.json.lock``):
+    спершу дочитуються записи журналу інших процесів, потім зміна
+    застосовується до актуального стану й одразу дописується в журнал
+    (групової фіксації немає). Читання дочитують журнал раз на ``check_interval``.
+
+    Поверх кешу підтримуються індекси: id → фільм, користувач → множина обраних
+    та зворотні фільм → користувачі (обране, оцінки). Вони оновлюються разом
+    з кожною зміною. Кожна зміна полів чи рейтингу фільму збільшує його ``version``.
+    Пошук іде через інвертований індекс (див. ``search.py``),
+    фільтр за жанром — через індекс жанр → фільми (див. ``genres.py``).
+    """
+
+    def __init__(
+        self,
+        path: str = DATA_FILE,
+        check_interval: float = 1.0,
+        flush_delay: float = FLUSH_DELAY,
+        flush_max_dirty: int = FLUSH_MAX_DIRTY,
+        journal_max_bytes: int = JOURNAL_MAX_BYTES,
+        shared: bool = SHARED_STORAGE,
+    ) -> None:
         self.path = Path(path)
-        self._lock = threading.Lock()
-        if not self.path.exists():
-            self._write_data({"movies": [], "favorites": {}, "ratings": {}})
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self._lock = TimedLock(threading.RLock(), "json")
+        # замок між процесами береться завжди після self._lock
+        self._shared = shared
+        self._file_lock = TimedLock(FileLock(str(self.path) + ".lock"), "json-file") if shared else nullcontext()
+        if shared:
+            flush_delay = 0
+        # окремий замок для запису на диск, щоб читання не чекали на I/O
+        self._flush_lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        # як часто (в секундах) перевіряти файл на зовнішні зміни
+        self._check_interval = check_interval
+        self._checked_at = 0.0
+        # групова фіксація змін
+        self._flush_delay = flush_delay
+        self._flush_max_dirty = max(1, flush_max_dirty)
+        self._pending: List[str] = []
+        self._writing = False
+        self._timer: Optional[threading.Timer] = None
+        # журнал
+        self._journal_max_bytes = journal_max_bytes
+        self._journal_size = 0
+        self._seq = 0
+        # індекси
+        self._by_id: Dict[int, Film] = {}
+        # незмінний знімок каталогу для get_films (скидається при додаванні й видаленні фільмів)
+        self._films_view: Optional[Tuple[Film, ...]] = None
+        # окремих індексів «хто додав / хто оцінив фільм» немає: множини з int коштували б
+        # більше, ніж самі масиви; видалення фільму (рідкісне) просто проходить по масивах
+        self._search = SearchIndex()
+        self._genres = GenreIndex()
+        self._max_id = 0
+        with self._file_lock:
+            if not self.path.exists():
+                self._set_data(_empty_data())
+                self._write_file(self._snapshot())
+                self.journal_path.unlink(missing_ok=True)
+                self._stamp = self._file_stamp()
+
+    # відбиток файлу (mtime, розмір) для виявлення зовнішніх змін
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
-    # читання з JSON (потокобезпечно)
+    # потоковий розбір JSON з диску: фільми, обране й оцінки читаються по одному запису
+    # (без рядка з усім файлом і повного дерева об'єктів) одразу в компактний вигляд:
+    # фільми — Film, обране — {користувач: масив id}, оцінки — {користувач: UserRatings}
+    def _load(self) -> Dict[str, Any]:
+        data = _empty_data()
+        stale: List[Film] = []
+        with open(self.path, encoding="utf-8") as fh:
+            for key, value in iter_object(fh, streamed=("movies", "favorites", "ratings")):
+                if key == "movies":
+                    for m in value:
+                        film = _compact_film(m)
+                        data["movies"].append(film)
+                        if "rating_sum" not in m:
+                            stale.append(film)
+                elif key == "favorites":
+                    data["favorites"] = {
+                        int(uid): _id_array(dict.fromkeys(int(x) for x in ids)) for uid, ids in value
+                    }
+                elif key == "ratings":
+                    data["ratings"] = {
+                        int(uid): UserRatings((int(fid), int(score)) for fid, score in user_map.items())
+                        for uid, user_map in value
+                    }
+                else:
+                    data[key] = value
+        # старі файли без rating_sum: агрегати рахуються один раз із сирих оцінок
+        if stale:
+            totals = _rating_totals(data["ratings"], (film.id for film in stale))
+            for film in stale:
+                film.rating_sum, film.votes = totals[film.id]
+        return data
+
+    # заміна кешу та повна перебудова індексів
+    def _set_data(self, data: Dict[str, Any]) -> None:
+        by_id: Dict[int, Film] = {}
+        for m in data["movies"]:
+            by_id[m.id] = m
+            # після перечитування файлу вважаємо змінним кожен фільм, що вже був у кеші
+            previous = self._by_id.get(m.id)
+            if previous is not None:
+                m.version = max(m.version, previous.version) + 1
+        self._data = data
+        self._seq = int(data.pop("seq", 0))
+        self._by_id = by_id
+        self._max_id = max(by_id, default=0)
+        self._search.rebuild(data["movies"])
+        self._genres.rebuild(data["movies"])
+        self._films_view = None
+
+    # програти записи журналу з позиції start, новіші за знімок; недописаний хвіст обрізається
+    def _replay_journal(self, start: int = 0) -> None:
+        self._journal_size = start
+        try:
+            fh = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return
+        applied = 0
+        with fh:
+            fh.seek(start)
+            good = start
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                if record.get("n", 0) > self._seq:
+                    self._apply(record)
+                    self._seq = record["n"]
+                    applied += 1
+            torn = good < fh.seek(0, os.SEEK_END)
+        if torn:
+            log.warning("Журнал %s обрізано після незавершеного запису", self.journal_path)
+            os.truncate(self.journal_path, good)
+        self._journal_size = good
+        if applied and not start:
+            log.info("Відновлено %s змін з журналу %s", applied, self.journal_path)
+
+    # читання з кешу (потокобезпечно); файл перечитується лише після зовнішніх змін
     def _read_data(self) -> Dict[str, Any]:
         with self._lock:
+            now = time.monotonic()
+            if self._data is not None and (
+                self._pending or self._writing or now - self._checked_at < self._check_interval
+            ):
+                return self._data
+            self._checked_at = now
+            with self._file_lock:
+                self._refresh()
+            return self._data
+
+    # перечитати файл, якщо він змінився; у спільному режимі ще й дочитати журнал інших процесів
+    def _refresh(self) -> None:
+        stamp = self._file_stamp()
+        if self._data is not None and stamp == self._stamp:
+            if not self._shared:
+                return
             try:
-                raw = self.path.read_text(encoding="utf-8")
-                return json.loads(raw) if raw else {"movies": [], "favorites": {}, "ratings": {}}
+                size = self.journal_path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if size > self._journal_size:
+                self._replay_journal(self._journal_size)
+            # журнал коротший, ніж ми прочитали, лише якщо інший процес згорнув його в знімок
+            if size >= self._journal_size:
+                return
+        try:
+            started = time.perf_counter()
+            data = self._load()
+            loaded = time.perf_counter()
+            self._set_data(data)
+            self._replay_journal()
+            log.info(
+                "Прочитано %s: %s фільмів, розбір %.2f с, індекси та журнал %.2f с",
+                self.path, len(data["movies"]), loaded - started, time.perf_counter() - loaded,
+            )
+        except Exception:
+            log.exception("Не вдалося прочитати %s", self.path)
+            # залишаємо попередній стан, щоб не затерти дані наступним записом
+            if self._data is None:
+                self._set_data(_empty_data())
+        self._stamp = stamp
+
+    # зміна стану: під self._lock (і замком між процесами) на актуальному кеші
+    @contextmanager
+    def _mutate(self) -> Iterator[None]:
+        with self._lock, self._file_lock:
+            if self._shared:
+                self._refresh()
+                self._checked_at = time.monotonic()
+            else:
+                self._read_data()
+            yield
+
+    # повний знімок стану (викликається під self._lock)
+    def _snapshot(self) -> str:
+        self._data["seq"] = self._seq
+        try:
+            return json.dumps(self._data, ensure_ascii=False, indent=2, default=_json_default)
+        finally:
+            del self._data["seq"]
+
+    # запис JSON через тимчасовий файл; знімок має бути на диску до того, як з журналу
+    # приберуть записи, які він замінює, тож і файл, і каталог синхронізуються
+    def _write_file(self, payload: str) -> None:
+        temp = self.path.with_suffix(".tmp")
+        with open(temp, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        temp.replace(self.path)
+        _fsync_dir(self.path.parent)
+
+    # дописати рядки в журнал або, якщо є знімок, записати його й прибрати з журналу
+    # перші covered байтів — ті, що вже враховані у знімку
+    def _persist(self, lines: List[str], snapshot: Optional[str], covered: int = 0) -> None:
+        if snapshot is not None:
+            self._write_file(snapshot)
+            with self._lock:
+                self._drop_journal_head(covered)
+            return
+        chunk = ("\n".join(lines) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as fh:
+            fh.write(chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._journal_size += len(chunk)
+
+    # прибрати з журналу перші covered байтів (викликається під self._lock). Записи, дописані
+    # в режимі без групування, поки знімок писався поза замком, новіші за знімок і лишаються
+    def _drop_journal_head(self, covered: int) -> None:
+        try:
+            with open(self.journal_path, "rb") as fh:
+                fh.seek(covered)
+                tail = fh.read()
+        except FileNotFoundError:
+            tail = b""
+        if tail:
+            temp = self.journal_path.with_name(self.journal_path.name + ".tmp")
+            with open(temp, "wb") as fh:
+                fh.write(tail)
+                fh.flush()
+                os.fsync(fh.fileno())
+            temp.replace(self.journal_path)
+            _fsync_dir(self.journal_path.parent)
+        else:
+            with open(self.journal_path, "wb"):
+                pass
+        self._journal_size = len(tail)
+
+    # чи пора згорнути журнал у знімок
+    def _needs_compaction(self, lines: List[str]) -> bool:
+        return self._journal_size + sum(len(line) + 1 for line in lines) > self._journal_max_bytes
+
+    # записати зміну в журнал (викликається під self._lock)
+    def _log(self, record: Dict[str, Any]) -> None:
+        self._seq += 1
+        record["n"] = self._seq
+        self._pending.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if self._flush_delay <= 0:
+            # режим без групування: пишемо одразу
+            lines, self._pending = self._pending, []
+            self._persist(lines, self._snapshot() if self._needs_compaction(lines) else None, self._journal_size)
+            self._stamp = self._file_stamp()
+            self._checked_at = time.monotonic()
+        elif len(self._pending) >= self._flush_max_dirty:
+            self._schedule_flush(0)
+        elif self._timer is None:
+            self._schedule_flush(self._flush_delay)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    # записати накопичені зміни на диск; підготовка під замком, сам запис — поза ним
+    def flush(self, compact: bool = False) -> None:
+        if self._shared:
+            # у спільному режимі зміни пишуться одразу, лишається тільки згортання
+            if compact:
+                with self._mutate():
+                    self._persist([], self._snapshot(), self._journal_size)
+                    self._stamp = self._file_stamp()
+            return
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._pending and not compact:
+                    return
+                self._read_data()
+                lines, self._pending = self._pending, []
+                # знімок уже містить усі зміни з lines, тож вони не дописуються
+                snapshot = self._snapshot() if compact or self._needs_compaction(lines) else None
+                covered = self._journal_size
+                self._writing = True
+            try:
+                self._persist(lines, snapshot, covered)
             except Exception:
-                return {"movies": [], "favorites": {}, "ratings": {}}
+                log.exception("Не вдалося записати %s", self.path)
+                with self._lock:
+                    self._pending[:0] = lines
+                    self._schedule_flush(max(self._flush_delay, 1.0))
+            finally:
+                with self._lock:
+                    self._writing = False
+                    self._stamp = self._file_stamp()
+                    self._checked_at = time.monotonic()
+
+    # скільки змін ще не записано на диск
+    @property
+    def pending_writes(self) -> int:
+        return len(self._pending)
+
+    # згорнути журнал у знімок зараз
+    def compact(self) -> None:
+        self.flush(compact=True)
+
+    # зберегти все незбережене (викликати перед завершенням роботи)
+    def close(self) -> None:
+        self.flush()
 
-    # запис в JSON (через тимчасовий файл)
-    def _write_data(self, data: Dict[str, Any]) -> None:
+    # примусово перечитати файл при наступному зверненні (незбережене спершу пишеться)
+    def reload(self) -> None:
+        self.flush()
         with self._lock:
-            temp = self.path.with_suffix(".tmp")
-            temp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-            temp.replace(self.path)
+            self._data = None
 
-    # отримати всі фільми
-    def get_films(self) -> List[Dict[str, Any]]:
-        data = self._read_data()
-        return list(data.get("movies", []))
+    # прочитати файл і побудувати індекси заздалегідь, щоб перший запит цього не чекав
+    def warm_up(self) -> None:
+        with self._lock:
+            self._read_data()
+            self._genres.genres()
+
+    # отримати всі фільми (кортеж спільний для всіх викликів до наступної зміни каталогу)
+    def get_films(self) -> Sequence[Film]:
+        with self._lock:
+            data = self._read_data()
+            if self._films_view is None:
+                self._films_view = tuple(data["movies"])
+            return self._films_view
+
+    # сторінка каталогу (у порядку додавання) та загальна кількість фільмів
+    def get_films_page(self, offset: int, limit: int) -> Tuple[List[Film], int]:
+        with self._lock:
+            movies = self._read_data()["movies"]
+            offset = max(0, int(offset))
+            return movies[offset:offset + limit], len(movies)
 
     # пошук фільму за ID
-    def get_film_by_id(self, film_id: int) -> Optional[Dict[str, Any]]:
-        return next((m for m in self.get_films() if int(m.get("id", -1)) == int(film_id)), None)
+    def get_film_by_id(self, film_id: int) -> Optional[Film]:
+        with self._lock:
+            self._read_data()
+            return self._by_id.get(int(film_id))
+
+    # кілька фільмів за ID зі збереженням порядку (відсутні пропускаються)
+    def get_films_by_ids(self, ids: List[int]) -> List[Film]:
+        with self._lock:
+            self._read_data()
+            return [self._by_id[i] for i in ids if i in self._by_id]
 
     # випадковий фільм
-    def random_film(self) -> Optional[Dict[str, Any]]:
-        films = self.get_films()
+    def random_film(self) -> Optional[Film]:
+        films = self._read_data().get("movies", [])
         return random.choice(films) if films else None
 
-    # пошук за текстовим запитом
-    def search_films(self, query: str) -> List[Dict[str, Any]]:
-        q = (query or "").strip().lower()
-        if not q:
-            return []
-        films = self.get_films()
-        return [
-            m for m in films
-            if q in m.get("title", "").lower()
-            or q in m.get("genre", "").lower()
-            or q in m.get("description", "").lower()
-        ]
-
-    # фільтрація за жанром
-    def filter_by_genre(self, genre: str) -> List[Dict[str, Any]]:
-        g = (genre or "").strip().lower()
-        films = self.get_films()
-        return [m for m in films if g in (m.get("genre", "").strip().lower())]
+    # пошук за текстовим запитом (найрелевантніші першими)
+    def search_films(self, query: str) -> List[Film]:
+        with self._lock:
+            self._read_data()
+            return [self._by_id[mid] for mid in self._search.search(query)]
+
+    # те саме, але лише id фільмів (для посторінкового показу)
+    def search_film_ids(self, query: str) -> List[int]:
+        with self._lock:
+            self._read_data()
+            return self._search.search(query)
+
+    # фільми жанру (за id або назвою жанру, точний збіг після нормалізації)
+    def filter_by_genre(self, genre: str) -> List[Film]:
+        with self._lock:
+            self._read_data()
+            return [self._by_id[mid] for mid in self._genres.film_ids(genre)]
+
+    # усі жанри [(id, назва, кількість фільмів)] за абеткою
+    def get_genres(self) -> List[Tuple[str, str, int]]:
+        with self._lock:
+            self._read_data()
+            return list(self._genres.genres())
+
+    # назва жанру за його id (None — такого жанру немає)
+    def get_genre_name(self, genre_id: str) -> Optional[str]:
+        with self._lock:
+            self._read_data()
+            return self._genres.name(genre_id)
+
+    # сторінка фільмів жанру та їх загальна кількість
+    def get_genre_page(self, genre_id: str, offset: int, limit: int) -> Tuple[List[Film], int]:
+        with self._lock:
+            self._read_data()
+            ids = self._genres.film_ids(genre_id)
+            offset = max(0, int(offset))
+            return [self._by_id[mid] for mid in ids[offset:offset + limit]], len(ids)
 
     # наступний ID
-    def _next_id(self, films: List[Dict[str, Any]]) -> int:
-        return max((f.get("id", 0) for f in films), default=0) + 1
+    def _next_id(self) -> int:
+        self._max_id += 1
+        return self._max_id
+
+    # --- зміни стану: _apply_* змінюють кеш та індекси, публічні методи ще й пишуть журнал ---
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        if op == "add":
+            self._apply_add(_compact_film(record["film"]))
+        elif op == "del":
+            self._apply_delete(record["id"])
+        elif op == "set":
+            self._apply_set(record["id"], record["field"], record["value"])
+        elif op == "fav":
+            self._apply_favorite(record["id"], record["user"], record["on"])
+        elif op == "rate":
+            self._apply_rating(record["id"], record["user"], record["score"])
+        elif op == "agg":
+            self._apply_aggregate(record["id"], record["sum"], record["votes"])
+        elif op == "pfid":
+            self._apply_poster_file_id(record["id"], record["file_id"])
+        else:
+            log.warning("Невідомий запис журналу: %r", record)
+
+    def _apply_add(self, film: Film) -> None:
+        if film.id in self._by_id:
+            return
+        self._data["movies"].append(film)
+        self._films_view = None
+        self._by_id[film.id] = film
+        self._max_id = max(self._max_id, film.id)
+        self._search.add(film)
+        self._genres.add(film)
+
+    def _apply_delete(self, film_id: int) -> Optional[Film]:
+        film = self._by_id.pop(film_id, None)
+        if film is None:
+            return None
+        self._data["movies"].remove(film)
+        self._films_view = None
+        self._search.remove(film_id)
+        self._genres.remove(film_id)
+
+        # чистимо з обраного (пошук у масиві id — на рівні C) та рейтинги (бінарний пошук)
+        for ids in self._data["favorites"].values():
+            if film_id in ids:
+                ids.remove(film_id)
+        for user_map in self._data["ratings"].values():
+            user_map.pop(film_id, None)
+        return film
+
+    def _apply_set(self, film_id: int, field: str, value: str) -> bool:
+        f = self._by_id.get(film_id)
+        if f is None:
+            return False
+        if field == "poster":
+            # file_id Telegram належав старому зображенню (скидається до заміни постера,
+            # щоб обробник без замка не побачив новий постер зі старим file_id)
+            f.poster_file_id = ""
+        setattr(f, field, value)
+        f.version += 1
+        if field != "poster":
+            self._search.update(f)
+        if field == "genre":
+            self._genres.update(f)
+        return True
+
+    def _apply_favorite(self, film_id: int, user_id: int, on: bool) -> None:
+        fav_list = self._data["favorites"].setdefault(user_id, _id_array())
+        if on and film_id not in fav_list:
+            fav_list.append(film_id)
+        elif not on and film_id in fav_list:
+            fav_list.remove(film_id)
+
+    # оцінка з інкрементальним оновленням агрегатів sum/votes, O(1)
+    def _apply_rating(self, film_id: int, user_id: int, score: int) -> Optional[Film]:
+        f = self._by_id.get(film_id)
+        if f is None:
+            return None
+        user_map = self._data["ratings"].get(user_id)
+        if user_map is None:
+            user_map = self._data["ratings"][user_id] = UserRatings()
+        previous = user_map.get(film_id)
+        user_map[film_id] = score
+
+        # обробники читають фільм без замка: спершу votes, потім sum — проміжне середнє
+        # занижене, але в межах шкали; version — останньою (див. Film)
+        if previous is None:
+            f.votes += 1
+            f.rating_sum += score
+        else:
+            f.rating_sum += score - previous
+        f.version += 1
+        return f
+
+    def _apply_aggregate(self, film_id: int, rating_sum: int, votes: int) -> None:
+        f = self._by_id.get(film_id)
+        if f is not None:
+            f.votes, f.rating_sum = votes, rating_sum
+            f.version += 1
+
+    def _apply_poster_file_id(self, film_id: int, file_id: str) -> None:
+        f = self._by_id.get(film_id)
+        if f is not None:
+            f.poster_file_id = file_id
+
+    # запис нового фільму з наступним id
+    def _new_film(self, title: str, genre: str, description: str = "", actors: str = "", poster: str = "") -> Film:
+        return Film(
+            self._next_id(),
+            title=title.strip(),
+            genre=sys.intern(genre.strip()),
+            description=description.strip(),
+            actors=actors.strip(),
+            poster=poster.strip(),
+        )
 
     # додати новий фільм
-    def add_film(self, title: str, genre: str, description: str = "", actors: str = "", poster: str = "") -> Dict[str, Any]:
-        data = self._read_data()
-        films = data.get("movies", [])
-        new_film = {
-            "id": self._next_id(films),
-            "title": title.strip(),
-            "genre": genre.strip(),
-            "description": description.strip(),
-            "actors": actors.strip(),
-            "poster": poster.strip(),
-            "rating": 0.0,
-            "votes": 0
-        }
-        films.append(new_film)
-        data["movies"] = films
-        self._write_data(data)
-        return new_film
+    def add_film(self, title: str, genre: str, description: str = "", actors: str = "", poster: str = "") -> Film:
+        with self._mutate():
+            new_film = self._new_film(title, genre, description, actors, poster)
+            self._apply_add(new_film)
+            self._log({"op": "add", "film": new_film.to_dict()})
+            return new_film
+
+    # масове додавання (імпорт каталогу): фільми з назвою, що вже є в базі чи повторюється
+    # в пакеті, пропускаються; індекси перебудовуються один раз, а весь пакет
+    # записується одним знімком замість записів журналу. Повертає додані фільми
+    def add_films(self, films: Iterable[Dict[str, str]]) -> List[Film]:
+        added: List[Film] = []
+        with self._mutate():
+            titles = {normalize(m.title).strip() for m in self._data["movies"]}
+            for film in films:
+                key = normalize(film.get("title", "")).strip()
+                if not key or key in titles:
+                    continue
+                titles.add(key)
+                new_film = self._new_film(**{field: film.get(field, "") for field in EDITABLE_FIELDS})
+                self._data["movies"].append(new_film)
+                self._by_id[new_film.id] = new_film
+                added.append(new_film)
+            if not added:
+                return added
+            self._films_view = None
+            self._search.rebuild(self._data["movies"])
+            self._genres.rebuild(self._data["movies"])
+            if self._shared:
+                # інші процеси мають побачити знімок раніше за будь-яку свою наступну зміну
+                self.compact()
+        if not self._shared:
+            self.compact()
+        return added
 
     # видалити фільм (повертає назву видаленого фільму)
-    def delete_film(self, film_id: int) -> str:
-        data = self._read_data()
-        film_title = None
-        
-        # Знаходимо фільм для отримання назви
-        for m in data.get("movies", []):
-            if int(m.get("id")) == int(film_id):
-                film_title = m.get("title", "Невідомий фільм")
-                break
-                
-        if not film_title:
-            return None  # Фільм не знайдено
-
-        # Видаляємо фільм з списку
-        data["movies"] = [m for m in data.get("movies", []) if int(m.get("id")) != int(film_id)]
-
-        # чистимо з обраного
-        for uid, lst in data.get("favorites", {}).items():
-            data["favorites"][uid] = [mid for mid in lst if int(mid) != int(film_id)]
-
-        # чистимо рейтинги
-        for uid in list(data.get("ratings", {})):
-            if str(film_id) in data["ratings"][uid]:
-                del data["ratings"][uid][str(film_id)]
-
-        self._write_data(data)
-        return film_title
+    def delete_film(self, film_id: int) -> Optional[str]:
+        film_id = int(film_id)
+        with self._mutate():
+            film = self._apply_delete(film_id)
+            if film is None:
+                return None  # Фільм не знайдено
+            self._log({"op": "del", "id": film_id})
+            return film.title or "Невідомий фільм"
 
     # додати/прибрати з обраного
     def toggle_favorite(self, film_id: int, user_id: int) -> bool:
-        data = self._read_data()
-        favorites: Dict[str, List[int]] = data.get("favorites", {})
-        key = str(user_id)
-        favorites.setdefault(key, [])
-        if int(film_id) in [int(x) for x in favorites[key]]:
-            favorites[key] = [x for x in favorites[key] if int(x) != int(film_id)]
-            added = False
-        else:
-            favorites[key].append(int(film_id))
-            added = True
-        data["favorites"] = favorites
-        self._write_data(data)
-        return added
+        film_id, user_id = int(film_id), int(user_id)
+        with self._mutate():
+            added = film_id not in self._data["favorites"].get(user_id, ())
+            self._apply_favorite(film_id, user_id, added)
+            self._log({"op": "fav", "id": film_id, "user": user_id, "on": added})
+            return added
 
     # отримати список обраних
-    def get_favorites(self, user_id: int) -> List[Dict[str, Any]]:
-        data = self._read_data()
-        id_list = [int(x) for x in data.get("favorites", {}).get(str(user_id), [])]
-        return [m for m in self.get_films() if int(m.get("id")) in id_list]
+    def get_favorites(self, user_id: int) -> List[Film]:
+        with self._lock:
+            data = self._read_data()
+            id_list = data["favorites"].get(int(user_id), ())
+            return [self._by_id[mid] for mid in id_list if mid in self._by_id]
+
+    # усі оцінки {користувач: {фільм: оцінка}} та обране {користувач: [фільми]} (для рекомендацій)
+    def get_interactions(self) -> Tuple[Dict[int, Dict[int, int]], Dict[int, List[int]]]:
+        # під замком лише копіюються масиви (memcpy), словники будуються вже без нього
+        with self._lock:
+            data = self._read_data()
+            rated = [(uid, m.films[:], m.scores[:]) for uid, m in data["ratings"].items() if m]
+            faved = [(uid, ids[:]) for uid, ids in data["favorites"].items() if ids]
+        ratings = {uid: dict(zip(films, scores)) for uid, films, scores in rated}
+        favorites = {uid: ids.tolist() for uid, ids in faved}
+        return ratings, favorites
 
     # додати рейтинг
     def add_rating(self, film_id: int, user_id: int, rating: int) -> float:
-        data = self._read_data()
-        ratings: Dict[str, Dict[str, int]] = data.get("ratings", {})
-        ratings.setdefault(str(user_id), {})[str(film_id)] = int(rating)
-
-        # перерахунок середнього
-        scores = [int(user_map[str(film_id)]) for user_map in ratings.values() if str(film_id) in user_map]
-        average = sum(scores) / len(scores) if scores else 0.0
-
-        for f in data.get("movies", []):
-            if int(f.get("id")) == int(film_id):
-                f["rating"] = round(float(average), 2)
-                f["votes"] = len(scores)
-                break
-
-        data["ratings"] = ratings
-        self._write_data(data)
-        return float(average)
-
-    # оновити конкретне поле (для редагування адміністратором)
-    def update_field(self, film_id: int, field: str, value: str) -> None:
-        if field not in {"title", "genre", "description", "actors", "poster"}:
-            return
-        data = self._read_data()
-        for f in data.get("movies", []):
-            if int(f.get("id")) == int(film_id):
-                f[field] = (value.strip() if value != "-" else "")
-                break
-        self._write_data(data)
+        film_id, user_id, rating = int(film_id), int(user_id), int(rating)
+        with self._mutate():
+            f = self._apply_rating(film_id, user_id, rating)
+            if f is None:
+                return 0.0
+            self._log({"op": "rate", "id": film_id, "user": user_id, "score": rating})
+            return f.rating_sum / f.votes
+
+    # перевірка цілісності агрегатів рейтингу: перераховує їх із сирих оцінок
+    # і повертає розбіжності {film_id: {"stored": (sum, votes), "actual": (sum, votes)}};
+    # з repair=True виправляє агрегати та зберігає базу
+    def check_ratings(self, repair: bool = False) -> Dict[int, Dict[str, Tuple[int, int]]]:
+        with self._mutate():
+            drift: Dict[int, Dict[str, Tuple[int, int]]] = {}
+            totals = _rating_totals(self._data["ratings"])
+            for film_id, f in self._by_id.items():
+                stored = (f.rating_sum, f.votes)
+                actual = tuple(totals.get(film_id, (0, 0)))
+                if stored != actual:
+                    drift[film_id] = {"stored": stored, "actual": actual}
+                    if repair:
+                        self._apply_aggregate(film_id, *actual)
+                        self._log({"op": "agg", "id": film_id, "sum": actual[0], "votes": actual[1]})
+            return drift
+
+    # запам'ятати file_id постера, отриманий від Telegram після першого надсилання
+    # (лише якщо постер не змінився за цей час; порожній file_id — забути збережений)
+    def set_poster_file_id(self, film_id: int, poster: str, file_id: str) -> bool:
+        film_id = int(film_id)
+        with self._mutate():
+            f = self._by_id.get(film_id)
+            if f is None or f.poster != poster:
+                return False
+            if f.poster_file_id != file_id:
+                self._apply_poster_file_id(film_id, file_id)
+                self._log({"op": "pfid", "id": film_id, "file_id": file_id})
+            return True
+
+    # оновити конкретне поле (для редагування адміністратором). expected — значення поля,
+    # яке бачив адмін: якщо його тим часом змінили (інший адмін чи процес), нічого не пишеться.
+    # Повертає False, якщо фільму немає або поле вже змінене
+    def update_field(self, film_id: int, field: str, value: str, expected: Optional[str] = None) -> bool:
+        if field not in EDITABLE_FIELDS:
+            return False
+        film_id = int(film_id)
+        value = value.strip() if value != "-" else ""
+        with self._mutate():
+            f = self._by_id.get(film_id)
+            if f is None or (expected is not None and getattr(f, field) != expected):
+                return False
+            self._apply_set(film_id, field, value)
+            self._log({"op": "set", "id": film_id, "field": field, "value": value})
+            return True
+
+
+# відкрити сховище, вибране в config.STORAGE
+def open_database(storage: str = STORAGE):
+    if storage == "sqlite":
+        from data_sqlite import SqliteDatabase
+        return SqliteDatabase()
+    if storage == "json":
+        return Database()
+    raise ValueError(f"Невідоме сховище: {storage!r}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Перевірка цілісності агрегатів рейтингу")
+    parser.add_argument("--path", default=DATA_FILE)
+    parser.add_argument("--repair", action="store_true", help="виправити знайдені розбіжності")
+    args = parser.parse_args()
+
+    database = Database(args.path)
+    report = database.check_ratings(repair=args.repair)
+    database.close()
+    for film_id, diff in sorted(report.items()):
+        print(f"фільм {film_id}: збережено {diff['stored']}, фактично {diff['actual']}")
+    print("Розбіжностей не знайдено" if not report else f"Розбіжностей: {len(report)}" + (" (виправлено)" if args.repair else ""))
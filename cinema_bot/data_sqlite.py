@@ -0,0 +1,465 @@
+# SQLite-сховище з тим самим інтерфейсом, що й data.Database 🗄️
+
+import logging
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import DATA_FILE, SQLITE_FILE
+from data import EDITABLE_FIELDS, Database
+from genres import GenreIndex
+from metrics import TimedLock
+from records import FILM_FIELDS, Film
+from search import SearchIndex, normalize
+
+log = logging.getLogger(__name__)
+
+# стовпці фільму в порядку аргументів Film (rating Film рахує сам)
+FILM_COLUMNS = FILM_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    title       TEXT    NOT NULL,
+    genre       TEXT    NOT NULL DEFAULT '',
+    description TEXT    NOT NULL DEFAULT '',
+    actors      TEXT    NOT NULL DEFAULT '',
+    poster      TEXT    NOT NULL DEFAULT '',
+    rating      REAL    NOT NULL DEFAULT 0,
+    votes       INTEGER NOT NULL DEFAULT 0,
+    rating_sum  INTEGER NOT NULL DEFAULT 0,
+    version     INTEGER NOT NULL DEFAULT 0,
+    poster_file_id TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS favorites (
+    user_id  INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL REFERENCES movies(id) ON DELETE CASCADE,
+    UNIQUE (user_id, movie_id)
+);
+CREATE INDEX IF NOT EXISTS favorites_movie ON favorites(movie_id);
+CREATE TABLE IF NOT EXISTS ratings (
+    user_id  INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL REFERENCES movies(id) ON DELETE CASCADE,
+    score    INTEGER NOT NULL,
+    PRIMARY KEY (user_id, movie_id)
+);
+CREATE INDEX IF NOT EXISTS ratings_movie ON ratings(movie_id);
+-- журнал змін фільмів для індексів у пам'яті інших процесів (рейтинги індексів не стосуються)
+CREATE TABLE IF NOT EXISTS movie_changes (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    movie_id INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS movies_added AFTER INSERT ON movies
+BEGIN INSERT INTO movie_changes (movie_id) VALUES (NEW.id); END;
+CREATE TRIGGER IF NOT EXISTS movies_edited AFTER UPDATE OF title, genre, description, actors ON movies
+BEGIN INSERT INTO movie_changes (movie_id) VALUES (NEW.id); END;
+CREATE TRIGGER IF NOT EXISTS movies_deleted AFTER DELETE ON movies
+BEGIN INSERT INTO movie_changes (movie_id) VALUES (OLD.id); END;
+"""
+
+# скільки останніх записів movie_changes зберігати; процес, що відстав більше, перебудовує індекси повністю
+CHANGES_KEEP = 10_000
+
+_SELECT_FILM = f"SELECT {', '.join(FILM_COLUMNS)} FROM movies"
+
+
+def _film(row: Optional[Tuple[Any, ...]]) -> Optional[Film]:
+    return Film(*row) if row is not None else None
+
+
+class SqliteDatabase:
+    """SQLite-сховище фільмів, обраного та рейтингів (WAL, точкові оновлення рядків).
+
+    Публічні методи збігаються з ``data.Database``, тож обробники не помічають різниці.
+    Пошуковий індекс та індекс жанрів тримаються в пам'яті й будуються з таблиці ``movies`` при відкритті.
+
+    Базу можуть одночасно використовувати кілька процесів бота: зміни пишуться
+    транзакціями, а тригери записують id змінених фільмів у ``movie_changes``.
+    Коли ``PRAGMA data_version`` показує чужий коміт, процес дочитує ці записи
+    й оновлює свої індекси (перед пошуком, жанрами та кожною зміною).
+    """
+
+    def __init__(self, path: str = SQLITE_FILE, migrate_from: Optional[str] = DATA_FILE) -> None:
+        self.path = Path(path)
+        self._lock = TimedLock(threading.RLock(), "sqlite")
+        self._search = SearchIndex()
+        self._genres = GenreIndex()
+        # останній побачений PRAGMA data_version і прочитаний запис movie_changes
+        self._data_version = 0
+        self._seen_change = 0
+        fresh = not self.path.exists()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        # вбудований lower() у SQLite не знає кирилиці
+        self._conn.create_function("casefold", 1, lambda s: (s or "").casefold(), deterministic=True)
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        if fresh and migrate_from and Path(migrate_from).exists():
+            count = self.import_json(migrate_from)
+            log.info("Перенесено %s фільмів з %s у %s", count, migrate_from, self.path)
+        self._rebuild_indexes()
+
+    # повна перебудова індексів у пам'яті
+    def _rebuild_indexes(self) -> None:
+        started = time.perf_counter()
+        self._seen_change = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM movie_changes").fetchone()[0]
+        self._search.rebuild(self._iter_films())
+        self._genres.rebuild(
+            Film(film_id, genre=genre) for film_id, genre in self._conn.execute("SELECT id, genre FROM movies ORDER BY id")
+        )
+        log.info("Індекси %s: %s фільмів за %.2f с", self.path, len(self._search), time.perf_counter() - started)
+
+    # дочитати зміни інших процесів і підготувати список жанрів, щоб перший запит цього не чекав
+    def warm_up(self) -> None:
+        with self._lock:
+            self._catch_up()
+            self._genres.genres()
+
+    # застосувати до індексів зміни, закомічені іншими процесами (викликається під self._lock)
+    def _catch_up(self) -> None:
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        first, last = self._conn.execute("SELECT MIN(seq), MAX(seq) FROM movie_changes").fetchone()
+        if last is None or last <= self._seen_change:
+            return
+        if first > self._seen_change + 1:
+            # потрібні записи вже обрізано
+            log.info("Індекси %s перебудовуються: журнал змін обрізано", self.path)
+            self._rebuild_indexes()
+            return
+        ids = [row[0] for row in self._conn.execute(
+            "SELECT DISTINCT movie_id FROM movie_changes WHERE seq > ? AND seq <= ?", (self._seen_change, last)
+        )]
+        found = {film.id: film for film in self._films_by_ids(ids)}
+        for film_id in ids:
+            film = found.get(film_id)
+            if film is None:
+                self._search.remove(film_id)
+                self._genres.remove(film_id)
+            else:
+                self._search.update(film)
+                self._genres.update(film)
+        self._seen_change = last
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # додати стовпці, яких немає в базах, створених старішою версією
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(movies)")}
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE movies ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "poster_file_id" not in columns:
+            self._conn.execute("ALTER TABLE movies ADD COLUMN poster_file_id TEXT NOT NULL DEFAULT ''")
+
+    # транзакція (BEGIN IMMEDIATE одразу бере блокування на запис). Спершу індекси доганяють
+    # чужі зміни; власні зміни методи вносять в індекси самі, тож їхні записи журналу позначаються прочитаними
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._catch_up()
+            yield
+            last = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM movie_changes").fetchone()[0]
+            if last > self._seen_change:
+                self._seen_change = last
+                self._conn.execute("DELETE FROM movie_changes WHERE seq <= ?", (last - CHANGES_KEEP,))
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _iter_films(self) -> Iterable[Film]:
+        for row in self._conn.execute(f"{_SELECT_FILM} ORDER BY id"):
+            yield _film(row)
+
+    # отримати всі фільми
+    def get_films(self) -> List[Film]:
+        with self._lock:
+            return list(self._iter_films())
+
+    # сторінка каталогу (у порядку id) та загальна кількість фільмів
+    def get_films_page(self, offset: int, limit: int) -> Tuple[List[Film], int]:
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+            rows = self._conn.execute(
+                f"{_SELECT_FILM} ORDER BY id LIMIT ? OFFSET ?", (int(limit), max(0, int(offset)))
+            )
+            return [_film(row) for row in rows], total
+
+    # пошук фільму за ID
+    def get_film_by_id(self, film_id: int) -> Optional[Film]:
+        with self._lock:
+            return _film(self._conn.execute(f"{_SELECT_FILM} WHERE id = ?", (int(film_id),)).fetchone())
+
+    # кілька фільмів за ID зі збереженням порядку (відсутні пропускаються)
+    def get_films_by_ids(self, ids: List[int]) -> List[Film]:
+        with self._lock:
+            return self._films_by_ids(ids)
+
+    def _films_by_ids(self, ids: List[int]) -> List[Film]:
+        if not ids:
+            return []
+        found: Dict[int, Film] = {}
+        # обмеження SQLite на кількість параметрів
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            for row in self._conn.execute(f"{_SELECT_FILM} WHERE id IN ({marks})", chunk):
+                found[row[0]] = _film(row)
+        return [found[i] for i in ids if i in found]
+
+    # випадковий фільм
+    def random_film(self) -> Optional[Film]:
+        with self._lock:
+            bounds = self._conn.execute("SELECT MIN(id), MAX(id) FROM movies").fetchone()
+            if bounds[0] is None:
+                return None
+            # випадкова точка в діапазоні id, без повного сканування таблиці
+            pivot = random.randint(bounds[0], bounds[1])
+            return _film(self._conn.execute(f"{_SELECT_FILM} WHERE id >= ? ORDER BY id LIMIT 1", (pivot,)).fetchone())
+
+    # пошук за текстовим запитом (найрелевантніші першими)
+    def search_films(self, query: str) -> List[Film]:
+        with self._lock:
+            self._catch_up()
+            return self._films_by_ids(self._search.search(query))
+
+    # те саме, але лише id фільмів (для посторінкового показу)
+    def search_film_ids(self, query: str) -> List[int]:
+        with self._lock:
+            self._catch_up()
+            return self._search.search(query)
+
+    # фільми жанру (за id або назвою жанру, точний збіг після нормалізації)
+    def filter_by_genre(self, genre: str) -> List[Film]:
+        with self._lock:
+            self._catch_up()
+            return self._films_by_ids(self._genres.film_ids(genre))
+
+    # усі жанри [(id, назва, кількість фільмів)] за абеткою
+    def get_genres(self) -> List[Tuple[str, str, int]]:
+        with self._lock:
+            self._catch_up()
+            return list(self._genres.genres())
+
+    # назва жанру за його id (None — такого жанру немає)
+    def get_genre_name(self, genre_id: str) -> Optional[str]:
+        with self._lock:
+            self._catch_up()
+            return self._genres.name(genre_id)
+
+    # сторінка фільмів жанру та їх загальна кількість
+    def get_genre_page(self, genre_id: str, offset: int, limit: int) -> Tuple[List[Film], int]:
+        with self._lock:
+            self._catch_up()
+            ids = self._genres.film_ids(genre_id)
+            offset = max(0, int(offset))
+            return self._films_by_ids(ids[offset:offset + limit]), len(ids)
+
+    # додати новий фільм
+    def add_film(self, title: str, genre: str, description: str = "", actors: str = "", poster: str = "") -> Film:
+        values = (title.strip(), genre.strip(), description.strip(), actors.strip(), poster.strip())
+        with self._lock, self._transaction():
+            cur = self._conn.execute(
+                "INSERT INTO movies (title, genre, description, actors, poster) VALUES (?, ?, ?, ?, ?)", values
+            )
+            film = self.get_film_by_id(cur.lastrowid)
+            self._search.add(film)
+            self._genres.add(film)
+            return film
+
+    # масове додавання (див. data.Database.add_films): одна транзакція, індекси перебудовуються один раз
+    def add_films(self, films: Iterable[Dict[str, str]]) -> List[Film]:
+        with self._lock:
+            with self._transaction():
+                titles = {normalize(title).strip() for (title,) in self._conn.execute("SELECT title FROM movies")}
+                # явні id після найбільшого з коли-небудь виданих (AUTOINCREMENT)
+                row = self._conn.execute(
+                    "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'movies'), 0), "
+                    "COALESCE((SELECT MAX(id) FROM movies), 0))"
+                ).fetchone()
+                first = next_id = row[0] + 1
+                rows = []
+                for film in films:
+                    key = normalize(film.get("title", "")).strip()
+                    if not key or key in titles:
+                        continue
+                    titles.add(key)
+                    rows.append((next_id, *(film.get(field, "").strip() for field in EDITABLE_FIELDS)))
+                    next_id += 1
+                self._conn.executemany(
+                    f"INSERT INTO movies (id, {', '.join(EDITABLE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+            if not rows:
+                return []
+            self._rebuild_indexes()
+            return [_film(row) for row in self._conn.execute(f"{_SELECT_FILM} WHERE id >= ? ORDER BY id", (first,))]
+
+    # видалити фільм (повертає назву видаленого фільму); обране й рейтинги чистить ON DELETE CASCADE
+    def delete_film(self, film_id: int) -> Optional[str]:
+        film_id = int(film_id)
+        with self._lock, self._transaction():
+            row = self._conn.execute("SELECT title FROM movies WHERE id = ?", (film_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM movies WHERE id = ?", (film_id,))
+            self._search.remove(film_id)
+            self._genres.remove(film_id)
+            return row[0] or "Невідомий фільм"
+
+    # додати/прибрати з обраного
+    def toggle_favorite(self, film_id: int, user_id: int) -> bool:
+        film_id, user_id = int(film_id), int(user_id)
+        with self._lock, self._transaction():
+            cur = self._conn.execute("DELETE FROM favorites WHERE user_id = ? AND movie_id = ?", (user_id, film_id))
+            if cur.rowcount:
+                return False
+            if self._conn.execute("SELECT 1 FROM movies WHERE id = ?", (film_id,)).fetchone() is None:
+                return False
+            self._conn.execute("INSERT INTO favorites (user_id, movie_id) VALUES (?, ?)", (user_id, film_id))
+            return True
+
+    # отримати список обраних (у порядку додавання)
+    def get_favorites(self, user_id: int) -> List[Film]:
+        columns = ", ".join(f"m.{c}" for c in FILM_COLUMNS)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM favorites f JOIN movies m ON m.id = f.movie_id "
+                "WHERE f.user_id = ? ORDER BY f.rowid",
+                (int(user_id),),
+            )
+            return [_film(row) for row in rows]
+
+    # усі оцінки та обране (див. data.Database.get_interactions)
+    def get_interactions(self) -> Tuple[Dict[int, Dict[int, int]], Dict[int, List[int]]]:
+        ratings: Dict[int, Dict[int, int]] = {}
+        favorites: Dict[int, List[int]] = {}
+        with self._lock:
+            for user_id, movie_id, score in self._conn.execute("SELECT user_id, movie_id, score FROM ratings"):
+                ratings.setdefault(user_id, {})[movie_id] = score
+            for user_id, movie_id in self._conn.execute("SELECT user_id, movie_id FROM favorites ORDER BY rowid"):
+                favorites.setdefault(user_id, []).append(movie_id)
+        return ratings, favorites
+
+    # додати рейтинг (агрегати sum/votes оновлюються інкрементально, O(1))
+    def add_rating(self, film_id: int, user_id: int, rating: int) -> float:
+        film_id, user_id, rating = int(film_id), int(user_id), int(rating)
+        with self._lock, self._transaction():
+            if self._conn.execute("SELECT 1 FROM movies WHERE id = ?", (film_id,)).fetchone() is None:
+                return 0.0
+            row = self._conn.execute(
+                "SELECT score FROM ratings WHERE user_id = ? AND movie_id = ?", (user_id, film_id)
+            ).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO ratings (user_id, movie_id, score) VALUES (?, ?, ?)", (user_id, film_id, rating)
+                )
+                delta_sum, delta_votes = rating, 1
+            else:
+                self._conn.execute(
+                    "UPDATE ratings SET score = ? WHERE user_id = ? AND movie_id = ?", (rating, user_id, film_id)
+                )
+                delta_sum, delta_votes = rating - row[0], 0
+            rating_sum, votes = self._conn.execute(
+                "UPDATE movies SET rating_sum = rating_sum + ?, votes = votes + ?, version = version + 1, "
+                "rating = ROUND(CAST(rating_sum + ? AS REAL) / (votes + ?), 2) "
+                "WHERE id = ? RETURNING rating_sum, votes",
+                (delta_sum, delta_votes, delta_sum, delta_votes, film_id),
+            ).fetchone()
+            return rating_sum / votes
+
+    # перевірка цілісності агрегатів рейтингу (див. data.Database.check_ratings)
+    def check_ratings(self, repair: bool = False) -> Dict[int, Dict[str, Tuple[int, int]]]:
+        with self._lock, self._transaction():
+            rows = self._conn.execute(
+                "SELECT m.id, m.rating_sum, m.votes, COALESCE(SUM(r.score), 0), COUNT(r.score) "
+                "FROM movies m LEFT JOIN ratings r ON r.movie_id = m.id GROUP BY m.id"
+            ).fetchall()
+            drift: Dict[int, Dict[str, Tuple[int, int]]] = {}
+            for film_id, stored_sum, stored_votes, actual_sum, actual_votes in rows:
+                if (stored_sum, stored_votes) != (actual_sum, actual_votes):
+                    drift[film_id] = {"stored": (stored_sum, stored_votes), "actual": (actual_sum, actual_votes)}
+                    if repair:
+                        self._conn.execute(
+                            "UPDATE movies SET rating_sum = ?, votes = ?, version = version + 1, "
+                            "rating = CASE WHEN ? > 0 THEN ROUND(CAST(? AS REAL) / ?, 2) ELSE 0 END WHERE id = ?",
+                            (actual_sum, actual_votes, actual_votes, actual_sum, actual_votes, film_id),
+                        )
+            return drift
+
+    # запам'ятати file_id постера (див. data.Database.set_poster_file_id)
+    def set_poster_file_id(self, film_id: int, poster: str, file_id: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE movies SET poster_file_id = ? WHERE id = ? AND poster = ?", (file_id, int(film_id), poster)
+            )
+            return cur.rowcount > 0
+
+    # оновити конкретне поле (для редагування адміністратором; expected — див. data.Database.update_field)
+    def update_field(self, film_id: int, field: str, value: str, expected: Optional[str] = None) -> bool:
+        if field not in EDITABLE_FIELDS:
+            return False
+        # новий постер — старий file_id більше не підходить
+        reset = ", poster_file_id = ''" if field == "poster" else ""
+        with self._lock, self._transaction():
+            cur = self._conn.execute(
+                f"UPDATE movies SET {field} = ?, version = version + 1{reset} WHERE id = ? AND (? IS NULL OR {field} = ?)",
+                (value.strip() if value != "-" else "", int(film_id), expected, expected),
+            )
+            if cur.rowcount and field != "poster":
+                film = self.get_film_by_id(film_id)
+                self._search.update(film)
+                if field == "genre":
+                    self._genres.update(film)
+            return cur.rowcount > 0
+
+    # одноразовий перенос даних з JSON-сховища (id, обране й оцінки зберігаються);
+    # читається через data.Database, тож незгорнуті записи журналу data.json.journal теж переносяться
+    def import_json(self, json_path: str) -> int:
+        if not Path(json_path).exists():
+            raise FileNotFoundError(json_path)
+        source = Database(json_path, flush_delay=0)
+        try:
+            movies = source.get_films()
+            ratings, favorites = source.get_interactions()
+        finally:
+            source.close()
+        with self._lock, self._transaction():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO movies (id, title, genre, description, actors, poster, poster_file_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(m.id, m.title, m.genre, m.description, m.actors, m.poster, m.poster_file_id) for m in movies],
+            )
+            known = {m.id for m in movies}
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO favorites (user_id, movie_id) VALUES (?, ?)",
+                [(uid, mid) for uid, ids in favorites.items() for mid in ids if mid in known],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ratings (user_id, movie_id, score) VALUES (?, ?, ?)",
+                [(uid, mid, score) for uid, user_map in ratings.items() for mid, score in user_map.items() if mid in known],
+            )
+        # агрегати рахуються з перенесених оцінок, а не копіюються
+        self.check_ratings(repair=True)
+        return len(movies)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Перенос data.json у SQLite")
+    parser.add_argument("source", nargs="?", default=DATA_FILE)
+    parser.add_argument("target", nargs="?", default=SQLITE_FILE)
+    args = parser.parse_args()
+
+    db = SqliteDatabase(args.target, migrate_from=None)
+    print(f"Перенесено фільмів: {db.import_json(args.source)} → {args.target}")
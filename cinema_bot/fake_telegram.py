@@ -0,0 +1,93 @@
+# Сесія Telegram без мережі для перевірок і навантажувальних тестів 🧪
+
+import asyncio
+import datetime
+import itertools
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Union
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, SendMessage, SendPhoto, TelegramMethod
+from aiogram.types import Chat, Message, PhotoSize
+
+
+class FakeTelegramSession(BaseSession):
+    """Замінник сесії aiogram, що нічого не надсилає, а записує виклики в ``calls``.
+
+    Імітує обмеження Telegram так, як їх бачить бот: не більше ``chat_limit``
+    запитів за ``chat_period`` секунд в особистий чат (``group_limit`` за
+    ``group_period`` — у групу чи канал) і ``global_limit`` за секунду загалом.
+    Запит понад ліміт отримує ``TelegramRetryAfter`` і лічиться у ``floods``.
+    ``latency`` — штучна затримка кожної відповіді.
+    """
+
+    def __init__(
+        self,
+        chat_limit: int = 5,
+        chat_period: float = 1.0,
+        group_limit: int = 20,
+        group_period: float = 60.0,
+        global_limit: int = 30,
+        latency: float = 0.0,
+    ) -> None:
+        super().__init__()
+        self.chat_limit, self.chat_period = chat_limit, chat_period
+        self.group_limit, self.group_period = group_limit, group_period
+        self.global_limit = global_limit
+        self.latency = latency
+        self.calls: List[TelegramMethod] = []
+        self.floods = 0
+        self._sent: Dict[Union[int, str, None], Deque[float]] = {}
+        self._ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    # скільки ще чекати, якщо вікно ліміту вже заповнене (0 — можна)
+    def _retry_after(self, key: Union[int, str, None], limit: int, period: float, now: float) -> float:
+        window = self._sent.setdefault(key, deque())
+        while window and window[0] <= now - period:
+            window.popleft()
+        return window[0] + period - now if len(window) >= limit else 0.0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None or isinstance(method, AnswerCallbackQuery):
+            now = time.monotonic()
+            wait = self._retry_after(None, self.global_limit, 1.0, now)
+            if chat_id is not None:
+                group = isinstance(chat_id, str) or chat_id < 0
+                limit, period = (self.group_limit, self.group_period) if group else (self.chat_limit, self.chat_period)
+                wait = max(wait, self._retry_after(chat_id, limit, period, now))
+            if wait > 0:
+                self.floods += 1
+                raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=wait)
+            self._sent[None].append(now)
+            if chat_id is not None:
+                self._sent[chat_id].append(now)
+        self.calls.append(method)
+        return self._result(method)
+
+    # правдоподібна відповідь Telegram на метод
+    def _result(self, method: TelegramMethod) -> Any:
+        if isinstance(method, (SendMessage, SendPhoto)):
+            message_id = next(self._ids)
+            photo = None
+            if isinstance(method, SendPhoto):
+                photo = [PhotoSize(file_id=f"photo-{message_id}", file_unique_id=f"u{message_id}", width=800, height=1200)]
+            return Message(
+                message_id=message_id,
+                date=datetime.datetime.now(),
+                chat=Chat(id=method.chat_id, type="private" if isinstance(method.chat_id, int) and method.chat_id > 0 else "group"),
+                text=getattr(method, "text", None),
+                caption=getattr(method, "caption", None),
+                photo=photo,
+            )
+        return True
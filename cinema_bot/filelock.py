@@ -0,0 +1,77 @@
+# Замок між процесами на окремому файлі 🔐
+
+import threading
+from typing import Any, BinaryIO, Optional
+
+try:
+    import fcntl
+
+    def _lock(fh: BinaryIO) -> None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(fh: BinaryIO) -> None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(fh: BinaryIO) -> None:
+        fh.seek(0)
+        while True:
+            try:
+                # LK_LOCK сам повторює спробу 10 разів по секунді, далі OSError
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock(fh: BinaryIO) -> None:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Ексклюзивний замок на файлі ``path`` (fcntl.flock, у Windows — msvcrt.locking).
+
+    Між процесами блокує ОС, між потоками одного процесу — звичайний RLock
+    (flock не розрізняє потоки). Повторний захват тим самим потоком дозволено.
+    Інтерфейс як у ``threading.Lock``, тож його можна обгорнути в ``metrics.TimedLock``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fh: Optional[BinaryIO] = None
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not self._thread_lock.acquire(blocking, timeout):
+            return False
+        if self._depth == 0:
+            try:
+                if self._fh is None:
+                    self._fh = open(self.path, "a+b")
+                _lock(self._fh)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock(self._fh)
+        self._thread_lock.release()
+
+    def close(self) -> None:
+        with self._thread_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
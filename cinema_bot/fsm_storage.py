@@ -0,0 +1,152 @@
+# Постійне сховище станів FSM з автоматичним очищенням ⏳
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from config import FSM_EVICT_INTERVAL, FSM_FILE, FSM_STATE_TTL, FSM_TTL
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key        TEXT PRIMARY KEY,
+    state      TEXT,
+    data       TEXT NOT NULL DEFAULT '{}',
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_expires ON fsm(expires_at);
+"""
+
+
+# рядковий ключ запису з усіх частин StorageKey
+def _key(key: StorageKey) -> str:
+    return ":".join(str(part) for part in (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny,
+    ))
+
+
+class SqliteStorage(BaseStorage):
+    """Сховище станів aiogram у SQLite-файлі з терміном життя для кожного стану.
+
+    Стан і дані користувача переживають перезапуск бота. Кожен запис має термін
+    дії (``state_ttls`` за повною назвою стану або групою, інакше ``default_ttl``),
+    що продовжується при кожній зміні; прострочені записи вважаються порожніми
+    і періодично видаляються, тож покинуті діалоги не накопичуються.
+    """
+
+    def __init__(
+        self,
+        path: str = FSM_FILE,
+        default_ttl: float = FSM_TTL,
+        state_ttls: Optional[Mapping[str, float]] = None,
+        evict_interval: float = FSM_EVICT_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.default_ttl = default_ttl
+        self.state_ttls = dict(FSM_STATE_TTL if state_ttls is None else state_ttls)
+        self.evict_interval = evict_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # один потік: запити до SQLite короткі, а порядок змін для користувача зберігається
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm")
+        self._evictor: Optional[asyncio.Task] = None
+        self.evict_expired()
+
+    # термін життя стану: точна назва ("AddFilm:title"), потім група ("AddFilm")
+    def ttl_for(self, state: Optional[str]) -> float:
+        if state is None:
+            return self.default_ttl
+        if state in self.state_ttls:
+            return self.state_ttls[state]
+        return self.state_ttls.get(state.split(":", 1)[0], self.default_ttl)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._evictor is None and self.evict_interval > 0:
+            self._evictor = asyncio.create_task(self._evict_loop())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _evict_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self.evict_expired)
+            except Exception:
+                logger.exception("Не вдалося очистити прострочені стани FSM")
+
+    # видалити прострочені записи, повертає їх кількість
+    def evict_expired(self) -> int:
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM fsm WHERE expires_at <= ?", (time.time(),)).rowcount
+        if removed:
+            logger.info("FSM: видалено %d прострочених станів", removed)
+        return removed
+
+    # (стан, дані) або (None, {}) для відсутнього чи простроченого запису
+    def _load(self, key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, data, expires_at FROM fsm WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[2] <= time.time():
+            return None, {}
+        return row[0], json.loads(row[1])
+
+    # записати стан і дані; порожній запис видаляється
+    def _store(self, key: str, state: Optional[str], data: Dict[str, Any]) -> None:
+        with self._lock:
+            if state is None and not data:
+                self._conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+                return
+            self._conn.execute(
+                "INSERT INTO fsm (key, state, data, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                "expires_at = excluded.expires_at",
+                (key, state, json.dumps(data, ensure_ascii=False), time.time() + self.ttl_for(state)),
+            )
+
+    def _set_state(self, key: str, state: Optional[str]) -> None:
+        self._store(key, state, self._load(key)[1])
+
+    def _set_data(self, key: str, data: Dict[str, Any]) -> None:
+        self._store(key, self._load(key)[0], data)
+
+    def _update_data(self, key: str, data: Mapping[str, Any]) -> Dict[str, Any]:
+        state, current = self._load(key)
+        current.update(data)
+        self._store(key, state, current)
+        return current.copy()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._run(self._set_state, _key(key), state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._run(self._load, _key(key)))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._run(self._set_data, _key(key), dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._run(self._load, _key(key)))[1]
+
+    # читання й запис за один виклик у потоці сховища
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        return await self._run(self._update_data, _key(key), dict(data))
+
+    async def close(self) -> None:
+        if self._evictor is not None:
+            self._evictor.cancel()
+            self._evictor = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._conn.close)
+        await loop.run_in_executor(None, self._executor.shutdown)
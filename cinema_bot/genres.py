@@ -0,0 +1,118 @@
+# Індекс жанрів: жанр → фільми 🎭
+
+import bisect
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+from records import Film
+from search import normalize
+
+# роздільники кількох жанрів в одному полі: "Комедія, Драма", "Комедія / Драма"
+_SPLIT_RE = re.compile(r"[,;/|]")
+_SPACES_RE = re.compile(r"\s+")
+
+
+# окремі жанри поля genre: [(ключ, назва для показу)] без повторів
+def split_genres(text: str) -> List[Tuple[str, str]]:
+    result: Dict[str, str] = {}
+    for part in _SPLIT_RE.split(text or ""):
+        label = _SPACES_RE.sub(" ", part).strip()
+        if label:
+            result.setdefault(normalize(label), label)
+    return list(result.items())
+
+
+# короткий стабільний id жанру для callback_data (не змінюється між перезапусками)
+def genre_id(key: str) -> str:
+    return f"{zlib.crc32(key.encode('utf-8')):08x}"
+
+
+class GenreIndex:
+    """Нормалізований індекс жанр → id фільмів (за зростанням id).
+
+    Поле ``genre`` розбивається на окремі жанри за комами, регістр і пробіли
+    нормалізуються, тож "Драма" не збігається з "Мелодрама", а "Комедія, Драма"
+    потрапляє в обидва жанри. Оновлюється інкрементально разом зі сховищем.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        # ключ жанру → відсортовані id фільмів
+        self._ids: Dict[str, List[int]] = {}
+        # ключ жанру → назва для показу (як її вперше написали)
+        self._labels: Dict[str, str] = {}
+        # короткий id → ключ жанру
+        self._by_gid: Dict[str, str] = {}
+        # id фільму → ключі його жанрів (для видалення/оновлення)
+        self._film_genres: Dict[int, List[str]] = {}
+        # відсортований список для /genres, будується ліниво
+        self._listing: Optional[List[Tuple[str, str, int]]] = None
+
+    # повна перебудова індексу
+    def rebuild(self, films: Iterable[Film]) -> None:
+        self._reset()
+        for film in films:
+            self.add(film)
+
+    # додати фільм
+    def add(self, film: Film) -> None:
+        film_id = film.id
+        keys = []
+        for key, label in split_genres(film.genre):
+            ids = self._ids.get(key)
+            if ids is None:
+                ids = self._ids[key] = []
+                self._labels[key] = label
+                self._by_gid[genre_id(key)] = key
+            if not ids or ids[-1] < film_id:
+                ids.append(film_id)
+            else:
+                bisect.insort(ids, film_id)
+            keys.append(key)
+        if keys:
+            self._film_genres[film_id] = keys
+            self._listing = None
+
+    # видалити фільм
+    def remove(self, film_id: int) -> None:
+        keys = self._film_genres.pop(film_id, ())
+        for key in keys:
+            ids = self._ids[key]
+            del ids[bisect.bisect_left(ids, film_id)]
+            if not ids:
+                del self._ids[key], self._labels[key], self._by_gid[genre_id(key)]
+        if keys:
+            self._listing = None
+
+    # оновити фільм після редагування жанру
+    def update(self, film: Film) -> None:
+        self.remove(film.id)
+        self.add(film)
+
+    # ключ жанру за коротким id або (для старих кнопок) за назвою
+    def _resolve(self, ref: str) -> Optional[str]:
+        key = self._by_gid.get(ref)
+        if key is None:
+            key = normalize(_SPACES_RE.sub(" ", (ref or "").replace("_", " ")).strip())
+        return key if key in self._ids else None
+
+    # усі жанри [(id, назва, кількість фільмів)] за абеткою
+    def genres(self) -> List[Tuple[str, str, int]]:
+        if self._listing is None:
+            self._listing = sorted(
+                ((genre_id(key), self._labels[key], len(ids)) for key, ids in self._ids.items()),
+                key=lambda item: normalize(item[1]),
+            )
+        return self._listing
+
+    # назва жанру за id (None — жанру немає)
+    def name(self, ref: str) -> Optional[str]:
+        key = self._resolve(ref)
+        return self._labels[key] if key is not None else None
+
+    # id фільмів жанру за його id або назвою
+    def film_ids(self, ref: str) -> List[int]:
+        key = self._resolve(ref)
+        return self._ids[key] if key is not None else []
@@ -0,0 +1,142 @@
+# Потоковий розбір JSON-об'єкта чи масиву верхнього рівня без читання файлу цілком 🌊
+#
+# Файл читається шматками по CHUNK символів, значення розбираються
+# json.JSONDecoder.raw_decode по одному: великі масиви й об'єкти
+# віддаються поелементно, тож у пам'яті одночасно лише один елемент і буфер.
+
+import json
+import re
+from typing import Any, Callable, Container, Iterator, Optional, TextIO, Tuple
+
+CHUNK = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    """Буфер над текстовим потоком: пропуск пробілів, окремі символи та цілі JSON-значення."""
+
+    def __init__(self, fh: TextIO, chunk: int = CHUNK) -> None:
+        self._fh = fh
+        self._chunk = chunk
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    # дочитати ще size символів (прочитане раніше за _pos відкидається); False — кінець файлу
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        data = self._fh.read(size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buf, self._pos)
+
+    # наступний значущий символ без його споживання ("" — кінець файлу)
+    def peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._chunk):
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self.error(f"Очікувався {char!r}")
+        self._pos += 1
+
+    # спожити наступний символ, який має бути одним з chars
+    def _next(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise self.error(f"Очікувався один із {chars!r}")
+        self._pos += 1
+        return char
+
+    # ціле JSON-значення
+    def value(self) -> Any:
+        self.peek()
+        size = self._chunk
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # значення ще не дочитане; для довгих значень шматки ростуть, щоб не розбирати їх знову й знову
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # число в самому кінці буфера може продовжуватися в наступному шматку
+            if end == len(self._buf) and self._fill(size):
+                continue
+            self._pos = end
+            return obj
+
+    # елементи масиву по одному
+    def array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._next(",]") == "]":
+                return
+
+    # пари (ключ, значення) об'єкта по одній; read_value читає значення за ключем
+    def members(self, read_value: Optional[Callable[[str], Any]] = None) -> Iterator[Tuple[str, Any]]:
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self.error("Очікувався ключ")
+            key = self.value()
+            self.expect(":")
+            yield key, read_value(key) if read_value else self.value()
+            if self._next(",}") == "}":
+                return
+
+
+# поля об'єкта верхнього рівня у файлі fh: (ключ, значення). Для ключів зі streamed
+# значення-масив віддається ітератором елементів, а значення-об'єкт — ітератором пар
+# (ключ, значення); ітератор треба вичерпати до переходу до наступного поля
+# (якщо його покинути раніше, решта пропускається автоматично). Порожній файл — жодного поля
+def iter_object(fh: TextIO, streamed: Container[str] = ()) -> Iterator[Tuple[str, Any]]:
+    scanner = _Scanner(fh)
+    if scanner.peek() == "":
+        return
+
+    def read_value(key: str) -> Any:
+        if key in streamed:
+            char = scanner.peek()
+            if char == "[":
+                return scanner.array()
+            if char == "{":
+                return scanner.members()
+        return scanner.value()
+
+    for key, value in scanner.members(read_value):
+        yield key, value
+        if isinstance(value, Iterator):
+            for _ in value:
+                pass
+    if scanner.peek() != "":
+        raise scanner.error("Зайві дані після JSON")
+
+
+# елементи JSON-масиву верхнього рівня у файлі fh по одному (імпорт каталогу з .json)
+def iter_array(fh: TextIO) -> Iterator[Any]:
+    scanner = _Scanner(fh)
+    yield from scanner.array()
+    if scanner.peek() != "":
+        raise scanner.error("Зайві дані після JSON")
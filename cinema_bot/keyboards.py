@@ -1,29 +1,51 @@
+from functools import lru_cache
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
-# головне меню
-def main_menu():
+# скільки готових клавіатур для окремих фільмів (оцінка, редагування, видалення) тримати в пам'яті
+FILM_KEYBOARDS_CACHE = 512
+
+# кнопки головного меню (їх текст приходить як звичайне повідомлення)
+MENU_BUTTONS = ("🎬 /films", "🔎 /search", "🎭 /genres", "🎲 /random", "⭐ /favorites")
+
+# головне меню (будується один раз)
+def _build_main_menu():
     b = ReplyKeyboardBuilder()
-    b.button(text="🎬 /films")
-    b.button(text="🔎 /search")
-    b.button(text="🎭 /genres")
-    b.button(text="🎲 /random")
-    b.button(text="⭐ /favorites")
+    for text in MENU_BUTTONS:
+        b.button(text=text)
     b.adjust(2)
     return b.as_markup(resize_keyboard=True)
 
-# список фільмів
-def films_keyboard(films, prefix="movie_"):
+_MAIN_MENU = _build_main_menu()
+
+def main_menu():
+    return _MAIN_MENU
+
+# список фільмів; зі scope — одна сторінка з кнопками ⬅️ / ➡️ (callback "page_<offset>_<scope>")
+def films_keyboard(films, prefix="movie_", scope=None, offset=0, total=0, page_size=0):
     b = InlineKeyboardBuilder()
     for f in films:
-        b.button(text=f"🎬 {f['title']}", callback_data=f"{prefix}{f['id']}")
-    b.adjust(1)
+        b.button(text=f"🎬 {f.title}", callback_data=f"{prefix}{f.id}")
+    sizes = [1] * len(films)
+    if scope is not None and total > page_size > 0:
+        nav = 0
+        if offset > 0:
+            b.button(text="⬅️", callback_data=f"page_{max(0, offset - page_size)}_{scope}")
+            nav += 1
+        pages = (total + page_size - 1) // page_size
+        b.button(text=f"{offset // page_size + 1}/{pages}", callback_data="noop")
+        nav += 1
+        if offset + page_size < total:
+            b.button(text="➡️", callback_data=f"page_{offset + page_size}_{scope}")
+            nav += 1
+        sizes.append(nav)
+    b.adjust(*(sizes or [1]))
     return b
 
-# список жанрів
+# список жанрів: [(id жанру, назва, кількість фільмів)]
 def genres_keyboard(genres):
     b = InlineKeyboardBuilder()
-    for g in genres:
-        b.button(text=f"🎭 {g}", callback_data=f"genre_{g.replace(' ', '_')}")
+    for genre_id, name, count in genres:
+        b.button(text=f"🎭 {name} ({count})", callback_data=f"genre_{genre_id}")
     b.adjust(2)
     return b
 
@@ -38,23 +60,26 @@ def film_actions(id, admin: bool = False):
     b.adjust(2)
     return b
 
-# клавіатура для виставлення рейтингу
+# клавіатура для виставлення рейтингу (готова розмітка, кешується)
+@lru_cache(maxsize=FILM_KEYBOARDS_CACHE)
 def rating_keyboard(id):
     b = InlineKeyboardBuilder()
     for i in range(1, 11):
         b.button(text=str(i), callback_data=f"rate_{id}_{i}")
     b.adjust(5)
-    return b
+    return b.as_markup()
 
-# підтвердження видалення
+# підтвердження видалення (готова розмітка, кешується)
+@lru_cache(maxsize=FILM_KEYBOARDS_CACHE)
 def confirm_delete_keyboard(film_id):
     b = InlineKeyboardBuilder()
     b.button(text="✅ Так, видалити", callback_data=f"confirm_delete_{film_id}")
     b.button(text="❌ Ні, скасувати", callback_data="cancel_delete")
     b.adjust(2)
-    return b
+    return b.as_markup()
 
-# меню редагування полів фільму
+# меню редагування полів фільму (готова розмітка, кешується)
+@lru_cache(maxsize=FILM_KEYBOARDS_CACHE)
 def edit_keyboard(id):
     b = InlineKeyboardBuilder()
     b.button(text="🎬 Назва", callback_data=f"editfield_{id}_title")
@@ -63,4 +88,4 @@ def edit_keyboard(id):
     b.button(text="👤 Актори", callback_data=f"editfield_{id}_actors")
     b.button(text="🖼 Постер", callback_data=f"editfield_{id}_poster")
     b.adjust(2)
-    return b
+    return b.as_markup()
@@ -0,0 +1,291 @@
+# Метрики гарячих шляхів та експорт у форматі Prometheus 📈
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple, Union
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, TelegramObject
+from keyboards import MENU_BUTTONS
+
+log = logging.getLogger(__name__)
+
+# межі кошиків гістограм, секунди
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(values: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гістограма тривалостей з мітками (потокобезпечна, фіксовані кошики)."""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # мітки → [лічильники кошиків..., +Inf], сума, кількість
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    # заміряти тривалість блоку
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    # наближений квантиль (верхня межа кошика) для кожного набору міток
+    def summary(self, q: float) -> List[Tuple[Labels, int, float, float]]:
+        rows = []
+        with self._lock:
+            for key, (counts, (total, count)) in self._series.items():
+                rank, seen, value = q * count, 0, float("inf")
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    seen += n
+                    if seen >= rank:
+                        value = bound
+                        break
+                rows.append((key, count, total, value))
+        return rows
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(c), list(s)) for k, (c, s) in self._series.items())
+        for key, counts, (total, count) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    """Лічильник з мітками."""
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in values)
+        return lines
+
+
+class Collector:
+    """Значення, що зчитуються в момент експорту (глибина черг, лічильники інших модулів).
+
+    ``fn`` повертає число або {мітки (кортеж пар ім'я-значення): значення}.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable[[], Union[float, Dict[Labels, float]]]) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.fn()
+        except Exception:
+            log.exception("Не вдалося зібрати метрику %s", self.name)
+            return lines
+        if isinstance(value, dict):
+            lines.extend(f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(value.items()))
+        else:
+            lines.append(f"{self.name} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    """Набір метрик бота; ``render()`` віддає текстовий формат Prometheus."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Union[Histogram, Counter, Collector]] = {}
+
+    def histogram(self, name: str, help: str) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help))
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help))
+
+    # значення, що читається при кожному експорті; повторна реєстрація замінює попереднє
+    def collector(self, name: str, help: str, fn: Callable[[], Any], kind: str = "gauge") -> None:
+        self._metrics[name] = Collector(name, help, kind, fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    # короткий звіт для логу: найповільніші серії кожної гістограми
+    def summary(self, top: int = 5) -> str:
+        parts = []
+        for metric in self._metrics.values():
+            if not isinstance(metric, Histogram):
+                continue
+            p50 = {key: value for key, _, _, value in metric.summary(0.5)}
+            rows = sorted(metric.summary(0.99), key=lambda row: row[2], reverse=True)[:top]
+            for key, count, total, p99 in rows:
+                label = ",".join(v for _, v in key) or "-"
+                parts.append(
+                    f"{metric.name}[{label}] n={count} avg={total / count * 1000:.1f}ms "
+                    f"p50≤{p50[key] * 1000:.1f}ms p99≤{p99 * 1000:.1f}ms"
+                )
+        return "\n".join(parts) or "немає даних"
+
+
+REGISTRY = Registry()
+
+HANDLER_SECONDS = REGISTRY.histogram("cinema_handler_seconds", "Тривалість обробників за командою/префіксом кнопки")
+DB_CALL_SECONDS = REGISTRY.histogram("cinema_db_call_seconds", "Тривалість виклику сховища в потоці")
+DB_QUEUE_SECONDS = REGISTRY.histogram("cinema_db_queue_seconds", "Очікування вільного потоку сховища")
+DB_LOCK_SECONDS = REGISTRY.histogram("cinema_db_lock_wait_seconds", "Очікування замка сховища")
+API_SECONDS = REGISTRY.histogram("cinema_telegram_request_seconds", "Тривалість запитів до Telegram API")
+API_ERRORS = REGISTRY.counter("cinema_telegram_errors_total", "Помилки запитів до Telegram API")
+
+
+class TimedLock:
+    """Обгортка над замком, що записує час очікування на нього в ``DB_LOCK_SECONDS``."""
+
+    __slots__ = ("_lock", "_name")
+
+    def __init__(self, lock: Any, name: str) -> None:
+        self._lock = lock
+        self._name = name
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        DB_LOCK_SECONDS.observe(time.perf_counter() - start, backend=self._name)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc: Any) -> None:
+        self._lock.release()
+
+
+# мітка події: команда ("/films"), кнопка меню, "text" для вільного тексту або префікс кнопки ("rate")
+def event_key(event: TelegramObject) -> str:
+    if isinstance(event, CallbackQuery):
+        return (event.data or "").split("_", 1)[0] or "-"
+    text = getattr(event, "text", None) or ""
+    if text.startswith("/"):
+        return text.split(maxsplit=1)[0].split("@", 1)[0]
+    if text in MENU_BUTTONS:
+        return text[text.index("/"):]
+    return "text" if text else type(event).__name__.lower()
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутрішня middleware роутера: тривалість кожного обробника з міткою події."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "-")
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, handler=name, event=event_key(event))
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сесії бота: тривалість кожного запиту до Telegram і лічильник помилок."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        name = type(method).__name__
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - start, method=name)
+
+
+# HTTP-сервер з /metrics для Prometheus
+async def start_exporter(host: str, port: int):
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Метрики: http://%s:%s/metrics", host, port)
+    return runner
+
+
+# періодично писати в лог зведення найповільніших обробників і викликів
+async def log_summary(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        log.info("Метрики за весь час роботи:\n%s", REGISTRY.summary())
@@ -9,6 +9,9 @@ class AddFilm(StatesGroup):
     actors = State()
     poster = State()
 
+class ImportFilms(StatesGroup):
+    file = State()
+
 class EditFilm(StatesGroup):
     field = State()       
     new_value = State()
\ No newline at end of file
@@ -0,0 +1,168 @@
+# Профілювання працюючого бота: вибірковий CPU-профіль і приріст пам'яті за вікно 🔬
+#
+# Поза вікном нічого не працює: потік вибірок і tracemalloc запускаються лише
+# на час профілю (команда /profile або SIGUSR1, див. bot.py).
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Tuple
+from config import PROFILE_DIR, PROFILE_FRAMES, PROFILE_INTERVAL, PROFILE_SECONDS, PROFILE_TOP
+
+log = logging.getLogger(__name__)
+
+# де потоки просто чекають (цикл подій на select, пул сховища на черзі) — це не навантаження
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+
+
+def _where(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
+
+
+def _function(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno} {code.co_name}"
+
+
+class Sampler:
+    """Потік, що кожні ``interval`` секунд знімає стеки всіх потоків через ``sys._current_frames()``.
+
+    ``own`` — де саме виконувався код (верхній кадр), ``total`` — функції на
+    стеку разом з викликаними, ``stacks`` — згорнуті стеки для flamegraph.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.idle = 0
+        self.own: Counter = Counter()
+        self.total: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self.samples += 1
+                if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    self.idle += 1
+                    continue
+                self.own[_where(frame)] += 1
+                path, seen = [], set()
+                while frame is not None:
+                    name = _function(frame)
+                    path.append(name)
+                    if name not in seen:  # рекурсія рахується один раз
+                        seen.add(name)
+                        self.total[name] += 1
+                    frame = frame.f_back
+                path.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(path))] += 1
+
+
+# одночасно знімається лише один профіль
+_active = threading.Lock()
+
+
+def _format_cpu(title: str, counts: Counter, active: int, top: int) -> List[str]:
+    lines = [title]
+    for name, n in counts.most_common(top):
+        lines.append(f"  {n / active * 100:5.1f}%  {name}")
+    return lines
+
+
+def _format_memory(stats: List[tracemalloc.StatisticDiff], top: int) -> List[str]:
+    lines = [f"Пам'ять — приріст за вікно (топ {top}):"]
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        where = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+        lines.append(f"  {stat.size_diff / 1024:+9.1f} КіБ  {stat.count_diff:+7d} блоків  {where}")
+    return lines
+
+
+# звіт і файли на диску: <PROFILE_DIR>/profile-<час>.txt та .collapsed (для flamegraph.pl / speedscope)
+def _write_report(
+    sampler: Sampler,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    seconds: float,
+    top: int,
+) -> Tuple[str, str]:
+    active = max(1, sampler.samples - sampler.idle)
+    lines = [
+        f"Профіль за {seconds:.0f} с: {sampler.samples} вибірок, з них у роботі {sampler.samples - sampler.idle}",
+        "",
+        *_format_cpu(f"CPU — де виконувався код (топ {top}):", sampler.own, active, top),
+        "",
+        *_format_cpu(f"CPU — разом з викликаними функціями (топ {top}):", sampler.total, active, top),
+    ]
+    # без власних виділень профілювальника
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    lines += ["", *_format_memory(stats, top)]
+    report = "\n".join(lines)
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, time.strftime("profile-%Y%m%d-%H%M%S"))
+    with open(path + ".txt", "w", encoding="utf-8") as fh:
+        fh.write(report + "\n")
+    with open(path + ".collapsed", "w", encoding="utf-8") as fh:
+        fh.writelines(f"{stack} {n}\n" for stack, n in sampler.stacks.most_common())
+    log.info("Профіль збережено: %s.txt", path)
+    return report, path + ".txt"
+
+
+# зняти профіль за seconds секунд; повертає (текст звіту, шлях до файлу).
+# RuntimeError — якщо інше профілювання ще триває
+async def capture(seconds: float = PROFILE_SECONDS, top: int = PROFILE_TOP) -> Tuple[str, str]:
+    if not _active.acquire(blocking=False):
+        raise RuntimeError("профілювання вже триває")
+    try:
+        # якщо tracemalloc уже ввімкнено ззовні (PYTHONTRACEMALLOC), його не вимикаємо
+        own_tracing = not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start(PROFILE_FRAMES)
+        before = tracemalloc.take_snapshot()
+        sampler = Sampler()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            if own_tracing:
+                tracemalloc.stop()
+        # порівняння знімків і запис файлів — не в циклі подій
+        return await asyncio.get_running_loop().run_in_executor(
+            None, _write_report, sampler, before, after, seconds, top,
+        )
+    finally:
+        _active.release()
+
+
+# для обробника сигналу: профіль пишеться лише в лог і файл
+async def capture_to_log(seconds: float = PROFILE_SECONDS) -> None:
+    try:
+        report, _ = await capture(seconds)
+    except RuntimeError as e:
+        log.warning("Профіль не знято: %s", e)
+        return
+    log.info("Профіль за %s с:\n%s", seconds, report)
@@ -0,0 +1,262 @@
+# Черга та обмеження частоти вихідних запитів до Telegram 🚦
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    EditMessageCaption,
+    EditMessageMedia,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    TelegramMethod,
+)
+from config import (
+    SEND_CHAT_BURST,
+    SEND_CHAT_RATE,
+    SEND_GLOBAL_BURST,
+    SEND_GLOBAL_RATE,
+    SEND_GROUP_BURST,
+    SEND_GROUP_RATE,
+    SEND_MAX_RETRIES,
+)
+
+log = logging.getLogger(__name__)
+
+# пріоритети черги: менше число — раніше
+PRIORITY_INTERACTIVE = 0  # відповіді на натискання кнопок, редагування повідомлень
+PRIORITY_NORMAL = 1       # звичайні відповіді на повідомлення
+PRIORITY_BULK = 2         # масові розсилки (див. bulk_sends)
+
+_INTERACTIVE_METHODS = (AnswerCallbackQuery, EditMessageText, EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup)
+# скільки відер окремих чатів тримати, перш ніж прибирати невикористані
+CHAT_BUCKETS_LIMIT = 10_000
+
+_bulk: contextvars.ContextVar[bool] = contextvars.ContextVar("bulk_sends", default=False)
+
+
+# усі надсилання всередині блоку стають у чергу за інтерактивними та звичайними
+@contextmanager
+def bulk_sends() -> Iterator[None]:
+    token = _bulk.set(True)
+    try:
+        yield
+    finally:
+        _bulk.reset(token)
+
+
+class TokenBucket:
+    """Відро токенів: ``rate`` запитів за секунду в середньому, не більше ``capacity`` підряд."""
+
+    __slots__ = ("rate", "capacity", "tokens", "stamp", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic() if now is None else now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.stamp:
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+
+    # через скільки секунд з'явиться токен (0 — вже є)
+    def delay(self, now: float) -> float:
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    # забрати токен (після delay() == 0)
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    # спробувати забрати токен одразу
+    def try_consume(self, now: float) -> bool:
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    # не видавати токени до моменту until (відповідь RetryAfter від Telegram)
+    def block(self, until: float) -> None:
+        self.blocked_until = max(self.blocked_until, until)
+
+    # відро повне й не заблоковане — його можна забути без втрати інформації
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+# чи рахується запит у ліміти (надсилання в чат та відповіді на кнопки; getUpdates, getMe тощо — ні)
+def _is_limited(method: TelegramMethod) -> bool:
+    return isinstance(method, AnswerCallbackQuery) or getattr(method, "chat_id", None) is not None
+
+
+def _priority(method: TelegramMethod) -> int:
+    if isinstance(method, _INTERACTIVE_METHODS):
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_BULK if _bulk.get() else PRIORITY_NORMAL
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """Планувальник вихідних запитів бота (middleware сесії aiogram).
+
+    Кожен запит у чат спершу отримує токен із загального відра та відра свого
+    чату (для груп і каналів ліміт суворіший). Поки токенів немає, запити чекають
+    у черзі з пріоритетами: відповіді на кнопки та редагування проходять раніше
+    за звичайні повідомлення, а ті — раніше за масові розсилки. Якщо Telegram
+    усе ж відповів RetryAfter, чат (або вся черга) призупиняється на вказаний
+    час і запит повторюється до ``max_retries`` разів.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        global_burst: float = SEND_GLOBAL_BURST,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: float = SEND_CHAT_BURST,
+        group_rate: float = SEND_GROUP_RATE,
+        group_burst: float = SEND_GROUP_BURST,
+        max_retries: int = SEND_MAX_RETRIES,
+    ) -> None:
+        self.chat_limits = (chat_rate, chat_burst)
+        self.group_limits = (group_rate, group_burst)
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        # (пріоритет, порядковий номер, чат, future дозволу)
+        self._queue: List[Tuple[int, int, Any, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        # лічильники для моніторингу
+        self.sent = 0
+        self.retried = 0
+
+    # скільки запитів зараз чекає на токен
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        if not _is_limited(method):
+            return await make_request(bot, method)
+        chat_id = getattr(method, "chat_id", None)
+        priority = _priority(method)
+        for attempt in itertools.count():
+            await self._acquire(chat_id, priority)
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                self.retried += 1
+                log.warning("Telegram просить зачекати %s с (%s, чат %s)", e.retry_after, type(method).__name__, chat_id)
+                bucket = self._global if chat_id is None else self._bucket(chat_id, time.monotonic())
+                bucket.block(time.monotonic() + e.retry_after)
+                continue
+            self.sent += 1
+            return result
+
+    def _bucket(self, chat_id: Union[int, str], now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= CHAT_BUCKETS_LIMIT:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+            group = isinstance(chat_id, str) or chat_id < 0
+            rate, burst = self.group_limits if group else self.chat_limits
+            bucket = self._chats[chat_id] = TokenBucket(rate, burst, now)
+        return bucket
+
+    # дочекатися своєї черги; без черги і з вільними токенами — одразу
+    async def _acquire(self, chat_id: Any, priority: int) -> None:
+        now = time.monotonic()
+        if not self._queue and self._global.delay(now) <= 0:
+            bucket = None if chat_id is None else self._bucket(chat_id, now)
+            if bucket is None or bucket.delay(now) <= 0:
+                self._global.consume(now)
+                if bucket is not None:
+                    bucket.consume(now)
+                return
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._order), chat_id, future))
+        self._wakeup.set()
+        await future
+
+    # скільки чекати запиту з черги на токен свого чату
+    def _chat_delay(self, item: Tuple[int, int, Any, asyncio.Future], now: float) -> float:
+        return 0.0 if item[2] is None else self._bucket(item[2], now).delay(now)
+
+    # наступний запит, якому вже можна відправлятися, або скільки чекати до найближчого
+    def _pick(self, now: float) -> Tuple[Optional[Tuple[int, int, Any, asyncio.Future]], float]:
+        # найчастіше готовий перший у черзі; повний перебір — лише коли його чат зайнятий
+        nearest = self._chat_delay(self._queue[0], now)
+        if nearest <= 0:
+            return self._queue[0], 0.0
+        for item in sorted(self._queue)[1:]:
+            wait = self._chat_delay(item, now)
+            if wait <= 0:
+                return item, 0.0
+            nearest = min(nearest, wait)
+        return None, nearest
+
+    async def _run(self) -> None:
+        while True:
+            # скасовані запити (наприклад, обробник перервано) просто прибираються
+            if self._queue and any(item[3].done() for item in self._queue):
+                self._queue = [item for item in self._queue if not item[3].done()]
+                heapq.heapify(self._queue)
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            wait = self._global.delay(now)
+            if wait <= 0:
+                item, wait = self._pick(now)
+                if item is not None:
+                    if item is self._queue[0]:
+                        heapq.heappop(self._queue)
+                    else:
+                        self._queue.remove(item)
+                        heapq.heapify(self._queue)
+                    self._global.consume(now)
+                    if item[2] is not None:
+                        self._bucket(item[2], now).consume(now)
+                    item[3].set_result(None)
+                    continue
+            # чекаємо на токен або на новий запит (він може мати вищий пріоритет чи інший чат)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    # зупинити планувальник (запити, що ще чекають, скасовуються)
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for item in self._queue:
+            item[3].cancel()
+        self._queue.clear()
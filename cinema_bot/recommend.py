@@ -0,0 +1,455 @@
+# Персональні рекомендації для /random: подібність фільмів за оцінками, обраним, жанрами та акторами 🎯
+#
+# Модель — розріджені словники без numpy/scipy: для кожного фільму, який хтось
+# оцінив чи додав в обране, зберігаються K найближчих сусідів. Повний перерахунок
+# іде фоном (Recommender.run), між перерахунками нові оцінки й обране
+# оновлюють модель інкрементально (observe): в обробнику — лише добутки,
+# а списки сусідів перераховуються пакетами у фоні (Recommender.settle).
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+import threading
+from collections import OrderedDict, deque
+from operator import itemgetter
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from config import (
+    RECOMMEND_CONTENT_WEIGHT,
+    RECOMMEND_NEIGHBORS,
+    RECOMMEND_PROFILE_LIMIT,
+    RECOMMEND_REBUILD_INTERVAL,
+)
+from genres import split_genres
+from records import Film
+from search import normalize
+
+log = logging.getLogger(__name__)
+
+# скільки останніх позитивних фільмів користувача беруться як «насіння» рекомендацій
+SEEDS = 20
+# скільки найкращих кандидатів тримати в черзі користувача
+CANDIDATES = 50
+# скільки останніх показаних фільмів не повторювати
+SHOWN = 20
+# скільки фільмів брати з ознаки (жанр, актор) у кандидати, якщо вона є в багатьох фільмах
+FEATURE_SAMPLE = 30
+# скільки найпопулярніших фільмів тримати для нових користувачів
+POPULAR = 100
+# для скількох користувачів тримати чергу кандидатів і нещодавно показані фільми (старіші витісняються)
+USERS_CACHED = 10_000
+# як часто перераховувати сусідів фільмів, змінених оцінками, і скільки фільмів за один крок циклу подій
+SETTLE_DELAY = 1.0
+SETTLE_BATCH = 100
+# скільки нових фільмів одного імпорту додавати в модель одразу; більший пакет — позачерговий перерахунок
+IMPORT_INLINE_LIMIT = 200
+
+# запис профілю: [оцінка або None, чи в обраному]
+Entry = List[Any]
+# дані для побудови моделі: фільми, оцінки {користувач: {фільм: оцінка}}, обране {користувач: [фільми]}
+Snapshot = Tuple[Sequence[Film], Dict[int, Dict[int, int]], Dict[int, List[int]]]
+
+
+# значення з LRU-словника (відсутнє чи порожнє — заново з factory);
+# найстаріші записи понад USERS_CACHED витісняються
+def _lru_get(cache: "OrderedDict[int, Any]", key: int, factory: Callable[[], Any]) -> Any:
+    value = cache.get(key)
+    if not value:
+        value = cache[key] = factory()
+        while len(cache) > USERS_CACHED:
+            cache.popitem(last=False)
+    cache.move_to_end(key)
+    return value
+
+
+class BuildCancelled(Exception):
+    """Фонову побудову моделі перервано (``Recommender.refresh`` скасовано)."""
+
+
+# вага взаємодії: оцінка 6…10 → 0.1…1, обране додає 1. Низькі оцінки ваги не мають: спільна
+# неприязнь погано говорить про схожість, а оцінений фільм і так не рекомендується
+def _weight(score: Optional[int], favorite: bool) -> float:
+    w = max(0.0, (score - 5.5) / 4.5) if score is not None else 0.0
+    return w + 1.0 if favorite else w
+
+
+# ознаки фільму для подібності за змістом: жанри та актори
+def _features(film: Film) -> Set[str]:
+    feats = {"g:" + key for key, _ in split_genres(film.genre)}
+    feats.update("a:" + normalize(a) for a in film.actors.split(",") if a.strip())
+    return feats
+
+
+# оцінка для списку популярних (середнє, згладжене до 5.5 на кшталт п'яти «середніх» голосів)
+def _popularity(film: Film) -> float:
+    return (film.rating_sum + 5.5 * 5) / (film.votes + 5)
+
+
+class _Model:
+    """Стан рекомендацій: профілі користувачів, скалярні добутки фільмів, ознаки й сусіди."""
+
+    def __init__(self, neighbors: int, profile_limit: int, content_weight: float) -> None:
+        self.k = neighbors
+        self.profile_limit = profile_limit
+        self.content_weight = content_weight
+        self.films: Set[int] = set()
+        # користувач → {фільм: [оцінка, обране]} (порядок — від давніх до нових)
+        self.profiles: Dict[int, Dict[int, Entry]] = {}
+        # розріджена матриця скалярних добутків стовпців «користувач × фільм» і квадрати норм
+        self.dot: Dict[int, Dict[int, float]] = {}
+        self.norm2: Dict[int, float] = {}
+        # ознаки: фільм → ознаки, ознака → фільми, idf² ознаки, норма вектора ознак фільму.
+        # Зі списків postings фільми не видаляються (це O(n)): застарілі записи відсіюються
+        # при підборі кандидатів і зникають при повному перерахунку
+        self.features: Dict[int, Set[str]] = {}
+        self.postings: Dict[str, List[int]] = {}
+        self.idf2: Dict[str, float] = {}
+        self.content_norm: Dict[int, float] = {}
+        # фільм → [(сусід, подібність)] за спаданням
+        self.neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        # фільми, чиї сусіди застаріли після observe, і пари (фільм, сусід) для offer — див. settle
+        self.dirty: Set[int] = set()
+        self.offers: Set[Tuple[int, int]] = set()
+        # зі списку популярних видалені фільми теж не прибираються (recommend перевіряє films)
+        self.popular: List[int] = []
+        # подія, що перериває побудову (лише поки модель будується в потоці)
+        self.stop: Optional[threading.Event] = None
+
+    # --- побудова ---
+
+    def _check_stop(self) -> None:
+        if self.stop is not None and self.stop.is_set():
+            raise BuildCancelled
+
+    def load_films(self, films: Iterable[Film]) -> None:
+        ranked = []
+        for film in films:
+            self._check_stop()
+            film_id = film.id
+            self.films.add(film_id)
+            feats = _features(film)
+            self.features[film_id] = feats
+            for f in feats:
+                self.postings.setdefault(f, []).append(film_id)
+            if film.votes:
+                ranked.append((_popularity(film), film_id))
+        self.popular = [film_id for _, film_id in heapq.nlargest(POPULAR, ranked)]
+        total = max(1, len(self.films))
+        self.idf2 = {f: math.log(1 + total / len(ids)) ** 2 for f, ids in self.postings.items()}
+        for film_id, feats in self.features.items():
+            self.content_norm[film_id] = math.sqrt(sum(self.idf2[f] for f in feats))
+
+    def load_interactions(self, ratings: Dict[int, Dict[int, int]], favorites: Dict[int, List[int]]) -> None:
+        for user, user_map in ratings.items():
+            items = self.profiles.setdefault(user, {})
+            for film_id, score in user_map.items():
+                items[film_id] = [score, False]
+        for user, ids in favorites.items():
+            items = self.profiles.setdefault(user, {})
+            for film_id in ids:
+                items.setdefault(film_id, [None, False])[1] = True
+        # кожен користувач додає добутки для всіх пар своїх останніх фільмів
+        for items in self.profiles.values():
+            self._check_stop()
+            recent = [(f, _weight(*e)) for f, e in list(items.items())[-self.profile_limit:] if f in self.films]
+            for a, (i, wi) in enumerate(recent):
+                self.norm2[i] = self.norm2.get(i, 0.0) + wi * wi
+                row_i = self.dot.setdefault(i, {})
+                for j, wj in recent[a + 1:]:
+                    p = wi * wj
+                    if p:
+                        row_i[j] = row_i.get(j, 0.0) + p
+                        row_j = self.dot.setdefault(j, {})
+                        row_j[i] = row_j.get(i, 0.0) + p
+        for film_id in self.norm2:
+            self._check_stop()
+            self.refresh_neighbors(film_id)
+
+    # --- подібність ---
+
+    def _content(self, i: int, j: int) -> float:
+        fi, fj = self.features.get(i), self.features.get(j)
+        if not fi or not fj:
+            return 0.0
+        shared = sum(self.idf2[f] for f in (fi & fj if len(fi) <= len(fj) else fj & fi))
+        return shared / (self.content_norm[i] * self.content_norm[j]) if shared else 0.0
+
+    def _collab(self, i: int, j: int) -> float:
+        d = self.dot.get(i, {}).get(j, 0.0)
+        if not d:
+            return 0.0
+        n = self.norm2.get(i, 0.0) * self.norm2.get(j, 0.0)
+        return d / math.sqrt(n) if n > 0 else 0.0
+
+    def similarity(self, i: int, j: int) -> float:
+        return (1 - self.content_weight) * self._collab(i, j) + self.content_weight * self._content(i, j)
+
+    # перерахувати K сусідів фільму: кандидати — спільні глядачі та спільні ознаки
+    def refresh_neighbors(self, i: int) -> None:
+        self.dirty.discard(i)
+        candidates = set(self.dot.get(i, ()))
+        for f in self.features.get(i, ()):
+            ids = self.postings[f]
+            candidates.update(ids if len(ids) <= FEATURE_SAMPLE else random.sample(ids, FEATURE_SAMPLE))
+        candidates.discard(i)
+        scored = ((j, self.similarity(i, j)) for j in candidates if j in self.films)
+        self.neighbors[i] = heapq.nlargest(self.k, (p for p in scored if p[1] > 0), key=itemgetter(1))
+
+    # застосувати до limit відкладених оновлень сусідів; True — ще щось лишилось
+    def settle(self, limit: int) -> bool:
+        for _ in range(limit):
+            if self.dirty:
+                i = self.dirty.pop()
+                if i in self.films:
+                    self.refresh_neighbors(i)
+            elif self.offers:
+                i, j = self.offers.pop()
+                if i in self.films and j in self.films:
+                    self.offer(i, j)
+            else:
+                return False
+        return bool(self.dirty or self.offers)
+
+    # оновити місце фільму j у списку сусідів фільму i (після зміни їх подібності)
+    def offer(self, i: int, j: int) -> None:
+        current = [p for p in self.neighbors.get(i, ()) if p[0] != j]
+        sim = self.similarity(i, j)
+        if sim > 0:
+            current.append((j, sim))
+            current.sort(key=itemgetter(1), reverse=True)
+        self.neighbors[i] = current[:self.k]
+
+    # --- інкрементальні зміни ---
+
+    def observe(self, user: int, film_id: int, score: Optional[int], favorite: Optional[bool]) -> None:
+        if film_id not in self.films:
+            return
+        items = self.profiles.setdefault(user, {})
+        old = items.pop(film_id, None)
+        entry = list(old) if old is not None else [None, False]
+        if score is not None:
+            entry[0] = score
+        if favorite is not None:
+            entry[1] = favorite
+        old_w = _weight(*old) if old is not None else 0.0
+        new_w = _weight(*entry)
+        others = list(items.items())[-(self.profile_limit - 1):]
+        if entry[0] is not None or entry[1]:
+            items[film_id] = entry  # у кінець — як найсвіжіший
+        delta = new_w - old_w
+        if not delta:
+            return
+        self.norm2[film_id] = self.norm2.get(film_id, 0.0) + new_w * new_w - old_w * old_w
+        row = self.dot.setdefault(film_id, {})
+        touched = []
+        for j, e in others:
+            p = delta * _weight(*e)
+            if p and j in self.films:
+                row[j] = row.get(j, 0.0) + p
+                other = self.dot.setdefault(j, {})
+                other[film_id] = other.get(film_id, 0.0) + p
+                touched.append(j)
+        # самі списки сусідів перераховуються пізніше, пакетом (settle)
+        self.dirty.add(film_id)
+        self.offers.update((j, film_id) for j in touched)
+
+    def add_film(self, film: Film) -> None:
+        film_id = film.id
+        self.films.add(film_id)
+        old = self.features.get(film_id, set())
+        feats = _features(film)
+        self.features[film_id] = feats
+        for f in feats:
+            if f not in old:
+                self.postings.setdefault(f, []).append(film_id)
+            # ознака, якої ще не було: idf як у найрідшої
+            self.idf2.setdefault(f, math.log(1 + len(self.films)) ** 2)
+        self.content_norm[film_id] = math.sqrt(sum(self.idf2[f] for f in feats))
+
+    def forget(self, film_id: int) -> None:
+        self.films.discard(film_id)
+        self.features.pop(film_id, None)
+        self.content_norm.pop(film_id, None)
+        self.norm2.pop(film_id, None)
+        self.neighbors.pop(film_id, None)
+        for j in self.dot.pop(film_id, {}):
+            self.dot.get(j, {}).pop(film_id, None)
+
+
+class Recommender:
+    """Рекомендації фільмів за схожістю на те, що користувач оцінив високо чи додав в обране.
+
+    Подібність двох фільмів — суміш косинусної подібності їхніх стовпців
+    у матриці «користувач × фільм» (вага — оцінка та обране) і косинусної
+    подібності ознак (жанри, актори з вагами idf), з часткою ``content_weight``
+    для другої. ``recommend`` складає чергу кандидатів із сусідів останніх
+    ``SEEDS`` улюблених фільмів (обсяг роботи не залежить від розміру
+    каталогу) і далі віддає з неї по фільму за O(1), пропускаючи вже оцінені
+    й нещодавно показані. Новим користувачам — популярні фільми.
+    """
+
+    def __init__(
+        self,
+        neighbors: int = RECOMMEND_NEIGHBORS,
+        profile_limit: int = RECOMMEND_PROFILE_LIMIT,
+        content_weight: float = RECOMMEND_CONTENT_WEIGHT,
+    ) -> None:
+        self._params = (neighbors, max(2, profile_limit), content_weight)
+        self._model = _Model(*self._params)
+        # події, що надійшли під час фонового перерахунку (програються на новій моделі)
+        self._missed: Optional[List[Tuple[str, tuple]]] = None
+        # черга кандидатів і нещодавно показані фільми користувача (LRU на USERS_CACHED користувачів)
+        self._queues: "OrderedDict[int, List[int]]" = OrderedDict()
+        self._shown: "OrderedDict[int, Deque[int]]" = OrderedDict()
+        # запит на позачерговий перерахунок (див. add_films)
+        self._wake = asyncio.Event()
+
+    # скільки фільмів мають пораховані списки сусідів
+    def __len__(self) -> int:
+        return len(self._model.neighbors)
+
+    def _event(self, name: str, *args: Any) -> None:
+        getattr(self._model, name)(*args)
+        if self._missed is not None:
+            self._missed.append((name, args))
+
+    # нова оцінка чи зміна обраного (викликається обробниками rate_ / fav_)
+    def observe(self, user: int, film_id: int, score: Optional[int] = None, favorite: Optional[bool] = None) -> None:
+        self._event("observe", int(user), int(film_id), score, favorite)
+        self._queues.pop(int(user), None)
+
+    def add_film(self, film: Film) -> None:
+        self._event("add_film", film)
+
+    # фільми з масового імпорту: невеликий пакет додається одразу, великий — фоновим
+    # перерахунком у run, щоб не займати цикл подій (до нього нові фільми просто не рекомендуються)
+    def add_films(self, films: Sequence[Film]) -> None:
+        if len(films) > IMPORT_INLINE_LIMIT:
+            self._wake.set()
+            return
+        for film in films:
+            self.add_film(film)
+
+    def forget(self, film_id: int) -> None:
+        self._event("forget", int(film_id))
+
+    # побудувати модель з повного знімка (у потоці, поза циклом подій);
+    # якщо встановлено stop, побудова переривається з BuildCancelled
+    def build(
+        self,
+        films: Sequence[Film],
+        ratings: Dict[int, Dict[int, int]],
+        favorites: Dict[int, List[int]],
+        stop: Optional[threading.Event] = None,
+    ) -> _Model:
+        model = _Model(*self._params)
+        model.stop = stop
+        model.load_films(films)
+        model.load_interactions(ratings, favorites)
+        model.stop = None
+        return model
+
+    # замінити модель новою й догнати події, що надійшли під час побудови
+    def install(self, model: _Model) -> None:
+        missed, self._missed = self._missed or [], None
+        for name, args in missed:
+            getattr(model, name)(*args)
+        self._model = model
+        self._queues.clear()
+
+    # знімок даних для перерахунку (films, ratings, favorites); події з цього моменту
+    # запам'ятовуються й доганяються в install
+    async def load(self, db: Any) -> Snapshot:
+        self._missed = []
+        films = await db.get_films()
+        ratings, favorites = await db.get_interactions()
+        return films, ratings, favorites
+
+    # повний перерахунок за даними сховища (або за вже прочитаним знімком data);
+    # при скасуванні задачі побудова в потоці теж зупиняється, щоб не тримати вихід з програми
+    async def refresh(self, db: Any, data: Optional[Snapshot] = None) -> None:
+        stop = threading.Event()
+        try:
+            if data is None:
+                data = await self.load(db)
+            model = await asyncio.get_running_loop().run_in_executor(None, self.build, *data, stop)
+        except BaseException:
+            stop.set()
+            self._missed = None
+            raise
+        self.install(model)
+        log.info("Рекомендації перераховано: %s фільмів із сусідами, %s користувачів", len(model.neighbors), len(model.profiles))
+
+    # відкладені оновлення сусідів після observe: кожні delay секунд, по batch фільмів
+    # між поверненнями в цикл подій, щоб обробники не чекали за перерахунком
+    async def settle(self, delay: float = SETTLE_DELAY, batch: int = SETTLE_BATCH) -> None:
+        while True:
+            await asyncio.sleep(delay)
+            while self._model.settle(batch):
+                await asyncio.sleep(0)
+
+    # фоновий перерахунок кожні interval секунд або раніше, якщо його попросив add_films;
+    # перший — за знімком data, якщо його вже прочитано. Разом з ним працює settle
+    async def run(self, db: Any, interval: float = RECOMMEND_REBUILD_INTERVAL, data: Optional[Snapshot] = None) -> None:
+        settler = asyncio.create_task(self.settle())
+        try:
+            while True:
+                self._wake.clear()
+                try:
+                    await self.refresh(db, data)
+                except Exception:
+                    log.exception("Не вдалося перерахувати рекомендації")
+                data = None
+                try:
+                    await asyncio.wait_for(self._wake.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            settler.cancel()
+
+    # черга кандидатів: сусіди останніх улюблених фільмів, зважений випадковий порядок
+    def _candidates(self, user: int) -> List[int]:
+        model = self._model
+        items = model.profiles.get(user)
+        if not items:
+            return []
+        scores: Dict[int, float] = {}
+        seeds = []
+        for film_id in itertools.islice(reversed(items), model.profile_limit):
+            w = _weight(*items[film_id])
+            if w > 0 and film_id in model.films:
+                seeds.append((film_id, w))
+                if len(seeds) >= SEEDS:
+                    break
+        for film_id, w in seeds:
+            if film_id not in model.neighbors or film_id in model.dirty:
+                model.refresh_neighbors(film_id)
+            for j, sim in model.neighbors[film_id]:
+                if j not in items:
+                    scores[j] = scores.get(j, 0.0) + w * sim
+        best = heapq.nlargest(CANDIDATES, ((j, s) for j, s in scores.items() if s > 0), key=itemgetter(1))
+        # вибірка без повторень, пропорційна оцінці (ключ u^(1/w)); pop() бере найбільший ключ
+        best.sort(key=lambda p: random.random() ** (1 / p[1]))
+        return [j for j, _ in best]
+
+    # id рекомендованого фільму, якого користувач ще не оцінював і не бачив нещодавно
+    # (None — порадити нічого, викликач бере просто випадковий фільм)
+    def recommend(self, user: int) -> Optional[int]:
+        user = int(user)
+        model = self._model
+        items = model.profiles.get(user, {})
+        shown = _lru_get(self._shown, user, lambda: deque(maxlen=SHOWN))
+        queue = _lru_get(self._queues, user, lambda: self._candidates(user))
+        while queue:
+            film_id = queue.pop()
+            if film_id in model.films and film_id not in items and film_id not in shown:
+                shown.append(film_id)
+                return film_id
+        fresh = [f for f in model.popular if f not in items and f not in shown and f in model.films]
+        if fresh:
+            film_id = random.choice(fresh[:10])
+            shown.append(film_id)
+            return film_id
+        return None
@@ -0,0 +1,156 @@
+# Компактні записи сховища: фільм і оцінки користувача 🧱
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, Tuple
+
+# поля фільму в порядку стовпців SQLite (rating не зберігається — рахується з rating_sum / votes)
+FILM_FIELDS = (
+    "id", "title", "genre", "description", "actors", "poster", "votes", "rating_sum", "version",
+    "poster_file_id",
+)
+_KEYS = FILM_FIELDS + ("rating",)
+_KEY_SET = frozenset(_KEYS)
+
+
+class Film(Mapping):
+    """Фільм: фіксований набір полів у ``__slots__`` замість словника.
+
+    Для обробників це незмінне відображення (``film["title"]``, ``film.get("poster")``),
+    тож сховище віддає свої записи напряму, без захисних копій. Змінює поля лише
+    сховище — через атрибути. ``poster_file_id`` порожній, якщо file_id ще немає.
+
+    Обробники читають запис без замка сховища, поки потік пулу його змінює. Кожне
+    присвоєння атрибута атомарне, тож читач бачить кожне поле або старим, або новим;
+    між полями однієї зміни можливий проміжний стан. Сховище впорядковує присвоєння
+    так, щоб він був допустимим (votes перед rating_sum, скидання poster_file_id
+    перед poster), а ``version`` збільшує останньою: кеш карток, що встиг узяти
+    стару версію, наступного разу перебудує картку.
+    """
+
+    __slots__ = FILM_FIELDS
+
+    def __init__(
+        self,
+        id: int,
+        title: str = "",
+        genre: str = "",
+        description: str = "",
+        actors: str = "",
+        poster: str = "",
+        votes: int = 0,
+        rating_sum: int = 0,
+        version: int = 0,
+        poster_file_id: str = "",
+    ) -> None:
+        self.id = id
+        self.title = title
+        self.genre = genre
+        self.description = description
+        self.actors = actors
+        self.poster = poster
+        self.votes = votes
+        self.rating_sum = rating_sum
+        self.version = version
+        self.poster_file_id = poster_file_id or ""
+
+    # запис з data.json чи журналу (невідомі ключі відкидаються)
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Film":
+        return cls(
+            int(data.get("id", 0)),
+            data.get("title", ""),
+            data.get("genre", ""),
+            data.get("description", ""),
+            data.get("actors", ""),
+            data.get("poster", ""),
+            int(data.get("votes", 0)),
+            int(data.get("rating_sum", 0)),
+            int(data.get("version", 0)),
+            data.get("poster_file_id", ""),
+        )
+
+    # словник для JSON (порожній poster_file_id не пишеться)
+    def to_dict(self) -> Dict[str, Any]:
+        data = {key: getattr(self, key) for key in FILM_FIELDS}
+        data["rating"] = self.rating
+        if not self.poster_file_id:
+            del data["poster_file_id"]
+        return data
+
+    # середній рейтинг для показу
+    @property
+    def rating(self) -> float:
+        return round(self.rating_sum / self.votes, 2) if self.votes else 0.0
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _KEY_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_KEYS)
+
+    def __len__(self) -> int:
+        return len(_KEYS)
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, key) for key in FILM_FIELDS)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Film):
+            return self.id == other.id and self._values() == other._values()
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return f"Film(id={self.id!r}, title={self.title!r})"
+
+
+class UserRatings(MutableMapping):
+    """Оцінки одного користувача {фільм: оцінка} у двох паралельних масивах,
+    відсортованих за id фільму: 10 байт на оцінку замість запису словника з двома int.
+    """
+
+    __slots__ = ("films", "scores")
+
+    def __init__(self, items: Any = ()) -> None:
+        self.films = array("q")
+        self.scores = array("h")
+        for film_id, score in sorted(dict(items).items()):
+            self.films.append(film_id)
+            self.scores.append(score)
+
+    def _find(self, film_id: int) -> int:
+        i = bisect_left(self.films, film_id)
+        return i if i < len(self.films) and self.films[i] == film_id else -1
+
+    def __getitem__(self, film_id: int) -> int:
+        i = self._find(film_id)
+        if i < 0:
+            raise KeyError(film_id)
+        return self.scores[i]
+
+    def __setitem__(self, film_id: int, score: int) -> None:
+        i = bisect_left(self.films, film_id)
+        if i < len(self.films) and self.films[i] == film_id:
+            self.scores[i] = score
+        else:
+            self.films.insert(i, film_id)
+            self.scores.insert(i, score)
+
+    def __delitem__(self, film_id: int) -> None:
+        i = self._find(film_id)
+        if i < 0:
+            raise KeyError(film_id)
+        del self.films[i]
+        del self.scores[i]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.films)
+
+    def __len__(self) -> int:
+        return len(self.films)
+
+    def to_dict(self) -> Dict[int, int]:
+        return dict(zip(self.films, self.scores))
@@ -0,0 +1,205 @@
+# Повнотекстовий пошук по фільмах 🔎
+
+import bisect
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from records import Film
+
+# ваги полів: збіг у назві важить більше, ніж в описі
+FIELD_WEIGHTS = {"title": 4.0, "genre": 2.0, "actors": 1.5, "description": 1.0}
+# множники для неточних збігів
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+# бонус, якщо весь запит міститься в назві як підрядок
+TITLE_PHRASE_BONUS = 2.0
+# мінімальна довжина токена для префіксного та нечіткого пошуку
+MIN_PREFIX_LEN = 2
+MIN_FUZZY_LEN = 4
+# скільки термінів максимум розгортати з одного префікса
+MAX_PREFIX_TERMS = 64
+
+_WORD_RE = re.compile(r"[^\W_]+")
+# різні апострофи (п'ять, пʼять, п’ять) зводимо до відсутності апострофа
+_APOSTROPHES = ("'", "’", "ʼ", "`")
+
+
+# нормалізація тексту: нижній регістр, без апострофів, ё → е
+def normalize(text: str) -> str:
+    text = (text or "").casefold()
+    for mark in _APOSTROPHES:
+        if mark in text:
+            text = text.replace(mark, "")
+    return text.replace("ё", "е")
+
+
+# розбиття на токени (кирилиця та латиниця)
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(normalize(text))
+
+
+# варіанти слова з одним видаленим символом
+def _deletes(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+# відстань Дамерау-Левенштейна (з перестановками) з ранньою зупинкою
+def _within_one_edit(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """Інвертований індекс по назві, жанру, акторах та опису фільмів.
+
+    Підтримує точні, префіксні та нечіткі (одна помилка) збіги токенів,
+    ранжує результати за вагою полів і оновлюється інкрементально.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        # термін → {id фільму: вага}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # id фільму → {термін: вага} (для видалення/оновлення)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        # токени назви через пробіл (для бонусу за фразу)
+        self._titles: Dict[int, str] = {}
+        # відсортований словник для префіксів
+        self._vocab: List[str] = []
+        # варіант з видаленим символом → терміни (для нечіткого пошуку)
+        self._fuzzy: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # повна перебудова індексу
+    def rebuild(self, films: Iterable[Film]) -> None:
+        self._reset()
+        for film in films:
+            self._index(film)
+        self._vocab = sorted(self._postings)
+        for term in self._vocab:
+            self._add_fuzzy(term)
+
+    # додати фільм
+    def add(self, film: Film) -> None:
+        for term in self._index(film):
+            bisect.insort(self._vocab, term)
+            self._add_fuzzy(term)
+
+    # видалити фільм
+    def remove(self, film_id: int) -> None:
+        self._titles.pop(film_id, None)
+        for term in self._doc_terms.pop(film_id, {}):
+            docs = self._postings[term]
+            del docs[film_id]
+            if not docs:
+                del self._postings[term]
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+                if len(term) >= MIN_FUZZY_LEN:
+                    for variant in _deletes(term):
+                        bucket = self._fuzzy[variant]
+                        bucket.discard(term)
+                        if not bucket:
+                            del self._fuzzy[variant]
+
+    # оновити фільм після редагування
+    def update(self, film: Film) -> None:
+        self.remove(film.id)
+        self.add(film)
+
+    # індексує поля фільму, повертає нові терміни словника
+    def _index(self, film: Film) -> List[str]:
+        film_id = film.id
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in set(tokenize(getattr(film, field))):
+                weights[term] = weights.get(term, 0.0) + weight
+        self._doc_terms[film_id] = weights
+        self._titles[film_id] = " ".join(tokenize(film.title))
+        new_terms = []
+        for term, weight in weights.items():
+            docs = self._postings.get(term)
+            if docs is None:
+                docs = self._postings[term] = {}
+                new_terms.append(term)
+            docs[film_id] = weight
+        return new_terms
+
+    def _add_fuzzy(self, term: str) -> None:
+        if len(term) >= MIN_FUZZY_LEN:
+            for variant in _deletes(term):
+                self._fuzzy.setdefault(variant, set()).add(term)
+
+    # терміни словника, що відповідають токену запиту, з множником якості збігу
+    def _expand(self, token: str) -> Dict[str, float]:
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if len(token) >= MIN_PREFIX_LEN:
+            start = bisect.bisect_left(self._vocab, token)
+            for term in self._vocab[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_FACTOR)
+        if len(token) >= MIN_FUZZY_LEN and not matches:
+            candidates = set(self._fuzzy.get(token, ()))
+            for variant in _deletes(token):
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(self._fuzzy.get(variant, ()))
+            for term in candidates:
+                if _within_one_edit(token, term):
+                    matches.setdefault(term, FUZZY_FACTOR)
+        return matches
+
+    # пошук: кожен токен запиту має знайтися у фільмі; повертає id за спаданням релевантності
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        per_token: List[Dict[int, float]] = []
+        for token in tokens:
+            scores: Dict[int, float] = {}
+            for term, factor in self._expand(token).items():
+                for film_id, weight in self._postings[term].items():
+                    score = weight * factor
+                    if score > scores.get(film_id, 0.0):
+                        scores[film_id] = score
+            if not scores:
+                return []
+            per_token.append(scores)
+
+        # перетин починаємо з найменшого набору
+        per_token.sort(key=len)
+        result = dict(per_token[0])
+        for scores in per_token[1:]:
+            result = {fid: s + scores[fid] for fid, s in result.items() if fid in scores}
+            if not result:
+                return []
+
+        phrase = " ".join(tokens)
+        if len(tokens) > 1 or len(phrase) >= MIN_PREFIX_LEN:
+            for film_id in result:
+                if phrase in self._titles[film_id]:
+                    result[film_id] += TITLE_PHRASE_BONUS
+
+        ranked: Iterable[Tuple[float, int]] = ((-s, fid) for fid, s in result.items())
+        ranked = heapq.nsmallest(limit, ranked) if limit is not None else sorted(ranked)
+        return [fid for _, fid in ranked]
@@ -0,0 +1,6 @@
+# Спільні налаштування тестів: модулі бота лежать плоско в cinema_bot/
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,201 @@
+# Масовий імпорт і експорт каталогу (catalog.py)
+
+import asyncio
+import io
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import command
+from async_db import AsyncDatabase
+from catalog import MAX_ERRORS, MAX_LENGTHS, detect_format, export_catalog, import_catalog, read_records, validate
+from data import Database
+from data_sqlite import SqliteDatabase
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        sync = Database(str(tmp_path / "data.json"), flush_delay=0)
+    else:
+        sync = SqliteDatabase(str(tmp_path / "data.db"), migrate_from=None)
+    yield sync
+    sync.close()
+
+
+def test_detect_format():
+    assert detect_format("films.CSV") == "csv"
+    assert detect_format("films.jsonl") == detect_format("films.ndjson") == "jsonl"
+    assert detect_format("films.json") == "json"
+    assert detect_format("films.xlsx") is None
+    assert detect_format("") is None
+
+
+def test_validate_normalizes_fields():
+    film = validate({"title": "  Дюна ", "genre": "фантастика", "description": "-", "actors": None, "extra": 1})
+    assert film == {"title": "Дюна", "genre": "фантастика", "description": "", "actors": "", "poster": ""}
+    assert validate({"title": 1984, "genre": "драма"})["title"] == "1984"
+
+
+@pytest.mark.parametrize("record, message", [
+    ({"genre": "драма"}, "немає назви"),
+    ({"title": "  ", "genre": "драма"}, "немає назви"),
+    ({"title": "Дюна"}, "немає жанру"),
+    ({"title": "Дюна", "genre": "драма", "poster": "ftp://x/p.jpg"}, "http(s)"),
+    ({"title": "Д" * (MAX_LENGTHS["title"] + 1), "genre": "драма"}, "title довше"),
+    (["Дюна", "драма"], "очікувався об'єкт"),
+    (ValueError("некоректний JSON (Expecting value)"), "некоректний JSON"),
+])
+def test_validate_rejects(record, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        validate(record)
+
+
+def test_read_csv_with_header_case_and_line_numbers():
+    stream = io.StringIO("Title, Genre ,poster\nДюна,фантастика,https://x/d.jpg\n\"Сталкер\nредакція\",драма,\n")
+    records = list(read_records(stream, "csv"))
+    assert records[0] == (2, {"title": "Дюна", "genre": "фантастика", "poster": "https://x/d.jpg"})
+    # номер рядка — останній рядок запису, навіть якщо поле багаторядкове
+    assert records[1][0] == 4 and records[1][1]["title"] == "Сталкер\nредакція"
+
+
+def test_read_jsonl_skips_blank_lines_and_reports_bad_json():
+    stream = io.StringIO('{"title": "Дюна", "genre": "фантастика"}\n\n{broken\n')
+    records = list(read_records(stream, "jsonl"))
+    assert records[0] == (1, {"title": "Дюна", "genre": "фантастика"})
+    assert records[1][0] == 3 and isinstance(records[1][1], ValueError)
+
+
+def test_read_json_array():
+    stream = io.StringIO('[{"title": "Дюна", "genre": "фантастика"},\n "не об\'єкт"]')
+    records = list(read_records(stream, "json"))
+    assert records == [(1, {"title": "Дюна", "genre": "фантастика"}), (2, "не об'єкт")]
+
+
+@pytest.mark.parametrize("fmt, text, message", [
+    ("json", '{"title": "Дюна"}', "очікувався масив"),
+    ("json", '[{"title": "Дюна"}, {"title": ', "після запису 1"),
+    ("csv", "name,year\nДюна,2021\n", "немає стовпців: title, genre"),
+    ("csv", 'title,genre\n"' + "x" * 200_000 + '",драма\n', "некоректний CSV"),
+])
+def test_read_unreadable_file(fmt, text, message):
+    with pytest.raises(ValueError, match=message):
+        list(read_records(io.StringIO(text), fmt))
+
+
+def test_read_unknown_format():
+    with pytest.raises(ValueError):
+        list(read_records(io.StringIO(""), "xml"))
+
+
+def test_import_reports_duplicates_and_errors(store):
+    store.add_film("Дюна", "фантастика")
+    stream = io.StringIO(
+        "title,genre,actors\n"
+        "Сталкер,драма,Кайдановський\n"
+        "дюна,фантастика,\n"
+        "СТАЛКЕР,драма,\n"
+        ",драма,\n"
+        "Соляріс,,\n"
+    )
+    report = import_catalog(store, stream, "csv")
+    assert [film.title for film in report.added] == ["Сталкер"]
+    assert (report.duplicates, report.invalid) == (2, 2)
+    assert report.errors == ["рядок 5: немає назви", "рядок 6: немає жанру"]
+    assert report.summary().startswith("Додано: 1, дублікатів: 2, з помилками: 2")
+    assert store.search_film_ids("кайдановський") == [report.added[0].id]
+
+
+def test_import_json_array_reports_records(store):
+    stream = io.StringIO('[{"title": "Дюна", "genre": "фантастика"}, {"title": "Сталкер"}]')
+    report = import_catalog(store, stream, "json")
+    assert [film.title for film in report.added] == ["Дюна"]
+    assert report.errors == ["запис 2: немає жанру"]
+
+
+def test_import_limits_error_list(store):
+    stream = io.StringIO("".join("{}\n" for _ in range(MAX_ERRORS + 5)))
+    report = import_catalog(store, stream, "jsonl")
+    assert report.invalid == MAX_ERRORS + 5
+    assert len(report.errors) == MAX_ERRORS
+    assert report.summary().endswith("… і ще 5")
+    assert not store.get_films()
+
+
+def test_export_round_trip(store, tmp_path):
+    films = [{"title": f"Фільм {i}", "genre": "драма", "poster": f"https://x/{i}.jpg"} for i in range(3)]
+    store.add_films(films)
+    store.add_rating(1, 7, 9)
+    for fmt in ("csv", "jsonl", "json"):
+        out = io.StringIO()
+        assert export_catalog(store, out, fmt) == 3
+        out.seek(0)
+        rows = [record for _, record in read_records(out, fmt)]
+        assert [row["title"] for row in rows] == ["Фільм 0", "Фільм 1", "Фільм 2"]
+        assert float(rows[0]["rating"]) == 9.0 and int(rows[0]["votes"]) == 1
+        target = Database(str(tmp_path / f"copy-{fmt}.json"), flush_delay=0)
+        out.seek(0)
+        assert len(import_catalog(target, out, fmt).added) == 3
+        assert [f.poster for f in target.get_films()] == [f["poster"] for f in films]
+    with pytest.raises(ValueError):
+        export_catalog(store, io.StringIO(), "xml")
+
+
+def test_export_jsonl_is_valid_json(store):
+    store.add_film("Дюна \"2021\"", "фантастика")
+    out = io.StringIO()
+    export_catalog(store, out, "jsonl")
+    assert json.loads(out.getvalue())["title"] == "Дюна \"2021\""
+
+
+def test_export_json_is_array(store):
+    out = io.StringIO()
+    assert export_catalog(store, out, "json") == 0
+    assert json.loads(out.getvalue()) == []
+    store.add_films([{"title": "Дюна", "genre": "фантастика"}, {"title": "Сталкер", "genre": "драма"}])
+    out = io.StringIO()
+    export_catalog(store, out, "json")
+    assert [row["title"] for row in json.loads(out.getvalue())] == ["Дюна", "Сталкер"]
+
+
+class ImportMessage:
+    """Повідомлення адміна з файлом для process_import_file."""
+
+    def __init__(self, name, content):
+        self.from_user = SimpleNamespace(id=1)
+        self.document = SimpleNamespace(file_name=name, file_size=len(content))
+        self.bot = SimpleNamespace(download=self._download)
+        self.content = content
+        self.replies = []
+
+    async def _download(self, document):
+        return io.BytesIO(self.content)
+
+    async def answer(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class State:
+    def __init__(self):
+        self.cleared = False
+
+    async def clear(self):
+        self.cleared = True
+
+
+# зламаний файл: адмін отримує пояснення, діалог закривається, нічого не додано
+@pytest.mark.parametrize("name, content", [
+    ("films.csv", b"name,year\n1,2\n"),
+    ("films.json", b'{"title": "not an array"}'),
+])
+def test_import_handler_reports_unreadable_file(tmp_path, monkeypatch, name, content):
+    sync = Database(str(tmp_path / "data.json"), flush_delay=0)
+    monkeypatch.setattr(command, "ADMIN_ID", [1])
+    monkeypatch.setattr(command, "db", AsyncDatabase(sync, workers=1))
+    message, state = ImportMessage(name, content), State()
+    asyncio.run(command.process_import_file(message, state))
+    assert state.cleared
+    assert message.replies[-1].startswith("❌ Файл не імпортовано")
+    assert not sync.get_films()
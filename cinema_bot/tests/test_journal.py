@@ -0,0 +1,149 @@
+# Журнал змін JSON-сховища: програвання при старті, недописаний хвіст, згортання
+
+import json
+
+from data import Database
+
+
+def open_db(tmp_path, **kwargs):
+    kwargs.setdefault("flush_delay", 0)
+    return Database(str(tmp_path / "data.json"), **kwargs)
+
+
+def fill(db):
+    first = db.add_film("Дюна", "фантастика")
+    second = db.add_film("Сталкер", "драма")
+    db.toggle_favorite(first.id, 7)
+    db.add_rating(first.id, 7, 9)
+    db.add_rating(second.id, 8, 6)
+    db.update_field(second.id, "title", "Сталкер (1979)")
+    return first, second
+
+
+def state(db):
+    films = [(f.id, f.title, f.votes, f.rating_sum) for f in db.get_films()]
+    return films, db.get_interactions()
+
+
+def test_replay_restores_state(tmp_path):
+    db = open_db(tmp_path)
+    fill(db)
+    expected = state(db)
+    db.close()
+    snapshot = json.loads((tmp_path / "data.json").read_text(encoding="utf-8"))
+    assert snapshot["movies"] == []
+
+    reopened = open_db(tmp_path)
+    assert state(reopened) == expected
+    assert reopened.search_film_ids("сталкер") == [2]
+    assert reopened.check_ratings() == {}
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    db = open_db(tmp_path)
+    fill(db)
+    expected = state(db)
+    db.close()
+    journal = tmp_path / "data.json.journal"
+    good_size = journal.stat().st_size
+    with open(journal, "ab") as fh:
+        fh.write('{"op":"add","film":{"id":3,"title":"Недо'.encode("utf-8"))
+
+    reopened = open_db(tmp_path)
+    assert state(reopened) == expected
+    assert journal.stat().st_size == good_size
+    # після обрізання нові записи дописуються до цілого журналу й теж програються
+    reopened.add_film("Соляріс", "фантастика")
+    reopened.close()
+    assert [f.title for f in open_db(tmp_path).get_films()][-1] == "Соляріс"
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    db = open_db(tmp_path)
+    fill(db)
+    expected = state(db)
+    db.compact()
+    assert (tmp_path / "data.json.journal").stat().st_size == 0
+    db.add_rating(1, 9, 4)
+    db.close()
+
+    reopened = open_db(tmp_path)
+    films, (ratings, favorites) = state(reopened)
+    assert films[0] == (1, "Дюна", 2, 13)
+    assert ratings[9] == {1: 4} and favorites == expected[1][1]
+
+
+# записи, які вже є у знімку (seq), при старті не застосовуються вдруге
+def test_replay_skips_records_in_snapshot(tmp_path):
+    db = open_db(tmp_path)
+    fill(db)
+    journal = (tmp_path / "data.json.journal").read_bytes()
+    db.compact()
+    db.close()
+    (tmp_path / "data.json.journal").write_bytes(journal)
+
+    reopened = open_db(tmp_path)
+    assert [f.title for f in reopened.get_films()] == ["Дюна", "Сталкер (1979)"]
+    assert reopened.get_film_by_id(1).votes == 1
+
+
+def test_auto_compaction_by_size(tmp_path):
+    db = open_db(tmp_path, journal_max_bytes=300)
+    for i in range(10):
+        db.add_film(f"Фільм {i}", "драма")
+    db.close()
+    assert (tmp_path / "data.json.journal").stat().st_size <= 300
+    assert len(open_db(tmp_path).get_films()) == 10
+
+
+# групова фіксація: зміни в пам'яті видно одразу, на диск вони потрапляють при flush
+def test_group_commit_flushes_on_close(tmp_path):
+    db = open_db(tmp_path, flush_delay=60, flush_max_dirty=1000)
+    db.add_film("Дюна", "фантастика")
+    assert db.pending_writes == 1
+    db.close()
+    assert db.pending_writes == 0
+    assert [f.title for f in open_db(tmp_path).get_films()] == ["Дюна"]
+
+
+# зміна, записана в журнал, поки знімок пишеться поза замком, не стирається згортанням
+def test_write_during_compaction_survives(tmp_path, monkeypatch):
+    db = open_db(tmp_path)
+    film = db.add_film("Дюна", "фантастика")
+    write_file = db._write_file
+
+    def write_with_concurrent_change(payload):
+        write_file(payload)
+        db.add_rating(film.id, 7, 9)
+
+    monkeypatch.setattr(db, "_write_file", write_with_concurrent_change)
+    db.compact()
+    assert db.get_film_by_id(film.id).votes == 1
+    db.close()
+    assert open_db(tmp_path).get_film_by_id(film.id).votes == 1
+
+
+# обране й оцінки видаленого фільму прибираються з масивів (окремих індексів фанів немає)
+def test_delete_cleans_interactions_after_replay(tmp_path):
+    db = open_db(tmp_path)
+    first, second = fill(db)
+    db.toggle_favorite(second.id, 7)
+    db.close()
+
+    reopened = open_db(tmp_path)
+    assert reopened.delete_film(first.id) == "Дюна"
+    ratings, favorites = reopened.get_interactions()
+    assert ratings == {8: {second.id: 6}}
+    assert favorites == {7: [second.id]}
+    assert reopened.toggle_favorite(second.id, 7) is False
+    assert reopened.check_ratings() == {}
+
+
+def test_check_ratings_repairs_drift(tmp_path):
+    db = open_db(tmp_path)
+    first, second = fill(db)
+    db.add_rating(first.id, 8, 5)
+    db._apply_aggregate(first.id, 100, 1)
+    assert db.check_ratings(repair=True) == {first.id: {"stored": (100, 1), "actual": (14, 2)}}
+    assert db.get_film_by_id(first.id).rating == 7.0
+    assert db.check_ratings() == {}
@@ -0,0 +1,144 @@
+# Метрики (metrics.py): формат Prometheus, експорт /metrics та middleware із заміром часу
+
+import asyncio
+from datetime import datetime
+
+import aiohttp
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import CallbackQuery, Chat, Message, User
+
+import metrics
+from fake_telegram import FakeTelegramSession
+from metrics import ApiMetricsMiddleware, HandlerMetricsMiddleware, Registry, event_key
+
+USER = User(id=7, is_bot=False, first_name="Тест")
+
+
+def message(text):
+    return Message(message_id=1, date=datetime.now(), chat=Chat(id=7, type="private"), from_user=USER, text=text)
+
+
+def callback(data):
+    return CallbackQuery(id="1", from_user=USER, chat_instance="1", data=data)
+
+
+def test_render_counter_and_histogram():
+    registry = Registry()
+    errors = registry.counter("test_errors_total", "Помилки")
+    seconds = registry.histogram("test_seconds", "Тривалість")
+    registry.collector("test_queue", "Черга", lambda: 3)
+    errors.inc(method="SendMessage")
+    errors.inc(2, method="SendMessage")
+    for value in (0.0003, 0.02, 0.02, 7.0):
+        seconds.observe(value, handler="films")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_errors_total counter" in lines
+    assert 'test_errors_total{method="SendMessage"} 3' in lines
+    assert "# TYPE test_seconds histogram" in lines
+    # кошики накопичувальні
+    assert 'test_seconds_bucket{handler="films",le="0.0005"} 1' in lines
+    assert 'test_seconds_bucket{handler="films",le="0.01"} 1' in lines
+    assert 'test_seconds_bucket{handler="films",le="0.025"} 3' in lines
+    assert 'test_seconds_bucket{handler="films",le="5.0"} 3' in lines
+    assert 'test_seconds_bucket{handler="films",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{handler="films"} 4' in lines
+    total = next(line for line in lines if line.startswith("test_seconds_sum"))
+    assert float(total.split()[-1]) == pytest.approx(7.0403)
+    assert "test_queue 3" in lines
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("test_total", "-").inc(title='Він сказав "ні"\n')
+    assert 'test_total{title="Він сказав \\"ні\\"\\n"} 1' in registry.render().splitlines()
+
+
+def test_summary_quantiles():
+    registry = Registry()
+    seconds = registry.histogram("test_seconds", "-")
+    for _ in range(99):
+        seconds.observe(0.002, handler="fast")
+    seconds.observe(3.0, handler="fast")
+    assert "p50≤2.5ms p99≤2.5ms" in registry.summary()
+    assert Registry().summary() == "немає даних"
+
+
+def test_event_key():
+    assert event_key(message("/films@cinema_bot 2")) == "/films"
+    assert event_key(message("Матриця")) == "text"
+    assert event_key(callback("rate_3_5")) == "rate"
+
+
+def test_exporter_serves_registry(monkeypatch):
+    registry = Registry()
+    registry.counter("test_total", "-").inc()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    async def main():
+        runner = await metrics.start_exporter("127.0.0.1", 0)
+        try:
+            host, port = runner.addresses[0][:2]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://{host}:{port}/metrics") as response:
+                    return response.status, await response.text()
+        finally:
+            await runner.cleanup()
+
+    status, text = asyncio.run(main())
+    assert status == 200 and "test_total 1" in text.splitlines()
+
+
+# серії однієї гістограми з заданими мітками: (кількість, сума)
+def series(histogram, **labels):
+    for key, count, total, _ in histogram.summary(0.5):
+        if dict(key) == {k: str(v) for k, v in labels.items()}:
+            return count, total
+    return 0, 0.0
+
+
+def test_handler_middleware_times_handlers():
+    async def show_films(event, data):
+        await asyncio.sleep(0.01)
+
+    async def failing(event, data):
+        raise RuntimeError("boom")
+
+    middleware = HandlerMetricsMiddleware()
+    before = series(metrics.HANDLER_SECONDS, handler="show_films", event="/films")[0]
+    asyncio.run(middleware(show_films, message("/films"), {"handler": type("H", (), {"callback": show_films})}))
+    with pytest.raises(RuntimeError):
+        asyncio.run(middleware(failing, callback("film_1"), {"handler": type("H", (), {"callback": failing})}))
+
+    count, total = series(metrics.HANDLER_SECONDS, handler="show_films", event="/films")
+    assert count == before + 1 and total >= 0.01
+    assert series(metrics.HANDLER_SECONDS, handler="failing", event="film")[0] >= 1
+
+
+class FloodSession(FakeTelegramSession):
+    async def make_request(self, bot, method, timeout=None):
+        raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+
+
+def test_api_middleware_times_requests_and_counts_errors():
+    def errors():
+        prefix = 'cinema_telegram_errors_total{error="TelegramRetryAfter",method="SendMessage"} '
+        lines = [line for line in metrics.API_ERRORS.render() if line.startswith(prefix)]
+        return int(lines[0][len(prefix):]) if lines else 0
+
+    before_calls = series(metrics.API_SECONDS, method="SendMessage")[0]
+    before_errors = errors()
+
+    async def main():
+        ok, flood = FakeTelegramSession(), FloodSession()
+        for session in (ok, flood):
+            session.middleware(ApiMetricsMiddleware())
+        await Bot("42:TEST", session=ok).send_message(1, "🎬")
+        with pytest.raises(TelegramRetryAfter):
+            await Bot("42:TEST", session=flood).send_message(1, "🎬")
+
+    asyncio.run(main())
+    assert series(metrics.API_SECONDS, method="SendMessage")[0] == before_calls + 2
+    assert errors() == before_errors + 1
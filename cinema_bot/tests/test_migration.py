@@ -0,0 +1,48 @@
+# Перенос JSON-сховища в SQLite
+
+from data import Database
+from data_sqlite import SqliteDatabase
+
+
+# зміни, що ще лежать лише в журналі data.json.journal, теж переносяться
+def test_migration_replays_journal(tmp_path):
+    json_path = tmp_path / "data.json"
+    db = Database(str(json_path), flush_delay=0)
+    first = db.add_film("Дюна", "фантастика", actors="Тімоті Шаламе")
+    second = db.add_film("Сталкер", "драма")
+    db.add_film("Соляріс", "фантастика")
+    db.toggle_favorite(first.id, 7)
+    db.add_rating(first.id, 7, 9)
+    db.add_rating(first.id, 8, 7)
+    db.add_rating(second.id, 7, 5)
+    db.close()
+    assert (tmp_path / "data.json.journal").stat().st_size > 0
+
+    sqlite = SqliteDatabase(str(tmp_path / "data.db"), migrate_from=str(json_path))
+    try:
+        assert [film.title for film in sqlite.get_films()] == ["Дюна", "Сталкер", "Соляріс"]
+        assert [film.id for film in sqlite.get_favorites(7)] == [first.id]
+        film = sqlite.get_film_by_id(first.id)
+        assert (film.votes, film.rating_sum, film.actors) == (2, 16, "Тімоті Шаламе")
+        assert sqlite.search_film_ids("дюна") == [first.id]
+        assert sqlite.check_ratings() == {}
+    finally:
+        sqlite.close()
+
+
+# згорнутий знімок і журнал поверх нього переносяться разом
+def test_migration_after_compaction(tmp_path):
+    json_path = tmp_path / "data.json"
+    db = Database(str(json_path), flush_delay=0)
+    film = db.add_film("Дюна", "фантастика")
+    db.compact()
+    db.update_field(film.id, "title", "Дюна: частина перша")
+    db.delete_film(db.add_film("Чернетка", "драма").id)
+    db.close()
+
+    sqlite = SqliteDatabase(str(tmp_path / "data.db"), migrate_from=None)
+    try:
+        assert sqlite.import_json(str(json_path)) == 1
+        assert [f.title for f in sqlite.get_films()] == ["Дюна: частина перша"]
+    finally:
+        sqlite.close()
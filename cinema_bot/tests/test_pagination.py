@@ -0,0 +1,138 @@
+# Посторінкові списки: курсори "page_<offset>_<scope>" і сторінки з обох сховищ
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import command
+from async_db import AsyncDatabase
+from data import Database
+from data_sqlite import SqliteDatabase
+from keyboards import films_keyboard
+
+PAGE = command.PAGE_SIZE
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        sync = Database(str(tmp_path / "data.json"), flush_delay=0)
+    else:
+        sync = SqliteDatabase(str(tmp_path / "data.db"), migrate_from=None)
+    sync.add_films(
+        {"title": f"Фільм {i}", "genre": "драма" if i % 3 else "драма, комедія"}
+        for i in range(1, 2 * PAGE + 4)
+    )
+    yield sync
+    sync.close()
+
+
+def buttons(keyboard):
+    return [(button.text, button.callback_data) for row in keyboard.as_markup().inline_keyboard for button in row]
+
+
+# усі сторінки списку scope, як їх перегортає користувач кнопкою ➡️
+# (AsyncDatabase не закривається: сховище закриває фікстура)
+def walk(store, scope, user_id=1):
+    async def run():
+        pages, offset = [], 0
+        while True:
+            films, total = await command.films_page(scope, offset, user_id)
+            pages.append([f.id for f in films])
+            nav = [data for text, data in buttons(command.page_keyboard(films, scope, offset, total)) if text == "➡️"]
+            if not nav:
+                return pages, total
+            _, next_offset, next_scope = nav[0].split("_", 2)
+            assert next_scope == scope
+            offset = int(next_offset)
+    original, command.db = command.db, AsyncDatabase(store, workers=1)
+    try:
+        return asyncio.run(run())
+    finally:
+        command.db = original
+
+
+def test_catalog_pages_cover_all_films(store):
+    expected = [f.id for f in store.get_films()]
+    pages, total = walk(store, "a")
+    assert total == len(expected) == 2 * PAGE + 3
+    assert [len(page) for page in pages] == [PAGE, PAGE, 3]
+    assert sum(pages, []) == expected
+
+
+def test_genre_pages(store):
+    genres = {name: genre_id for genre_id, name, _ in store.get_genres()}
+    pages, total = walk(store, f"g:{genres['комедія']}")
+    ids = sum(pages, [])
+    assert total == len(ids) == (2 * PAGE + 3) // 3
+    assert all(i % 3 == 0 for i in ids)
+
+
+def test_search_pages_use_remembered_results(store):
+    ids = store.search_film_ids("фільм")
+    scope = command.remember_search(1, ids)
+    pages, total = walk(store, scope)
+    assert sum(pages, []) == ids and total == len(ids)
+    # в іншого користувача свого пошуку немає
+    assert walk(store, scope, user_id=2) == ([[]], 0)
+
+
+# курсор старого пошуку (новіший пошук, перезапуск, інший воркер) не показує чужу сторінку
+def test_search_cursor_expires(store):
+    old = command.remember_search(1, store.search_film_ids("фільм 1"))
+    command.remember_search(1, store.search_film_ids("фільм"))
+    assert walk(store, old) == ([[]], 0)
+    assert walk(store, "s") == ([[]], 0)
+
+
+class SearchMessage:
+    def __init__(self):
+        self.from_user = SimpleNamespace(id=1)
+        self.replies = []
+
+    async def answer(self, text, **kwargs):
+        self.replies.append(text)
+
+
+# фільм, знайдений пошуком, встигли видалити до показу картки
+def test_search_result_deleted_before_show(store):
+    message = SearchMessage()
+    original, command.db = command.db, AsyncDatabase(store, workers=1)
+    try:
+        asyncio.run(command.show_search_results(message, [10 ** 6]))
+    finally:
+        command.db = original
+    assert message.replies == ["🔍 Нічого не знайдено"]
+
+
+def test_favorites_pages(store):
+    for film_id in range(1, PAGE + 3):
+        store.toggle_favorite(film_id, 5)
+    pages, total = walk(store, "f", user_id=5)
+    assert [len(page) for page in pages] == [PAGE, 2] and total == PAGE + 2
+
+
+def test_offset_past_end_is_empty(store):
+    films, total = store.get_films_page(10 * PAGE, PAGE)
+    assert films == [] and total == 2 * PAGE + 3
+
+
+def test_keyboard_navigation():
+    films = [type("F", (), {"id": i, "title": f"Фільм {i}"})() for i in range(PAGE)]
+    first = buttons(films_keyboard(films, scope="a", offset=0, total=3 * PAGE, page_size=PAGE))
+    assert first[-2:] == [("1/3", "noop"), ("➡️", f"page_{PAGE}_a")]
+    middle = buttons(films_keyboard(films, scope="a", offset=PAGE, total=3 * PAGE, page_size=PAGE))
+    assert middle[-3:] == [("⬅️", "page_0_a"), ("2/3", "noop"), ("➡️", f"page_{2 * PAGE}_a")]
+    single = buttons(films_keyboard(films[:2], scope="a", offset=0, total=2, page_size=PAGE))
+    assert single == [("🎬 Фільм 0", "movie_0"), ("🎬 Фільм 1", "movie_1")]
+
+
+# курсор вміщається в 64 байти callback_data навіть для довгих назв жанрів
+def test_genre_cursor_fits_callback_limit(tmp_path):
+    db = Database(str(tmp_path / "data.json"), flush_delay=0)
+    db.add_film("Фільм", "дуже-довга-назва-жанру-українською-мовою-що-не-влізе-в-кнопку")
+    genre_id = db.get_genres()[0][0]
+    cursor = f"page_{10 ** 6}_g:{genre_id}"
+    assert len(cursor.encode("utf-8")) <= 64
+    assert db.get_genre_page(genre_id, 0, PAGE)[1] == 1
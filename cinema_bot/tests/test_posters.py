@@ -0,0 +1,121 @@
+# Повторне використання file_id постерів і скидання при помилках (command.show_card)
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
+from aiogram.methods import SendPhoto
+from aiogram.types import PhotoSize
+
+import command
+from async_db import AsyncDatabase
+from cards import CAPTION_LIMIT, FailedPosters
+from data import Database
+
+POSTER = "https://example.com/poster.jpg"
+
+
+def bad_request(text: str) -> TelegramBadRequest:
+    return TelegramBadRequest(method=SendPhoto(chat_id=1, photo=POSTER), message=f"Bad Request: {text}")
+
+
+class FakeMessage:
+    """Повідомлення, на яке відповідає show_card: записує відповіді, фото може падати з ``errors``."""
+
+    def __init__(self, errors=()):
+        self.from_user = SimpleNamespace(id=1)
+        self.errors = list(errors)
+        self.photos = []
+        self.texts = []
+
+    async def answer_photo(self, photo, caption=None, reply_markup=None):
+        self.photos.append((photo, caption))
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(photo=[PhotoSize(file_id=f"id-{len(self.photos)}", file_unique_id="u", width=1, height=1)])
+
+    async def answer(self, text, reply_markup=None):
+        self.texts.append(text)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    sync = Database(str(tmp_path / "data.json"), flush_delay=0)
+    monkeypatch.setattr(command, "failed_posters", FailedPosters())
+    monkeypatch.setattr(command, "cards", command.CardCache())
+    yield sync
+    sync.close()
+
+
+# показати картку фільму й повернути фільм зі сховища після показу
+def show(store, film_id, message):
+    async def run():
+        command.db = AsyncDatabase(store)
+        try:
+            await command.show_card(message, store.get_film_by_id(film_id))
+        finally:
+            await command.db.close()
+    original = command.db
+    try:
+        asyncio.run(run())
+    finally:
+        command.db = original
+    return store.get_film_by_id(film_id)
+
+
+def test_file_id_saved_and_reused(store):
+    film = store.add_film("Дюна", "фантастика", poster=POSTER)
+    first = FakeMessage()
+    assert show(store, film.id, first).poster_file_id == "id-1"
+    assert first.photos[0][0] == POSTER
+    second = FakeMessage()
+    show(store, film.id, second)
+    assert second.photos[0][0] == "id-1"
+    assert second.texts == []
+
+
+def test_invalid_file_id_falls_back_to_url(store):
+    film = store.add_film("Дюна", "фантастика", poster=POSTER)
+    store.set_poster_file_id(film.id, POSTER, "stale")
+    message = FakeMessage([bad_request("wrong file identifier/HTTP URL specified")])
+    assert show(store, film.id, message).poster_file_id == "id-2"
+    assert [photo for photo, _ in message.photos] == ["stale", POSTER]
+
+
+@pytest.mark.parametrize("error", [
+    TelegramNetworkError(method=SendPhoto(chat_id=1, photo=POSTER), message="timeout"),
+    bad_request("message caption is too long"),
+])
+def test_transient_error_keeps_file_id(store, error):
+    film = store.add_film("Дюна", "фантастика", poster=POSTER)
+    store.set_poster_file_id(film.id, POSTER, "good")
+    message = FakeMessage([error])
+    assert show(store, film.id, message).poster_file_id == "good"
+    assert len(message.photos) == 1
+    assert len(message.texts) == 1
+
+
+def test_broken_url_is_not_retried(store):
+    film = store.add_film("Дюна", "фантастика", poster=POSTER)
+    message = FakeMessage([bad_request("failed to get HTTP URL content")])
+    show(store, film.id, message)
+    assert POSTER in command.failed_posters
+    again = FakeMessage()
+    show(store, film.id, again)
+    assert again.photos == [] and len(again.texts) == 1
+
+
+def test_transient_url_error_is_retried(store):
+    film = store.add_film("Дюна", "фантастика", poster=POSTER)
+    error = TelegramNetworkError(method=SendPhoto(chat_id=1, photo=POSTER), message="timeout")
+    show(store, film.id, FakeMessage([error]))
+    assert POSTER not in command.failed_posters
+
+
+def test_long_card_sent_after_photo(store):
+    film = store.add_film("Дюна", "фантастика", description="п" * 3000, poster=POSTER)
+    message = FakeMessage()
+    show(store, film.id, message)
+    assert message.photos == [(POSTER, None)]
+    assert len(message.texts) == 1 and len(message.texts[0]) > CAPTION_LIMIT
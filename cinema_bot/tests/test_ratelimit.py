@@ -0,0 +1,115 @@
+# Черга вихідних запитів (ratelimit.OutboundLimiter) поверх фейкової сесії Telegram
+
+import asyncio
+import time
+
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from fake_telegram import FakeTelegramSession
+from ratelimit import OutboundLimiter
+
+UNLIMITED = 10 ** 9
+
+
+def make_bot(session, **limits):
+    limiter = OutboundLimiter(**{
+        "global_rate": UNLIMITED, "global_burst": UNLIMITED, "chat_rate": UNLIMITED, "chat_burst": UNLIMITED,
+        **limits,
+    })
+    session.middleware(limiter)
+    return Bot("42:TEST", session=session), limiter
+
+
+# надіслати повідомлення в chats (по одному на елемент) одночасно; час завершення кожного
+async def send_all(bot, chats):
+    started = time.monotonic()
+
+    async def send(chat_id):
+        await bot.send_message(chat_id, "🎬")
+        return time.monotonic() - started
+
+    return await asyncio.gather(*(send(chat_id) for chat_id in chats))
+
+
+def run(coro_factory, session, **limits):
+    async def main():
+        bot, limiter = make_bot(session, **limits)
+        try:
+            return await coro_factory(bot), limiter
+        finally:
+            await limiter.close()
+    return asyncio.run(main())
+
+
+def test_chat_pacing_does_not_hold_other_chats():
+    session = FakeTelegramSession(chat_limit=UNLIMITED, global_limit=UNLIMITED)
+    done, _ = run(lambda bot: send_all(bot, [1] * 6 + [2]), session, chat_rate=20, chat_burst=2)
+    # 2 одразу, решта 4 — по одному кожні 50 мс
+    assert max(done[:6]) >= 0.18
+    assert done[6] < 0.05
+    assert len(session.calls) == 7 and session.floods == 0
+
+
+def test_global_pacing():
+    session = FakeTelegramSession(chat_limit=UNLIMITED, global_limit=UNLIMITED)
+    done, _ = run(lambda bot: send_all(bot, range(1, 7)), session, global_rate=20, global_burst=2)
+    assert sorted(done)[1] < 0.05
+    assert max(done) >= 0.18
+
+
+# ліміти бота вищі, ніж дозволяє «Telegram»: 429 з retry_after призупиняє чат і запит повторюється
+def test_retry_after_is_respected():
+    session = FakeTelegramSession(chat_limit=2, chat_period=0.2, global_limit=UNLIMITED)
+    done, limiter = run(lambda bot: send_all(bot, [1] * 5), session, max_retries=10)
+    assert len(session.calls) == 5
+    assert limiter.retried == session.floods > 0
+    assert max(done) >= 0.4
+
+
+class AlwaysFlood(FakeTelegramSession):
+    """Сесія, що на кожен запит відповідає RetryAfter."""
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.attempts += 1
+        raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=0)
+
+
+def test_gives_up_after_max_retries():
+    session = AlwaysFlood()
+    with pytest.raises(TelegramRetryAfter):
+        run(lambda bot: bot.send_message(1, "🎬"), session, max_retries=2)
+    assert session.attempts == 3
+
+
+# запити без чату (getMe тощо) лімітами не рахуються
+def test_unlimited_methods_bypass_queue():
+    session = FakeTelegramSession()
+    _, limiter = run(lambda bot: bot.get_me(), session, global_rate=0.001, global_burst=1)
+    assert limiter.sent == 0 and len(session.calls) == 1
+
+
+# поки відро порожнє, відповіді на кнопки обганяють масову розсилку
+def test_interactive_before_bulk():
+    from ratelimit import bulk_sends
+
+    async def scenario(bot):
+        await bot.send_message(1, "перше")
+
+        async def broadcast():
+            with bulk_sends():
+                await asyncio.gather(*(bot.send_message(chat_id, "розсилка") for chat_id in range(2, 5)))
+
+        task = asyncio.create_task(broadcast())
+        await asyncio.sleep(0)
+        await bot.edit_message_text("картка", chat_id=5, message_id=1)
+        await task
+
+    session = FakeTelegramSession(chat_limit=UNLIMITED, global_limit=UNLIMITED)
+    run(scenario, session, global_rate=50, global_burst=1)
+    assert [type(method).__name__ for method in session.calls][:2] == ["SendMessage", "EditMessageText"]
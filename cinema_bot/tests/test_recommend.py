@@ -0,0 +1,75 @@
+# Фоновий перерахунок рекомендацій
+
+import threading
+
+import pytest
+
+import recommend
+from recommend import IMPORT_INLINE_LIMIT, BuildCancelled, Recommender
+from records import Film
+
+
+def catalog():
+    films = [Film(i, f"Фільм {i}", "драма", actors=f"Актор {i % 7}") for i in range(1, 51)]
+    ratings = {user: {film: 6 + (user + film) % 5 for film in range(1, 51, user)} for user in range(1, 11)}
+    return films, ratings, {1: [3, 5]}
+
+
+def test_build_finds_neighbors():
+    model = Recommender(neighbors=5).build(*catalog())
+    assert model.stop is None
+    assert all(len(neighbors) <= 5 for neighbors in model.neighbors.values())
+    assert model.neighbors
+
+
+# скасована побудова зупиняється, а не дораховує модель у потоці
+def test_build_stops_when_cancelled():
+    stop = threading.Event()
+    stop.set()
+    with pytest.raises(BuildCancelled):
+        Recommender().build(*catalog(), stop)
+
+
+# малий імпорт потрапляє в модель одразу, великий чекає на позачерговий перерахунок
+def test_imported_films():
+    recommender = Recommender()
+    recommender.add_films([Film(1, "Дюна", "фантастика")])
+    assert 1 in recommender._model.films and not recommender._wake.is_set()
+    big = [Film(i, f"Фільм {i}", "драма") for i in range(2, IMPORT_INLINE_LIMIT + 3)]
+    recommender.add_films(big)
+    assert recommender._wake.is_set() and 2 not in recommender._model.films
+
+
+# observe лише позначає сусідів застарілими; settle перераховує їх пакетами
+def test_observe_defers_neighbor_refresh():
+    recommender = Recommender(neighbors=5)
+    recommender.install(recommender.build(*catalog()))
+    model = recommender._model
+    recommender.add_film(Film(101, "Вестерн", "вестерн"))
+    recommender.add_film(Film(102, "Мюзикл", "мюзикл"))
+    recommender.observe(500, 101, score=10)
+    recommender.observe(500, 102, score=10)
+    assert 102 in model.dirty and 102 not in model.neighbors
+    while model.settle(1):
+        pass
+    assert not model.dirty and not model.offers
+    assert [j for j, _ in model.neighbors[102]] == [101]
+    assert 102 in dict(model.neighbors[101])
+
+
+def test_forget_leaves_no_recommendation():
+    recommender = Recommender(neighbors=5)
+    recommender.install(recommender.build(*catalog()))
+    for film_id in range(1, 51):
+        recommender.forget(film_id)
+    assert recommender.recommend(1) is None
+
+
+def test_user_caches_are_bounded(monkeypatch):
+    monkeypatch.setattr(recommend, "USERS_CACHED", 3)
+    recommender = Recommender()
+    recommender.install(recommender.build(*catalog()))
+    for user in range(1, 11):
+        recommender.recommend(user)
+    assert len(recommender._shown) <= 3 and len(recommender._queues) <= 3
+    assert list(recommender._shown) == [8, 9, 10]
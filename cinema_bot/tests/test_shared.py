@@ -0,0 +1,94 @@
+# Кілька процесів на одному сховищі: жодна зміна не губиться, редагування — compare-and-set
+
+import multiprocessing
+
+import pytest
+
+from data import Database
+from data_sqlite import SqliteDatabase
+
+WORKERS = 3
+VOTES = 40
+
+
+def open_store(backend, tmp_path):
+    if backend == "json":
+        return Database(str(tmp_path / "data.json"), check_interval=0, shared=True)
+    return SqliteDatabase(str(tmp_path / "data.db"), migrate_from=None)
+
+
+# процес-воркер: свої користувачі оцінюють і додають в обране ті самі фільми
+def _worker(backend, tmp_path, worker):
+    db = open_store(backend, tmp_path)
+    for n in range(VOTES):
+        user = worker * 1000 + n
+        db.add_rating(1 + n % 2, user, 1 + n % 10)
+        db.toggle_favorite(1, user)
+    db.add_film(f"Фільм воркера {worker}", "драма")
+    db.close()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+def test_processes_lose_no_updates(backend, tmp_path):
+    db = open_store(backend, tmp_path)
+    db.add_film("Дюна", "фантастика")
+    db.add_film("Сталкер", "драма")
+    # fork не імпортує модулі бота заново в кожному процесі (у Windows — лише spawn)
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    procs = [ctx.Process(target=_worker, args=(backend, tmp_path, w)) for w in range(1, WORKERS + 1)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(120)
+        assert p.exitcode == 0
+
+    reopened = open_store(backend, tmp_path)
+    for store in (db, reopened):
+        films = store.get_films()
+        assert len(films) == 2 + WORKERS
+        assert sum(f.votes for f in films) == WORKERS * VOTES
+        assert store.check_ratings() == {}
+        ratings, favorites = store.get_interactions()
+        assert len(ratings) == len(favorites) == WORKERS * VOTES
+        # індекси пошуку догнали зміни інших процесів
+        assert len(store.search_film_ids("воркера")) == WORKERS
+    reopened.close()
+    db.close()
+
+
+def test_changes_visible_to_other_instance(backend, tmp_path):
+    first = open_store(backend, tmp_path)
+    second = open_store(backend, tmp_path)
+    film = first.add_film("Дюна", "фантастика")
+    assert second.search_film_ids("дюна") == [film.id]
+    second.add_rating(film.id, 7, 8)
+    first.add_rating(film.id, 8, 6)
+    assert first.get_film_by_id(film.id).votes == second.get_film_by_id(film.id).votes == 2
+    second.delete_film(film.id)
+    assert first.get_film_by_id(film.id) is None
+    assert first.search_film_ids("дюна") == []
+    first.close()
+    second.close()
+
+
+# редагування з expected не перетирає зміну, зроблену іншим адміном чи процесом
+def test_update_field_compare_and_set(backend, tmp_path):
+    first = open_store(backend, tmp_path)
+    second = open_store(backend, tmp_path)
+    film = first.add_film("Дюна", "фантастика")
+    assert second.update_field(film.id, "title", "Дюна (2021)", expected="Дюна")
+    assert not first.update_field(film.id, "title", "Дюна 2", expected="Дюна")
+    assert first.get_film_by_id(film.id).title == "Дюна (2021)"
+    assert first.search_film_ids("2021") == [film.id]
+    # без expected — звичайне оновлення; видалений фільм не оновлюється
+    assert first.update_field(film.id, "genre", "драма")
+    assert second.delete_film(film.id)
+    assert not first.update_field(film.id, "title", "Дюна", expected="Дюна (2021)")
+    assert not first.update_field(film.id, "rating", "10")
+    first.close()
+    second.close()
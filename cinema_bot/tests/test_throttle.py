@@ -0,0 +1,114 @@
+# Обмеження частоти вхідних подій (throttle.ThrottlingMiddleware) з керованим годинником
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import CallbackQuery, Chat, Message, User
+
+import throttle
+from throttle import ThrottlingMiddleware, classify
+
+USER = User(id=7, is_bot=False, first_name="Тест")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+# відповіді користувачу замість Telegram потрапляють у список
+@pytest.fixture
+def answers(monkeypatch):
+    answers = []
+
+    async def answer(self, text=None, **kwargs):
+        answers.append(text)
+
+    monkeypatch.setattr(CallbackQuery, "answer", answer)
+    monkeypatch.setattr(Message, "answer", answer)
+    return answers
+
+
+def message(text, user=USER):
+    return Message(message_id=1, date=datetime.now(), chat=Chat(id=user.id, type="private"), from_user=user, text=text)
+
+
+def callback(data, user=USER):
+    return CallbackQuery(id="1", from_user=user, chat_instance="1", data=data)
+
+
+# пропустити подію крізь middleware; True — дійшла до обробника
+def feed(middleware, event, raw_state=None):
+    async def handler(event, data):
+        return True
+    return asyncio.run(middleware(handler, event, {"raw_state": raw_state})) is True
+
+
+def test_classify():
+    assert classify(callback("rate_3_5"), None) == "write"
+    assert classify(callback("page_films_2"), None) == "callback"
+    assert classify(message("Матриця"), None) == "search"
+    assert classify(message("Матриця"), "waiting_for_search") == "search"
+    assert classify(message("Матриця"), "AddFilm:title") == "message"
+    assert classify(message("/start"), None) == "message"
+
+
+def test_buckets_are_per_category(clock, answers):
+    middleware = ThrottlingMiddleware({"search": (1, 2), "message": (1, 2)}, debounce=0)
+    assert [feed(middleware, message("Матриця")) for _ in range(3)] == [True, True, False]
+    # інший клас і інший користувач мають власні відра
+    assert feed(middleware, message("/start"))
+    assert feed(middleware, message("Матриця", User(id=8, is_bot=False, first_name="Інший")))
+    assert middleware.dropped == {"search": 1}
+    assert answers == ["⏳ Забагато запитів, спробуйте за кілька секунд"]
+    clock.now += 1
+    assert feed(middleware, message("Матриця"))
+    assert not feed(middleware, message("Матриця"))
+
+
+def test_unlisted_category_is_not_limited(clock, answers):
+    middleware = ThrottlingMiddleware({"search": (1, 1)}, debounce=0)
+    assert all(feed(middleware, callback(f"page_films_{i}")) for i in range(20))
+
+
+def test_warning_is_rate_limited(clock, answers):
+    middleware = ThrottlingMiddleware({"message": (0.01, 1)}, debounce=0)
+    for _ in range(5):
+        feed(middleware, message("/start"))
+    assert len(answers) == 1 and middleware.dropped["message"] == 4
+    clock.now += throttle.WARN_INTERVAL
+    feed(middleware, message("/start"))
+    assert len(answers) == 2
+
+
+def test_throttled_callback_is_answered(clock, answers):
+    middleware = ThrottlingMiddleware({"write": (1, 1)}, debounce=0)
+    assert feed(middleware, callback("fav_1"))
+    assert not feed(middleware, callback("fav_2"))
+    assert answers == ["⏳ Забагато натискань, зачекайте трохи"]
+
+
+def test_debounce_repeated_press(clock, answers):
+    middleware = ThrottlingMiddleware({"callback": (100, 100)}, debounce=0.7)
+    assert feed(middleware, callback("film_1"))
+    clock.now += 0.3
+    assert not feed(middleware, callback("film_1"))
+    # інша кнопка проходить одразу
+    assert feed(middleware, callback("film_2"))
+    clock.now += 0.8
+    assert feed(middleware, callback("film_2"))
+    assert middleware.dropped == {"debounce": 1}
+    # на повторне натискання — порожня відповідь, щоб зник годинник
+    assert answers == [None]
@@ -0,0 +1,103 @@
+# Обмеження частоти запитів від одного користувача 🐢
+
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from config import THROTTLE_DEBOUNCE, THROTTLE_LIMITS
+from keyboards import MENU_BUTTONS
+from ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+# кнопки, що змінюють дані (запис на диск)
+WRITE_PREFIXES = ("rate_", "fav_", "confirm_delete_")
+# стани, у яких вільний текст іде в пошук
+SEARCH_STATES = (None, "waiting_for_search")
+# скільки відер користувачів тримати, перш ніж прибирати невикористані
+USER_BUCKETS_LIMIT = 20_000
+# як часто (в секундах) можна нагадувати користувачу, що він надсилає забагато
+WARN_INTERVAL = 10.0
+
+
+# клас події для окремого ліміту: "search", "write", "callback" або "message"
+def classify(event: TelegramObject, raw_state: Optional[str]) -> str:
+    if isinstance(event, CallbackQuery):
+        return "write" if (event.data or "").startswith(WRITE_PREFIXES) else "callback"
+    text = getattr(event, "text", None) or ""
+    if text and not text.startswith("/") and text not in MENU_BUTTONS and raw_state in SEARCH_STATES:
+        return "search"
+    return "message"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Зовнішня middleware роутера: окреме відро токенів на кожного користувача й клас подій.
+
+    Ліміти задаються в ``limits`` як {клас: (запитів за секунду, скільки підряд)}.
+    Подія понад ліміт не доходить до обробника: на кнопку одразу надсилається
+    коротка відповідь (щоб зник годинник), на повідомлення — не частіше ніж раз
+    на ``WARN_INTERVAL`` секунд. Повторне натискання тієї ж кнопки протягом
+    ``debounce`` секунд просто підтверджується. Відкинуті події лічаться в ``dropped``.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None, debounce: float = THROTTLE_DEBOUNCE) -> None:
+        self.limits = dict(THROTTLE_LIMITS if limits is None else limits)
+        self.debounce = debounce
+        self._buckets: Dict[Tuple[int, str], TokenBucket] = {}
+        # користувач → (дані останньої кнопки, коли натиснута)
+        self._last_press: Dict[int, Tuple[str, float]] = {}
+        self._warned: Dict[int, float] = {}
+        # лічильники відкинутих подій: {клас: кількість}, "debounce" — повторні натискання
+        self.dropped: Counter = Counter()
+
+    def _bucket(self, user_id: int, kind: str, now: float) -> Optional[TokenBucket]:
+        key = (user_id, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if kind not in self.limits:
+                return None
+            if len(self._buckets) >= USER_BUCKETS_LIMIT:
+                self._prune(now)
+            rate, burst = self.limits[kind]
+            bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+        return bucket
+
+    # прибрати відра, що повністю наповнились, і застарілі записи
+    def _prune(self, now: float) -> None:
+        self._buckets = {k: b for k, b in self._buckets.items() if not b.idle(now)}
+        self._last_press = {u: p for u, p in self._last_press.items() if now - p[1] < self.debounce}
+        self._warned = {u: t for u, t in self._warned.items() if now - t < WARN_INTERVAL}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is None:
+            return await handler(event, data)
+        now = time.monotonic()
+
+        if isinstance(event, CallbackQuery) and self.debounce > 0:
+            last = self._last_press.get(user.id)
+            self._last_press[user.id] = (event.data or "", now)
+            if last is not None and last[0] == event.data and now - last[1] < self.debounce:
+                self.dropped["debounce"] += 1
+                await event.answer()
+                return None
+
+        kind = classify(event, data.get("raw_state"))
+        bucket = self._bucket(user.id, kind, now)
+        if bucket is None or bucket.try_consume(now):
+            return await handler(event, data)
+
+        self.dropped[kind] += 1
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Забагато натискань, зачекайте трохи")
+        elif isinstance(event, Message) and now - self._warned.get(user.id, -WARN_INTERVAL) >= WARN_INTERVAL:
+            self._warned[user.id] = now
+            await event.answer("⏳ Забагато запитів, спробуйте за кілька секунд")
+        return None